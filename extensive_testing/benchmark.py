@@ -0,0 +1,438 @@
+"""
+Micro benchmarks for tumfl. Run with `python -m extensive_testing.benchmark [name ...]`.
+
+Benchmarks either generate their own input, or use the files in `lua-tests`.
+"""
+
+import io
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stderr
+from functools import partial
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable
+
+from tumfl.arena import parse_arena
+from tumfl.AST import Assign, ASTNode, Chunk, Expression, Statement
+from tumfl.basic_walker import NoneWalker
+from tumfl.config import Config
+from tumfl.dependency_resolver import resolve_recursive, skim_requires
+from tumfl.error import TumflError
+from tumfl.formatter import format, format_stream
+from tumfl.incremental import Edit, relex, reparse
+from tumfl.lexer import Lexer, TokenType
+from tumfl.parse_cache import ParseCache
+from tumfl.parser import Parser, parse
+from tumfl.serialize import dumps, loads
+from tumfl.to_python_type import ToPythonType
+from tumfl.token import Token, TokenBuffer
+
+BENCHMARKS: dict[str, Callable[[], None]] = {}
+
+
+def benchmark(function: Callable[[], None]) -> Callable[[], None]:
+    BENCHMARKS[function.__name__] = function
+    return function
+
+
+def measure(name: str, function: Callable[[], object], repeat: int = 3) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    print(f"{name}: {best * 1000:.1f} ms")
+    return best
+
+
+def measure_memory(name: str, function: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        result: object = function()
+        peak: int = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    print(f"{name}: {peak / 1_000_000:.1f} MB peak")
+    return peak
+
+
+def lua_tests_source() -> str:
+    return "\n".join(
+        file.read_text(encoding="iso-8859-15")
+        for file in sorted(Path("lua-tests").glob("*.lua"))
+    )
+
+
+def lex_all(text: str) -> int:
+    lexer = Lexer(text)
+    count: int = 0
+    while lexer.get_next_token().type != TokenType.EOF:
+        count += 1
+    return count
+
+
+def parse_all(text: str) -> Chunk:
+    return Parser(text).parse_chunk()
+
+
+def long_string_source(size: int = 4_000_000) -> str:
+    line: str = "0123456789abcdef]=]=]==" * 3 + "\n"
+    blob: str = line * (size // len(line))
+    flat: str = blob.replace("\n", " ")
+    escaped: str = "abc\\n\\x41\\065" * 10_000
+    return (
+        f"--[==[{blob}]==]\n"
+        f"local data = [[{blob}]]\n"
+        f"local other = [===[{blob}]===]\n"
+        f"-- {flat[:1000]}\n"
+        f"local quoted = '{flat[:100_000]}'\n"
+        f'local escaped = "{escaped}"\n'
+    )
+
+
+@benchmark
+def long_strings() -> None:
+    source: str = long_string_source()
+    measure(
+        f"lex {len(source) // 1_000_000} MB of long strings", lambda: lex_all(source)
+    )
+
+
+@benchmark
+def token_memory() -> None:
+    source: str = lua_tests_source()
+
+    def token_list() -> list[Token]:
+        lexer = Lexer(source, ignore_unicode_errors=True)
+        tokens: list[Token] = [lexer.get_next_token()]
+        while tokens[-1].type != TokenType.EOF:
+            tokens.append(lexer.get_next_token())
+        return tokens
+
+    size: str = f"{len(source) // 1000} kB"
+    measure_memory(f"token list of {size}", token_list)
+    measure_memory(
+        f"token buffer of {size}",
+        lambda: Lexer(source, ignore_unicode_errors=True).tokenize_all(),
+    )
+
+
+@benchmark
+def numbers() -> None:
+    source: str = "return " + ", ".join(["0x1F.8p3, 12.5e-3, 42, .5"] * 50_000)
+    measure("lex 200k numbers", lambda: lex_all(source))
+    chunk: Chunk = parse(source)
+    assert chunk.returns
+    numbers: list[Expression] = chunk.returns * 10
+    to_python: ToPythonType = ToPythonType()
+    measure(
+        "convert 200k numbers 10 times",
+        lambda: [to_python(number) for number in numbers],
+    )
+
+
+@benchmark
+def incremental() -> None:
+    source: str = lua_tests_source()
+    tokens: TokenBuffer = Lexer(source, ignore_unicode_errors=True).tokenize_all()
+    edit: Edit = Edit(len(source) // 2, 0, "local inserted = 1\n")
+    measure(
+        "lex edited lua-tests",
+        lambda: Lexer(edit.apply(source), ignore_unicode_errors=True).tokenize_all(),
+    )
+    measure(
+        "relex edited lua-tests",
+        lambda: relex(tokens, edit, ignore_unicode_errors=True),
+    )
+    module: str = "\n".join(
+        f"function f{i}(a, b)\n    local c = a + b * {i}\n    return c .. 'x'\nend"
+        for i in range(1250)
+    )
+    chunk: Chunk = parse(module)
+    reparse(chunk, module)
+    change: Edit = Edit(module.index("b * 600"), 1, "bb")
+    measure("parse 5k line module", partial(parse, module))
+    measure(
+        "reparse edited 5k line module",
+        lambda: reparse(chunk, change.apply(module), change),
+        repeat=1,
+    )
+
+
+@benchmark
+def parse_time() -> None:
+    sources: list[bytes] = [
+        file.read_bytes() for file in sorted(Path("lua-tests").glob("*.lua"))
+    ]
+    measure(
+        "parse lua-tests",
+        lambda: [Parser(source).parse_chunk() for source in sources],
+    )
+    # mostly small nodes, the cost of building them outweighs the grammar
+    assignments: str = "\n".join(f"a = {i}" for i in range(5000))
+    measure("parse 5000 assignments", lambda: parse_all(assignments))
+    locals_: str = "\n".join(f"local x{i} = {i} + y.z * 2" for i in range(5000))
+    measure("parse 5000 local assignments", lambda: parse_all(locals_))
+
+
+@benchmark
+def expressions() -> None:
+    sources: list[bytes] = [
+        file.read_bytes() for file in sorted(Path("lua-tests").glob("*.lua"))
+    ]
+    measure(
+        "parse lua-tests",
+        lambda: [Parser(source).parse_chunk() for source in sources],
+    )
+    expression: str = " + ".join(
+        ["a * b ^ -c .. d or not e == f and (g | h & i << j) // 2"] * 20
+    )
+    generated: str = "\n".join([f"x = {expression}"] * 200)
+    measure("parse 200 long expressions", lambda: Parser(generated).parse_chunk())
+
+
+def parse_on_stack(text: str | bytes) -> Chunk:
+    parser = Parser(text)
+    parser.max_recursion_depth = 0
+    return parser.parse_chunk()
+
+
+@benchmark
+def nesting() -> None:
+    sources: list[bytes] = [
+        file.read_bytes() for file in sorted(Path("lua-tests").glob("*.lua"))
+    ]
+    # the common case must not pay for the explicit stack
+    measure(
+        "parse lua-tests",
+        lambda: [Parser(source).parse_chunk() for source in sources],
+    )
+    measure(
+        "parse lua-tests on the explicit stack",
+        lambda: [parse_on_stack(source) for source in sources],
+    )
+    # the time per level should stay the same for deeper nesting
+    for depth in (10_000, 20_000):
+        nested: dict[str, str] = {
+            "indexes": "return a" + ".b" * depth,
+            "ifs": "if a then " * depth + "end " * depth,
+            "blocks": "do " * depth + "end " * depth,
+            "brackets": "return " + "(" * depth + "1" + ")" * depth,
+            "tables": "return " + "{" * depth + "}" * depth,
+            "calls": "return " + "f(" * depth + ")" * depth,
+            "concat": "return " + " .. ".join(["a"] * depth),
+        }
+        for name, source in nested.items():
+            measure(
+                f"parse {depth} nested {name}",
+                partial(parse_all, source),
+            )
+
+
+@benchmark
+def parse_cache() -> None:
+    sources: list[bytes] = [
+        file.read_bytes() for file in sorted(Path("lua-tests").glob("*.lua"))
+    ]
+    with TemporaryDirectory() as directory:
+        cache: ParseCache = ParseCache(Path(directory))
+        measure("parse lua-tests", lambda: [parse(source) for source in sources])
+        measure(
+            "parse lua-tests into an empty cache",
+            lambda: [parse(source, cache=cache) for source in sources],
+            repeat=1,
+        )
+        measure(
+            "load lua-tests from the cache",
+            lambda: [parse(source, cache=cache) for source in sources],
+        )
+
+
+@benchmark
+def serialize() -> None:
+    sources: list[bytes] = [
+        file.read_bytes() for file in sorted(Path("lua-tests").glob("*.lua"))
+    ]
+    chunks: list[Chunk] = [parse(source) for source in sources]
+    data: list[bytes] = [dumps(chunk) for chunk in chunks]
+    measure("parse lua-tests", lambda: [parse(source) for source in sources])
+    measure("serialize lua-tests", lambda: [dumps(chunk) for chunk in chunks])
+    measure("deserialize lua-tests", lambda: [loads(entry) for entry in data])
+    size: int = sum(map(len, data))
+    print(f"serialized lua-tests: {size / 1_000_000:.1f} MB")
+
+
+@benchmark
+def streaming() -> None:
+    source: str = "\n".join(
+        f"function f{i}(a, b)\n    local c = {{a, b, {i}}}\n    return c[1] .. 'x'\nend"
+        for i in range(500)
+    )
+
+    def stream() -> int:
+        return sum(map(len, format_stream(Parser(source).iter_statements())))
+
+    measure("format 8k lines", lambda: format(parse(source)), repeat=1)
+    measure("stream format 8k lines", stream, repeat=1)
+    measure_memory("format 8k lines", lambda: format(parse(source)))
+    measure_memory("stream format 8k lines", stream)
+
+
+@benchmark
+def requires() -> None:
+    # a few tests require computed module names, which neither method resolves
+    sources: list[bytes] = [
+        file.read_bytes()
+        for file in sorted(Path("lua-tests").glob("*.lua"))
+        if b"require" not in file.read_bytes()
+    ]
+    measure("parse lua-tests", lambda: [parse(source) for source in sources])
+    measure(
+        "skim requires of lua-tests",
+        lambda: [skim_requires(source) for source in sources],
+    )
+
+
+@benchmark
+def lazy() -> None:
+    # a library module, with every test as one function
+    source: bytes = b"local M = {}\n"
+    for i, file in enumerate(sorted(Path("lua-tests").glob("*.lua"))):
+        # comment out shebang lines, they are only allowed at the start of a chunk
+        test: bytes = b"--" * file.read_bytes().startswith(b"#") + file.read_bytes()
+        source += b"function M.f%d(...)\n%s\nend\n" % (i, test)
+    source += b"return M"
+    measure("parse library", lambda: parse(source))
+    measure("lazily parse library", lambda: parse(source, lazy=True))
+
+
+class NodeCollector(NoneWalker):
+    def __init__(self) -> None:
+        super().__init__()
+        self.nodes: list[ASTNode] = []
+
+    def visit(self, node: ASTNode) -> None:
+        self.nodes.append(node)
+        super().visit(node)
+
+
+@benchmark
+def node_memory() -> None:
+    sources: list[bytes] = [
+        file.read_bytes() for file in sorted(Path("lua-tests").glob("*.lua"))
+    ]
+    tracemalloc.start()
+    try:
+        chunks: list[Chunk] = [parse(source) for source in sources]
+        size: int = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    collector: NodeCollector = NodeCollector()
+    for chunk in chunks:
+        collector.visit(chunk)
+    nodes: int = len(collector.nodes)
+    # includes the tokens and the source text kept alive by the nodes
+    print(f"AST of lua-tests: {size / nodes:.0f} bytes per node ({nodes} nodes)")
+
+
+@benchmark
+def traversal() -> None:
+    sources: list[bytes] = [
+        file.read_bytes() for file in sorted(Path("lua-tests").glob("*.lua"))
+    ]
+    chunks: list[Chunk] = [parse(source) for source in sources]
+    copies: list[Chunk] = [parse(source) for source in sources]
+
+    def parent_all() -> None:
+        for chunk in chunks:
+            chunk.parent(None)
+
+    measure("parent lua-tests", parent_all)
+    # digests are cached, so only the first comparison walks the trees
+    measure("digest lua-tests", lambda: [chunk.digest for chunk in copies], repeat=1)
+    measure("compare lua-tests", lambda: chunks == copies)
+    collector: NodeCollector = NodeCollector()
+    for chunk in chunks:
+        collector.visit(chunk)
+    measure("hash nodes of lua-tests", lambda: [hash(node) for node in collector.nodes])
+
+
+@benchmark
+def bundle() -> None:
+    with TemporaryDirectory() as directory:
+        project: Path = Path(directory)
+        requires: list[str] = []
+        for file in sorted(Path("lua-tests").glob("*.lua")):
+            source: str = file.read_text(encoding="iso-8859-15")
+            # modules are parsed as text, and can not require computed names
+            if "require" in source:
+                continue
+            try:
+                with redirect_stderr(io.StringIO()):
+                    parse(source)
+            except TumflError:
+                continue
+            (project / file.name).write_text(source)
+            requires.append(f'require("{file.stem}")')
+        main: Path = project / "main.lua"
+        main.write_text("\n".join(requires))
+        measure(
+            f"bundle {len(requires)} lua-tests",
+            lambda: resolve_recursive(main, [project]),
+        )
+
+
+@benchmark
+def config() -> None:
+    # a large config table, substituted into many placeholders
+    entries: str = ", ".join(f"key{i} = {{{i}, 'value{i}', {i}.5}}" for i in range(500))
+    assign: Statement = parse(f"table = {{{entries}}}").statements[0]
+    assert isinstance(assign, Assign)
+    value: ASTNode = assign.expressions[0]
+    source: str = "\n".join(f"local a{i} = '$$table'" for i in range(100))
+
+    def substitute() -> Chunk:
+        chunk: Chunk = parse(source)
+        Config({"table": value}).visit(chunk)
+        return chunk
+
+    measure("substitute config table 100 times", substitute)
+    measure("clone config table 100 times", lambda: [value.clone() for _ in range(100)])
+    measure_memory("substituted config", substitute)
+
+
+@benchmark
+def arena() -> None:
+    # a bundle of all lua-tests, every file wrapped in a function like a module
+    modules: list[str] = []
+    for file in sorted(Path("lua-tests").glob("*.lua")):
+        module: str = file.read_text(encoding="iso-8859-15")
+        if module.startswith("#"):
+            module = module.partition("\n")[2]
+        try:
+            with redirect_stderr(io.StringIO()):
+                parse(module)
+        except TumflError:
+            continue
+        modules.append(f"local function module{len(modules)}(...)\n{module}\nend")
+    source: str = "\n".join(modules)
+    measure("parse and format bundle", lambda: format(parse(source)), repeat=1)
+    measure(
+        "parse and format bundle in an arena",
+        lambda: format(parse_arena(source).view()),
+        repeat=1,
+    )
+    measure_memory("AST of bundle", lambda: parse(source))
+    measure_memory("arena of bundle", lambda: parse_arena(source))
+
+
+def main(names: list[str]) -> None:
+    for name in names or BENCHMARKS:
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
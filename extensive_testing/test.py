@@ -3,12 +3,13 @@ import unittest
 from pathlib import Path
 
 from tumfl.formatter import format
-from tumfl.lexer import Lexer, TokenType
+from tumfl.lexer import Lexer, Source, TokenType
 from tumfl.parser import Parser
 
 
 class ExtensiveTesting(unittest.TestCase):
-    files: list[tuple[str, str]] = []
+    # every file is read as bytes, and decoded as iso-8859-15
+    files: list[tuple[str, bytes, str]] = []
     # Ignored due to invalid codepoints
     ignored_files: list[str] = []
 
@@ -19,26 +20,45 @@ class ExtensiveTesting(unittest.TestCase):
         for file in test_dir.glob("*.lua"):
             if file.name in self.ignored_files:
                 continue
-            with open(file, encoding="iso-8859-15") as f:
-                self.files.append((str(file), f.read()))
+            content: bytes = file.read_bytes()
+            self.files.append((str(file), content, content.decode("iso-8859-15")))
+
+    def sources(self) -> list[tuple[str, Source]]:
+        """Both versions of every file"""
+        return [
+            (f"{filename} ({type(source).__name__})", source)
+            for filename, content, text in self.files
+            for source in (content, text)
+        ]
 
     def test_lexer(self) -> None:
-        for filename, file_content in self.files:
+        for filename, file_content in self.sources():
             print(f"Testing lexing {filename}", file=sys.stderr)
             lex = Lexer(file_content, ignore_unicode_errors=True)
             while lex.get_next_token().type != TokenType.EOF:
                 ...
 
     def test_parser(self) -> None:
-        for filename, file_content in self.files:
+        for filename, file_content in self.sources():
             print(f"Testing parsing {filename}", file=sys.stderr)
             parser = Parser(file_content, ignore_unicode_errors=True)
             parser.parse_chunk()
             self.assertEqual(len(parser.context_hints), 0)
             self.assertEqual(parser.current_token.type, TokenType.EOF)
 
+    def test_explicit_stack(self) -> None:
+        for filename, file_content, _ in self.files:
+            print(f"Testing parsing {filename} on the explicit stack", file=sys.stderr)
+            parser = Parser(file_content, ignore_unicode_errors=True)
+            parser.max_recursion_depth = 0
+            chunk = parser.parse_chunk()
+            self.assertEqual(len(parser.context_hints), 0)
+            self.assertEqual(
+                chunk, Parser(file_content, ignore_unicode_errors=True).parse_chunk()
+            )
+
     def _test_formatter(self) -> None:
-        for filename, file_content in self.files:
+        for filename, file_content, _ in self.files:
             print(f"Testing formatting {filename}", file=sys.stderr)
             chunk = Parser(file_content, ignore_unicode_errors=True).parse_chunk()
             formatted = format(chunk)
@@ -0,0 +1,227 @@
+import unittest
+from copy import deepcopy
+from pathlib import Path
+
+from tumfl.AST import *
+from tumfl.parser import parse
+
+
+class TestASTNode(unittest.TestCase):
+    def test_slots(self):
+        chunk = parse("local a = {b = 1 + 2}\nfunction f(x) return x end")
+        for node in (chunk, chunk.statements[0], chunk.statements[1].body):
+            self.assertFalse(hasattr(node, "__dict__"))
+        self.assertEqual(deepcopy(chunk), chunk)
+
+    def test_fields(self):
+        self.assertEqual(BinOp._fields, ("op", "left", "right"))
+        self.assertEqual(Chunk._fields, ("statements", "returns"))
+        self.assertEqual(NamedTableField._fields, ("value", "field_name"))
+        self.assertEqual(
+            Number._fields,
+            ("is_hex", "integer_part", "fractional_part", "exponent", "float_offset"),
+        )
+        self.assertEqual(Semicolon._fields, ())
+        self.assertEqual(LazyBlock._fields, ())
+
+    def test_attributes(self):
+        name = parse("a()").statements[0].function
+        self.assertIsNone(name.get_attribute(int))
+        self.assertIsNone(name._attributes)
+        name.set_attribute_if_not_exists(1)
+        name.set_attribute_if_not_exists(2)
+        self.assertEqual(name.get_attribute(int), 1)
+        self.assertEqual(name.attributes, {int: 1})
+
+    def test_side_table(self):
+        name = parse("a()").statements[0].function
+        table = SideTable()
+        self.assertIsNone(table.get(name, int))
+        table.set_if_not_exists(name, 1)
+        table.set_if_not_exists(name, 2)
+        table.set(name, "a")
+        self.assertEqual(table.get(name, int), 1)
+        self.assertEqual(table.get(name, str), "a")
+        self.assertEqual(len(table), 2)
+        # the node itself stays untouched
+        self.assertIsNone(name._attributes)
+        table.clear()
+        self.assertIsNone(table.get(name, int))
+        self.assertEqual(len(table), 0)
+
+    def test_replace(self):
+        chunk = parse("local a = 1 + 2, b\nf()")
+        assign = chunk.statements[0]
+        binop = assign.expressions[0]
+        # same layout, replaced in-place
+        name = assign.expressions[1]
+        self.assertIs(name.replace(Name(name.token, "c")), name)
+        self.assertEqual(name, Name(name.token, "c"))
+        self.assertIs(name.parent_class, assign)
+        # different layout, the parent gets a copy
+        number = binop.left
+        replaced = binop.replace(number)
+        self.assertIs(assign.expressions[0], replaced)
+        self.assertIsNot(replaced, number)
+        self.assertEqual(replaced, number)
+        self.assertIs(replaced.parent_class, assign)
+        chunk.statements[1].remove()
+        self.assertEqual(chunk.statements[1], Semicolon(chunk.token))
+        self.assertIs(chunk.statements[1].parent_class, chunk)
+        with self.assertRaises(TypeError):
+            chunk.replace(Name(chunk.token, "a"))
+
+    def test_links(self):
+        token = parse("a()").token
+        name = Name(token, "a")
+        call = FunctionCall(token, name, [String(token, "b")])
+        block = Block(token, [call], None)
+        self.assertIs(name.parent_class, call)
+        self.assertIs(call.arguments[0].parent_class, call)
+        self.assertIs(call.parent_class, block)
+        self.assertIsInstance(block.statements, NodeList)
+        block.statements.append(Semicolon(token))
+        block.statements.insert(0, Break(token))
+        block.statements[1:2] = [Goto(token, Name(token, "l"))]
+        block.statements += [Label(token, Name(token, "l"))]
+        for statement in block.statements:
+            self.assertIs(statement.parent_class, block)
+        local = LocalAssign(token, [AttributedName(name, Name(token, "const"))], None)
+        self.assertIs(name.parent_class, local)
+        self.assertIs(local.variable_names[0].attribute.parent_class, local)
+        # assigning a field links it
+        block.returns = [Nil(token)]
+        self.assertIsInstance(block.returns, NodeList)
+        self.assertIs(block.returns[0].parent_class, block)
+        call.function = Name(token, "b")
+        self.assertIs(call.function.parent_class, call)
+        self.assertEqual(deepcopy(block), block)
+
+    def test_file_name(self):
+        chunk = parse("local a = 1\nf(a)")
+        chunk.file_name = Path("a.lua")
+        argument = chunk.statements[1].arguments[0]
+        self.assertEqual(argument.file_name, Path("a.lua"))
+        chunk.statements[1].file_name = Path("b.lua")
+        self.assertEqual(argument.file_name, Path("b.lua"))
+        self.assertEqual(chunk.statements[0].file_name, Path("a.lua"))
+        # cached names follow nodes that are moved to another tree
+        other = parse("g()")
+        other.file_name = Path("c.lua")
+        self.assertEqual(argument.file_name, Path("b.lua"))
+        other.statements[0].arguments.append(argument)
+        self.assertEqual(argument.file_name, Path("c.lua"))
+        self.assertIsNone(parse("f(a)").statements[0].arguments[0].file_name)
+
+    def test_digest(self):
+        source = "local a <const> = {1, 'b', c = 1 + 2}\nfunction f(x) return x end"
+        chunk = parse(source)
+        other = parse(source)
+        self.assertIsNot(chunk.digest, other.digest)
+        self.assertEqual(chunk.digest, other.digest)
+        self.assertEqual(hash(chunk), hash(other))
+        self.assertEqual(chunk, other)
+        self.assertEqual(parse(source, lazy=True), chunk)
+        # changing a descendant drops the cached digests up to the root
+        table = chunk.statements[0].expressions[0]
+        table.fields[2].value.right.integer_part = "3"
+        self.assertNotEqual(chunk, other)
+        table.fields[2].value.right.integer_part = "2"
+        self.assertEqual(chunk, other)
+        table.fields.pop()
+        self.assertNotEqual(chunk, other)
+        chunk.statements[0].variable_names[0].name.replace(Name(table.token, "d"))
+        other.statements[0].variable_names[0].name.variable_name = "d"
+        other.statements[0].expressions[0].fields.pop()
+        self.assertEqual(chunk, other)
+        self.assertNotEqual(parse("a = 1"), parse("a = 2"))
+        self.assertNotEqual(parse("a = 'b'"), parse("a = b"))
+
+    def test_lazy_digest(self):
+        source = "local function f(a) return function() return a end end"
+        lazy = parse(source, lazy=True)
+        # unloaded bodies are digested from their source
+        self.assertEqual(hash(lazy), hash(parse(source, lazy=True)))
+        self.assertEqual(lazy, parse(source, lazy=True))
+        self.assertIsInstance(lazy.statements[0].body, LazyBlock)
+        spaced = parse(source.replace("return a", "return  a"), lazy=True)
+        self.assertNotEqual(lazy.digest, spaced.digest)
+        self.assertNotEqual(
+            lazy, parse(source.replace("return a", "return b"), lazy=True)
+        )
+        # comparing them with parsed bodies loads them
+        self.assertEqual(lazy, spaced)
+        self.assertEqual(lazy, parse(source))
+        self.assertEqual(lazy.digest, parse(source).digest)
+
+    def test_shared_digest(self):
+        chunk = parse("a = {1, 2}")
+        other = parse("b = 3")
+        table = chunk.statements[0].expressions[0]
+        other.statements[0].expressions[0] = table
+        self.assertEqual(chunk.digest, parse("a = {1, 2}").digest)
+        self.assertEqual(other, parse("b = {1, 2}"))
+        # the table is linked to other, but changes reach chunk too
+        table.fields[0].value.integer_part = "5"
+        self.assertEqual(chunk, parse("a = {5, 2}"))
+        self.assertEqual(other, parse("b = {5, 2}"))
+        self.assertIsNone(chunk._digest)
+        self.assertIsNotNone(parse("a = {5, 2}").digest)
+
+    def test_clone(self):
+        chunk = parse(
+            "local a <const> = {1, 'b', c = 1 + 2}\nfunction f(x) return x end"
+        )
+        chunk.statements[0].set_attribute(1)
+        chunk.statements[0].comment.append("comment")
+        clone = chunk.clone()
+        self.assertEqual(clone, chunk)
+        self.assertIsNone(clone.parent_class)
+        stack = [(chunk, clone)]
+        while stack:
+            node, copy = stack.pop()
+            self.assertIsNot(node, copy)
+            self.assertIs(type(node), type(copy))
+            self.assertIs(copy.token, node.token)
+            for child, child_copy in zip(node._get_children(), copy._get_children()):
+                self.assertIs(child_copy.parent_class, copy)
+                stack.append((child, child_copy))
+        self.assertEqual(clone.statements[0].attributes, {int: 1})
+        self.assertIsNot(clone.statements[0].attributes, chunk.statements[0].attributes)
+        clone.statements[0].comment.clear()
+        self.assertEqual(chunk.statements[0].comment, ["comment"])
+        clone.statements[0].expressions[0].fields.pop()
+        self.assertEqual(len(chunk.statements[0].expressions[0].fields), 3)
+
+    def test_lazy_clone(self):
+        chunk = parse("a = {1, {2, 3}}\nb = 1")
+        table = chunk.statements[0].expressions[0]
+        clone = table.clone(lazy=True)
+        self.assertIsInstance(clone, Table)
+        self.assertEqual(type(clone).__name__, "Table")
+        # compared and hashed without being copied
+        self.assertEqual(clone, table)
+        self.assertEqual(table, clone)
+        self.assertEqual(hash(clone), hash(table))
+        self.assertIsNot(type(clone), Table)
+        # reading a field copies one level
+        inner = clone.fields[1]
+        self.assertIs(type(clone), Table)
+        self.assertIs(inner.parent_class, clone)
+        self.assertIsNot(inner, table.fields[1])
+        self.assertIsNot(type(inner), NumberedTableField)
+        inner.value.fields.append(
+            NumberedTableField(
+                table.token, Number.from_token(table.fields[0].value.token)
+            )
+        )
+        self.assertNotEqual(clone, table)
+        self.assertEqual(len(table.fields[1].value.fields), 2)
+        # assigning a field before reading keeps it
+        clone = table.clone(lazy=True)
+        clone.fields = []
+        self.assertEqual(clone.fields, [])
+        self.assertEqual(deepcopy(table.clone(lazy=True)), table)
+        # replace copies the lazy clone
+        chunk.statements[1].expressions[0].replace(table.clone(lazy=True))
+        self.assertEqual(chunk.statements[1].expressions[0], table)
@@ -29,3 +29,25 @@ class TestNumber(unittest.TestCase):
         nmb = Number(tok, True, "43534f", None, None, None)
         self.assertEqual(nmb.to_float(), 0x43534F)
         self.assertEqual(nmb.to_int(), 0x43534F)
+
+    def test_cached_value(self):
+        tok = Token(TokenType.NUMBER, (False, "12", None, None, None), 1, 1)
+        nmb = Number.from_token(tok)
+        self.assertEqual(nmb.to_python(), 12)
+        self.assertIs(nmb.to_python(), nmb.to_python())
+        nmb.integer_part = "13"
+        self.assertEqual(nmb.to_python(), 13)
+        nmb.fractional_part = "5"
+        self.assertEqual(nmb.to_python(), 13.5)
+        self.assertIsNone(nmb.to_int())
+        nmb.is_hex = True
+        self.assertEqual(nmb.to_python(), float.fromhex("0x13.5"))
+        nmb.replace(Number(tok, False, "7", None, None, None))
+        self.assertEqual(nmb.to_python(), 7)
+        self.assertEqual(nmb, Number(tok, False, "7", None, None, None))
+
+    def test_huge_integer(self):
+        tok = Token(TokenType.NUMBER, (False, "9" * 400, None, None, None), 1, 1)
+        nmb = Number.from_token(tok)
+        self.assertEqual(nmb.to_int(), int("9" * 400))
+        self.assertEqual(nmb.to_float(), float("inf"))
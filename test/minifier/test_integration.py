@@ -1,6 +1,19 @@
 import unittest
 
 from tumfl import format, minify, parse
+from tumfl.AST import ASTNode
+from tumfl.basic_walker import NoneWalker
+from tumfl.formatter import MinifiedStyle
+
+
+class AttributeCollector(NoneWalker):
+    def __init__(self) -> None:
+        self.attributes: list[dict] = []
+
+    def visit(self, node: ASTNode) -> None:
+        if node._attributes:
+            self.attributes.append(node._attributes)
+        super().visit(node)
 
 
 class TestMinifier(unittest.TestCase):
@@ -23,6 +36,10 @@ class TestMinifier(unittest.TestCase):
         a(b, c)
         """
         self.assertMultiLineEqual(formatted_code, format(parse(expected_code)))
+        # the analysis data is not left on the nodes
+        collector = AttributeCollector()
+        collector.visit(ast)
+        self.assertEqual(collector.attributes, [])
 
     def test_local_assign(self):
         code = """
@@ -45,6 +62,23 @@ class TestMinifier(unittest.TestCase):
         """
         self.assertMultiLineEqual(formatted_code, format(parse(expected_code)))
 
+    def test_preserve_without_comments(self):
+        code = """
+        -- tumfl: preserve
+        function keep(a) return a end
+        -- regular comment, preserve order
+        function other(b) return b end
+        print(keep(1), other(2))
+        """
+        expected_code = (
+            "--tumfl\n"
+            "function keep(a)return a;end;function b(a)return a;end;print(keep(1),b(2))"
+        )
+        for include_comments in (True, False):
+            ast = parse(code, include_comments)
+            minify(ast)
+            self.assertMultiLineEqual(format(ast, MinifiedStyle), expected_code)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+
+from tumfl import format, parse
+from tumfl.lexer import TYPED_DIALECT
+from tumfl.minifier.resolve_indexes import Resolve, is_valid_name
+
+
+class TestResolveIndexes(unittest.TestCase):
+    def test_is_valid_name(self):
+        self.assertTrue(is_valid_name("foo_1"))
+        self.assertFalse(is_valid_name("1foo"))
+        self.assertFalse(is_valid_name("end"))
+        self.assertTrue(is_valid_name("as"))
+        self.assertFalse(is_valid_name("as", TYPED_DIALECT))
+
+    def test_resolve(self):
+        ast = parse('a["b"] = {["as"] = a["end"]}')
+        Resolve()(ast)
+        self.assertEqual(format(ast), format(parse('a.b = {as = a["end"]}')))
+        ast = parse('a["as"] = 1', typed=False)
+        Resolve(TYPED_DIALECT)(ast)
+        self.assertEqual(format(ast), format(parse('a["as"] = 1')))
@@ -0,0 +1,124 @@
+import unittest
+
+from tumfl.arena import Arena, parse_arena
+from tumfl.AST import (
+    Assign,
+    ASTNode,
+    Chunk,
+    LocalAssign,
+    Number,
+    Semicolon,
+    String,
+)
+from tumfl.basic_walker import NoneWalker
+from tumfl.formatter import format
+from tumfl.parser import parse
+from tumfl.token import Token, TokenType
+
+SOURCE = """-- header comment
+local a <const>, b = [==[long
+string]==] .. "short \\n string", 0x1F.8p3
+--[[ long
+comment ]] function foo(c, ...)
+    local t = {1, 2, [3] = c, d = ...} -- trailing
+    if c then return t:bar(c.e) elseif not c then goto skip end
+    ::skip::
+    for i = 1, #t, 2 do t[i] = -i end
+    repeat c = c // 2 until c < 1
+    return foo(a)
+end
+return foo
+"""
+
+
+class Collector(NoneWalker):
+    def __init__(self) -> None:
+        self.nodes: list[ASTNode] = []
+
+    def visit(self, node: ASTNode) -> None:
+        self.nodes.append(node)
+        super().visit(node)
+
+
+class TestArena(unittest.TestCase):
+    def test_round_trip(self):
+        chunk = parse(SOURCE)
+        arena = Arena()
+        self.assertEqual(arena.add(chunk), 0)
+        nodes = Collector()
+        nodes.visit(chunk)
+        self.assertEqual(len(arena), len(nodes.nodes))
+        node = arena.to_node()
+        self.assertIsInstance(node, Chunk)
+        self.assertEqual(node, chunk)
+        self.assertEqual(format(node), format(chunk))
+        # the nodes are linked and don't share tokens with the arena
+        assert isinstance(node, Chunk)
+        self.assertIs(node.statements[0].parent_class, node)
+        node.statements[0].comment.append("changed")
+        self.assertEqual(arena.to_node(), chunk)
+
+    def test_subtree(self):
+        chunk = parse("a = {1, 'x'}; b = 2")
+        arena = Arena()
+        arena.add(chunk)
+        index = arena.add(chunk.statements[1])
+        self.assertEqual(arena.to_node(), chunk.statements[1])
+        self.assertEqual(arena.to_node(0), chunk)
+        statement = arena.to_node(index)
+        assert isinstance(statement, Semicolon)
+        self.assertIsNone(statement.parent_class)
+
+    def test_loose_tokens(self):
+        token = Token(TokenType.NUMBER, "12", 3, 4)
+        arena = Arena()
+        arena.add(Number(token, False, "12"))
+        node = arena.to_node()
+        self.assertEqual(node.token, token)
+        self.assertEqual(node.token.line, 3)
+        self.assertIsNot(node.token, token)
+
+    def test_view(self):
+        chunk = parse(SOURCE)
+        arena = Arena()
+        arena.add(chunk)
+        view = arena.view()
+        self.assertIsInstance(view, Chunk)
+        self.assertEqual(format(view), format(chunk))
+        self.assertEqual(view.digest, chunk.digest)
+        assert isinstance(view, Chunk)
+        local = view.statements[0]
+        assert isinstance(local, LocalAssign)
+        self.assertEqual(local.name, "LocalAssign")
+        self.assertEqual(local.comment, chunk.statements[0].comment)
+        self.assertEqual(local.variable_names[0].attribute.variable_name, "const")
+        self.assertIsNone(local.variable_names[1].attribute)
+        self.assertIs(local.parent_class, view)
+        self.assertEqual(local.token.line, 2)
+
+    def test_walk_view(self):
+        chunk = parse(SOURCE)
+        arena = Arena()
+        arena.add(chunk)
+        nodes = Collector()
+        nodes.visit(chunk)
+        views = Collector()
+        views.visit(arena.view())
+        self.assertEqual(
+            [node.name for node in views.nodes], [node.name for node in nodes.nodes]
+        )
+        self.assertEqual(
+            [node.value for node in views.nodes if isinstance(node, String)],
+            [node.value for node in nodes.nodes if isinstance(node, String)],
+        )
+
+    def test_parse_arena(self):
+        chunk = parse(SOURCE)
+        arena = parse_arena(SOURCE)
+        self.assertEqual(arena.to_node(), chunk)
+        self.assertEqual(format(arena.view()), format(chunk))
+        self.assertEqual(parse_arena("").to_node(), parse(""))
+        # names and values are stored once
+        arena = parse_arena("a = a + a")
+        self.assertEqual(arena.values.count("a"), 1)
+        self.assertIsInstance(arena.to_node().statements[0], Assign)
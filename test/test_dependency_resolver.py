@@ -10,13 +10,16 @@ from tumfl.AST import (
     Semicolon,
     String,
 )
-from tumfl.config import parse_config
+from tumfl.config import Config, parse_config
 from tumfl.dependency_resolver import (
     Chunk,
     FunctionCall,
     InvalidDependencyError,
+    dependency_graph,
     resolve_recursive,
+    skim_requires,
 )
+from tumfl.parser import parse
 
 
 class TestDependencyResolver(unittest.TestCase):
@@ -38,8 +41,13 @@ class TestDependencyResolver(unittest.TestCase):
     def test_errors(self) -> None:
         with self.assertRaises(InvalidDependencyError):
             resolve_recursive(self.base_path / "empty_path.lua", [self.base_path])
-        with self.assertRaises(InvalidDependencyError):
+        with self.assertRaises(InvalidDependencyError) as e:
             resolve_recursive(self.base_path / "nonexistent_path.lua", [self.base_path])
+        self.assertMultiLineEqual(
+            e.exception.full_error,
+            'Error on line 1:\nrequire("nonexistent")\n       ^\n'
+            "Could not find dependency with name nonexistent\n",
+        )
         with self.assertRaises(InvalidDependencyError):
             resolve_recursive(self.base_path / "number_path.lua", [self.base_path])
 
@@ -62,6 +70,17 @@ class TestDependencyResolver(unittest.TestCase):
         assert isinstance(second_value, Number)
         self.assertEqual(second_value.to_int(), 42)
 
+    def test_config_copies(self):
+        value = parse("a = {1, {2}}").statements[0].expressions[0]
+        chunk = parse("b, c = '$$value', '$$value'")
+        Config({"value": value}).visit(chunk)
+        first, second = chunk.statements[0].expressions
+        self.assertEqual(first, value)
+        self.assertEqual(second, value)
+        self.assertIsNot(first.fields[1].value, second.fields[1].value)
+        self.assertIs(first.fields[1].value.parent_class, first.fields[1])
+        self.assertIs(second.parent_class, chunk.statements[0])
+
     def test_add_source_description(self):
         ast = resolve_recursive(
             self.main_script, [self.base_path], add_source_description=True
@@ -113,3 +132,70 @@ class TestDependencyResolver(unittest.TestCase):
         self.assertEqual(len(func_def.body.statements), 0)
         assert func_def.body.returns is not None
         self.assertEqual(len(func_def.body.returns), 1)
+
+    def test_require_expr_repeated(self):
+        ast = resolve_recursive(
+            self.base_path / "require_expr_twice.lua", [self.base_path]
+        )
+        assert isinstance(ast, Chunk)
+        bodies = [
+            statement.expressions[0].function.body for statement in ast.statements
+        ]
+        self.assertEqual(len(bodies), 3)
+        for body in bodies:
+            self.assertEqual(body, bodies[0])
+            self.assertEqual(body.returns[0].to_int(), 42)
+            self.assertIs(body.returns[0].parent_class, body)
+        self.assertIsNot(bodies[1].returns[0], bodies[2].returns[0])
+
+    def test_skim_requires(self):
+        source = (
+            'local x = require "a" .. b\n'
+            "require{'b', \"c\";}\n"
+            'foo.require("no") foo:require("no")\n'
+            'require("d", {"e"}) require()\n'
+            "local function require(x) end\n"
+            "local r = require\n"
+            "r = require[[f]]"
+        )
+        requires = skim_requires(source)
+        self.assertEqual([require.name for require in requires], list("abcdef"))
+        self.assertEqual((requires[3].token.line, requires[3].token.column), (4, 9))
+        for invalid in (
+            "require(1)",
+            "require({42})",
+            'require({foo = "a"})',
+            'require("a" .. b)',
+            "require(",
+        ):
+            with self.assertRaises(InvalidDependencyError):
+                skim_requires(invalid)
+        with self.assertRaises(InvalidDependencyError) as e:
+            skim_requires("require(0x1p4)")
+        self.assertEqual(
+            str(e.exception),
+            "Wrong require() arguments. Expected string or table, got 0x1p4",
+        )
+
+    def test_dependency_graph(self):
+        graph = dependency_graph(self.main_script, [self.base_path])
+        self.assertEqual(
+            graph,
+            {
+                self.main_script: [
+                    self.base_path / "a.lua",
+                    self.base_path / "b/c.lua",
+                ],
+                self.base_path / "a.lua": [],
+                self.base_path / "b/c.lua": [self.base_path / "b/d.lua"],
+                self.base_path / "b/d.lua": [],
+            },
+        )
+        multi_import = self.base_path / "multi_import.lua"
+        self.assertEqual(
+            list(dependency_graph(multi_import, [self.base_path])[multi_import]),
+            [self.base_path / "a.lua", self.base_path / "b/c.lua"],
+        )
+        for name in ("empty_path", "nonexistent_path", "number_path"):
+            with self.assertRaises(InvalidDependencyError):
+                dependency_graph(self.base_path / f"{name}.lua", [self.base_path])
@@ -0,0 +1,3 @@
+a = require("require_expr_test")
+b = require("require_expr_test")
+c = require("require_expr_test")
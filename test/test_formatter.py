@@ -8,6 +8,7 @@ from tumfl.formatter import (
     Separators,
     _string_ident,
     format,
+    format_stream,
     indent,
     remove_separators,
     resolve_tokens,
@@ -678,6 +679,24 @@ class TestTokenFormatters(unittest.TestCase):
         expected = '-- tumfl\na = {b}\n(print or io.write)("done")\n'
         self.assertEqual(format(chunk), expected)
 
+    def test_format_stream(self):
+        sources = [
+            "",
+            "a=b if 1 then c=d else b=d end return a",
+            "a={b}(print or io.write)('done')",
+            "-- x\nlocal a = 1\n--[[ long\ncomment ]]\nfunction f()\n"
+            + "a()\n" * 6
+            + "end\nfunction g() end\n(f)()\nb = 1",
+            "do\n" + "a()\n" * 6 + "end\nb = 1\ndo\n" + "a()\n" * 6 + "end",
+        ]
+        for source in sources:
+            for style in (FormattingStyle, MinifiedStyle, TestStyle):
+                parts = list(format_stream(Parser(source).iter_statements(), style))
+                expected = format(Parser(source).parse_chunk(), style)
+                self.assertEqual("".join(parts), expected, (source, style))
+        statements = Parser("a = 1\nb = 2\nc = 3").iter_statements()
+        self.assertEqual(next(format_stream(statements)), "-- tumfl\na = 1")
+
     def test_string_ident(self):
         self.assertEqual(
             _string_ident("'abc def'", 0, TestStyle),
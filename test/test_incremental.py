@@ -0,0 +1,168 @@
+import random
+import unittest
+
+from tumfl.AST import Chunk
+from tumfl.error import LexerError, ParserError
+from tumfl.incremental import Edit, StatementIndex, relex, reparse
+from tumfl.lexer import Lexer
+from tumfl.parser import parse
+from tumfl.token import TokenBuffer
+
+SOURCE = """-- header comment
+local a = [==[long
+string]==] .. "short \\n string"
+--[[ long
+comment ]] function foo(b, ...)
+    return b + 0x1F.8p3 * 12.5e-3 -- trailing
+end
+local c = {1, 2, 3}
+"""
+
+
+def dump(tokens: TokenBuffer) -> list[tuple]:
+    return [
+        (token.type, token.value, token.start, token.end, token.comment)
+        for token in tokens
+    ]
+
+
+class TestEdit(unittest.TestCase):
+    def test_apply(self):
+        self.assertEqual(Edit(2, 3, "xy").apply("0123456"), "01xy56")
+        self.assertEqual(Edit(0, 0, "a").apply(""), "a")
+        self.assertEqual(Edit(2, 3, "").shift, -3)
+
+    def test_from_texts(self):
+        self.assertEqual(Edit.from_texts("abcdef", "abXef"), Edit(2, 2, "X"))
+        self.assertEqual(Edit.from_texts("aaa", "aaaa"), Edit(3, 0, "a"))
+        self.assertEqual(Edit.from_texts("abc", ""), Edit(0, 3, ""))
+        self.assertEqual(Edit.from_texts("same", "same"), Edit(4, 0, ""))
+        self.assertEqual(Edit.from_texts("abab", "ab"), Edit(2, 2, ""))
+        self.assertEqual(Edit.from_texts("", "x"), Edit(0, 0, "x"))
+
+
+class TestRelex(unittest.TestCase):
+    def assertRelexed(self, old: str, edit: Edit):
+        new = edit.apply(old)
+        relexed = relex(Lexer(old).tokenize_all(), edit)
+        self.assertEqual(relexed.line_index.text, new)
+        self.assertEqual(dump(relexed), dump(Lexer(new).tokenize_all()))
+
+    def test_simple_edits(self):
+        self.assertRelexed(SOURCE, Edit(SOURCE.index("foo"), 3, "bar_baz"))
+        self.assertRelexed(SOURCE, Edit(SOURCE.index("1, 2"), 1, ""))
+        self.assertRelexed(SOURCE, Edit(0, 0, "x = 1\n"))
+        self.assertRelexed(SOURCE, Edit(len(SOURCE), 0, "print(c)"))
+        self.assertRelexed("a", Edit(1, 0, "b"))
+        self.assertRelexed("a -", Edit(3, 0, "- comment"))
+
+    def test_spanning_edits(self):
+        # open a long bracket string that swallows the start of the long comment
+        self.assertRelexed(SOURCE, Edit(SOURCE.index("--[[ long"), 0, "x = [["))
+        # close a long comment early
+        self.assertRelexed(SOURCE, Edit(SOURCE.index("comment ]]"), 0, "]] x = "))
+        # turn the long comment into a short one
+        self.assertRelexed(SOURCE, Edit(SOURCE.index("--[[ long") + 2, 2, ""))
+        # edit inside a long string
+        self.assertRelexed(SOURCE, Edit(SOURCE.index("string]==]"), 6, "text"))
+        # remove the start of a comment
+        self.assertRelexed(SOURCE, Edit(SOURCE.index("-- trailing"), 2, ""))
+
+    def test_random_edits(self):
+        rng = random.Random(1)
+        alphabet = "ab1 .-[]=\n'\"x"
+        for _ in range(500):
+            offset = rng.randrange(len(SOURCE) + 1)
+            removed = rng.randrange(min(10, len(SOURCE) - offset) + 1)
+            inserted = "".join(rng.choice(alphabet) for _ in range(rng.randrange(5)))
+            edit = Edit(offset, removed, inserted)
+            try:
+                expected = dump(Lexer(edit.apply(SOURCE)).tokenize_all())
+            except LexerError:
+                continue
+            relexed = relex(Lexer(SOURCE).tokenize_all(), edit)
+            self.assertEqual(dump(relexed), expected, edit)
+
+    def test_reuses_tail(self):
+        tokens = Lexer(SOURCE).tokenize_all()
+        relexed = relex(tokens, Edit(SOURCE.index("foo"), 3, "bar"))
+        # the tail was copied from the old buffer, not lexed again
+        last_comment = max(tokens.comments)
+        self.assertIs(relexed.comments[last_comment], tokens.comments[last_comment])
+
+
+class TestReparse(unittest.TestCase):
+    def assertReparsed(self, chunk: Chunk, text: str, edit: Edit | None = None):
+        self.assertIs(reparse(chunk, text, edit), chunk)
+        expected = parse(text)
+        self.assertEqual(chunk, expected)
+        # the representation includes the positions and comments of the tokens
+        self.assertEqual(repr(chunk), repr(expected))
+
+    def test_simple_edits(self):
+        chunk = parse(SOURCE)
+        self.assertReparsed(chunk, SOURCE)
+        text = SOURCE.replace("foo", "bar_baz")
+        self.assertReparsed(chunk, text)
+        self.assertReparsed(chunk, "x = 1\n" + text, Edit(0, 0, "x = 1\n"))
+        text += "x = f\ny = 2\nreturn c"
+        self.assertReparsed(chunk, text)
+        # the inserted arguments continue the statement before the edit
+        self.assertReparsed(chunk, text.replace("y = 2", "(1) y = 2"))
+        self.assertReparsed(chunk, "")
+
+    def test_random_edits(self):
+        rng = random.Random(1)
+        alphabet = "ab1 .-()[]=\n'\"x;"
+        for _ in range(200):
+            chunk = parse(SOURCE)
+            reparse(chunk, SOURCE)
+            text = SOURCE
+            for _ in range(3):
+                offset = rng.randrange(len(text) + 1)
+                removed = rng.randrange(min(10, len(text) - offset) + 1)
+                inserted = "".join(
+                    rng.choice(alphabet) for _ in range(rng.randrange(6))
+                )
+                edit = Edit(offset, removed, inserted)
+                try:
+                    parse(edit.apply(text))
+                except (LexerError, ParserError):
+                    break
+                text = edit.apply(text)
+                self.assertReparsed(chunk, text, edit)
+
+    def test_reuses_statements(self):
+        source = "".join(f"local a{i} = {i}\n" for i in range(10))
+        chunk = parse(source)
+        reparse(chunk, source)
+        old = list(chunk.statements)
+        reparse(chunk, source.replace("a5 = 5", "a5 = 5 + 1"))
+        self.assertEqual(len(chunk.statements), 10)
+        for i, statement in enumerate(chunk.statements):
+            if i in (4, 5):
+                self.assertIsNot(statement, old[i])
+                self.assertIs(statement.parent_class, chunk)
+            else:
+                self.assertIs(statement, old[i])
+        token = chunk.statements[9].token
+        self.assertEqual(
+            (token.start, token.line, token.column), (old[9].token.start, 10, 1)
+        )
+        # the index only holds offsets, the statements end before each newline
+        index = chunk.get_attribute(StatementIndex)
+        assert index is not None
+        text = index.line_index.text
+        self.assertEqual(index.starts[:10], [0] + [i + 1 for i in index.ends[:9]])
+        self.assertEqual(
+            index.ends[:10], [i for i, char in enumerate(text) if char == "\n"]
+        )
+
+    def test_invalid_edit(self):
+        chunk = parse(SOURCE)
+        reparse(chunk, SOURCE)
+        expected = repr(chunk)
+        with self.assertRaises(ParserError):
+            reparse(chunk, SOURCE.replace("foo(b", "foo(("))
+        self.assertEqual(repr(chunk), expected)
+        self.assertReparsed(chunk, SOURCE.replace("foo", "bar"))
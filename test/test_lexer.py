@@ -1,4 +1,7 @@
+import mmap
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 from tumfl.lexer import *
 
@@ -131,6 +134,14 @@ class TestGetLongBrackets(unittest.TestCase):
         with self.assertRaises(LexerError):
             lex.get_long_brackets()
 
+    def test_closing_boundaries(self):
+        lex = Lexer("[=[a]]=]b]=]c")
+        self.assertEqual(lex.get_long_brackets(), "a]")
+        self.assertEqual(lex.current_char, "b")
+        lex = Lexer("[[]]")
+        self.assertEqual(lex.get_long_brackets(), "")
+        self.assertEqual(lex.current_char, None)
+
     def test_no_long_bracket(self):
         lex = Lexer("[=======")
         with self.assertRaises(LexerError):
@@ -148,6 +159,20 @@ class TestSkipComment(unittest.TestCase):
         lex.skip_comment()
         self.assertEqual(lex.current_char, "a")
 
+    def test_exclude_comments(self):
+        lex = Lexer(
+            "--a\n--[[b]]--tumfl: preserve\n--[=[\ntumfl preserve]=]x",
+            include_comments=False,
+        )
+        token = lex.get_next_token()
+        self.assertEqual(token, Token(TokenType.NAME, "x", 0, 0))
+        self.assertEqual(token.comment, ["tumfl: preserve", "\ntumfl preserve"])
+        # only the marker counts, not the word
+        lex = Lexer("-- preserve order\n--[[tumfl]]x", include_comments=False)
+        self.assertIsNone(lex.get_next_token()._comment)
+        lex = Lexer("--a\nx", include_comments=False)
+        self.assertIsNone(lex.get_next_token()._comment)
+
 
 class TestSkipWhitespace(unittest.TestCase):
     def test_skip_whitespace(self):
@@ -235,6 +260,22 @@ class TestGetString(unittest.TestCase):
         lex = Lexer("'\\97lo\\10\\04923\"'")
         self.assertEqual(lex.get_string(), 'alo\n123"')
 
+    def test_unicode_escape(self):
+        lex = Lexer("'\\u{48}i\\u{10FFFF}'")
+        self.assertEqual(lex.get_string(), "Hi\U0010ffff")
+        self.assertEqual(lex.current_char, None)
+        # the closing brace is not part of the string
+        lex = Lexer('"\\u{48}i"')
+        self.assertEqual(lex.get_string(), "Hi")
+        for invalid in ("'\\u48'", "'\\u{}'", "'\\u{48'", "'\\u{123456789}'"):
+            with self.assertRaises(LexerError):
+                Lexer(invalid).get_string()
+
+    def test_escape_at_eof(self):
+        lex = Lexer("'abc\\")
+        with self.assertRaises(LexerError):
+            lex.get_string()
+
 
 class TestNextToken(unittest.TestCase):
     def test_simple(self):
@@ -270,10 +311,147 @@ class TestNextToken(unittest.TestCase):
         self.assertEqual(lex.get_next_token(), Token(TokenType.STRING, "abc", 5, 10))
         self.assertEqual(lex.get_next_token(), Token(TokenType.EOF, "eof", 5, 15))
 
+    def test_positions(self):
+        lex = Lexer("local  abc\t=\n\n  --[[x\n]] 12 ..\r\n\t...")
+        positions = []
+        while (tok := lex.get_next_token()).type != TokenType.EOF:
+            positions.append((tok.type, tok.line, tok.column))
+        self.assertEqual(
+            positions,
+            [
+                (TokenType.LOCAL, 1, 1),
+                (TokenType.NAME, 1, 8),
+                (TokenType.ASSIGN, 1, 12),
+                (TokenType.NUMBER, 4, 4),
+                (TokenType.CONCAT, 4, 7),
+                (TokenType.ELLIPSIS, 5, 2),
+            ],
+        )
+        # the end of file is placed right after the last character
+        for source, position in (
+            ("", (1, 1)),
+            ("a", (1, 2)),
+            ("a  -- b", (1, 8)),
+            ("a\n", (2, 1)),
+        ):
+            lex = Lexer(source)
+            while (tok := lex.get_next_token()).type != TokenType.EOF:
+                pass
+            self.assertEqual((tok.line, tok.column), position)
+
+    def test_tokenize_all(self):
+        source = "#!prelude\nlocal a = {1.5, 'b', [[c]]} -- d\n--e\nreturn a ... nil"
+        lex = Lexer(source)
+        expected = []
+        while (tok := lex.get_next_token()).type != TokenType.EOF:
+            expected.append(tok)
+        expected.append(tok)
+        buffer = Lexer(source).tokenize_all()
+        self.assertEqual(len(buffer), len(expected))
+        for index, (actual, token) in enumerate(zip(buffer, expected)):
+            self.assertEqual(actual, token)
+            self.assertEqual(buffer.type(index), token.type)
+            self.assertEqual(buffer.value(index), token.value)
+            self.assertEqual((actual.start, actual.end), (token.start, token.end))
+            self.assertEqual((actual.line, actual.column), (token.line, token.column))
+            self.assertEqual(actual.comment, token.comment)
+        self.assertEqual(buffer[-2].comment, [])
+        self.assertEqual(buffer[-5].comment, [" d", "e"])
+        cursor = buffer.cursor()
+        for token in expected:
+            self.assertEqual(cursor.get_next_token(), token)
+        self.assertEqual(cursor.get_next_token().type, TokenType.EOF)
+
+    def test_shared_comments(self):
+        lex = Lexer("a b")
+        first, second = lex.get_next_token(), lex.get_next_token()
+        first.comment.append("x")
+        self.assertEqual(second.comment, [])
+
     def test_tokenizer_error(self):
         lex = Lexer("!")
         with self.assertRaises(LexerError):
             lex.get_next_token()
+        lex = Lexer("a = 1\nb = 'x\\q'")
+        with self.assertRaises(LexerError) as e:
+            while lex.get_next_token().type != TokenType.EOF:
+                pass
+        self.assertEqual((e.exception.line, e.exception.column), (1, 7))
+
+
+class TestDialect(unittest.TestCase):
+    def test_keywords(self):
+        self.assertEqual(Lexer("as").get_next_token().type, TokenType.NAME)
+        self.assertEqual(Lexer("as", typed=True).get_next_token().type, TokenType.AS)
+        self.assertEqual(Lexer("is", typed=True).get_next_token().type, TokenType.IS)
+        self.assertNotIn("as", RESERVED_KEYWORDS)
+        self.assertTrue(TYPED_DIALECT.is_keyword("is"))
+        self.assertFalse(LUA_DIALECT.is_keyword("is"))
+
+    def test_independent_lexers(self):
+        untyped = Lexer("as as")
+        typed = Lexer("as as", typed=True)
+        self.assertEqual(untyped.get_next_token().type, TokenType.NAME)
+        self.assertEqual(typed.get_next_token().type, TokenType.AS)
+        self.assertEqual(untyped.get_next_token().type, TokenType.NAME)
+
+    def test_threads(self):
+        source = "local as, is = 1, 2\n" * 200
+
+        def lex(typed: bool) -> set[TokenType]:
+            lexer = Lexer(source, typed=typed)
+            types = set()
+            while (token := lexer.get_next_token()).type != TokenType.EOF:
+                types.add(token.type)
+            return types
+
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(lex, [False, True] * 20))
+        for typed, types in zip([False, True] * 20, results):
+            self.assertEqual(TokenType.AS in types, typed)
+            self.assertEqual(TokenType.NAME in types, not typed)
+
+
+class TestBinary(unittest.TestCase):
+    def test_bytes(self):
+        lex = Lexer(b"local a = '\\xff\\200\\u{e9}\xc3\xa9'")
+        self.assertTrue(lex.binary)
+        for _ in range(3):
+            lex.get_next_token()
+        self.assertEqual(
+            lex.get_next_token(),
+            Token(TokenType.STRING, "\xff\xc8\xc3\xa9\xc3\xa9", 0, 0),
+        )
+        self.assertFalse(Lexer("a").binary)
+
+    def test_buffers(self):
+        source = b"foo = [[\x00\xff]]"
+        expected = Token(TokenType.STRING, "\x00\xff", 0, 0)
+        for buffer in (memoryview(source), bytearray(source)):
+            lex = Lexer(buffer)
+            lex.get_next_token()
+            lex.get_next_token()
+            self.assertEqual(lex.get_next_token(), expected)
+        with tempfile.TemporaryFile() as file:
+            file.write(source)
+            file.flush()
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                lex = Lexer(mapped)
+                lex.get_next_token()
+                lex.get_next_token()
+                self.assertEqual(lex.get_next_token(), expected)
+
+    def test_utf8_encode(self):
+        for code_point in (0, 0x7F, 0x80, 0x7FF, 0x800, 0xFFFF, 0x10000, 0x10FFFF):
+            self.assertEqual(
+                utf8_encode(code_point).encode("latin-1"),
+                chr(code_point).encode("utf-8"),
+            )
+        self.assertEqual(
+            utf8_encode(0x7FFFFFFF).encode("latin-1"), b"\xfd" + b"\xbf" * 5
+        )
+        lex = Lexer(b"'\\u{7FFFFFFF}'")
+        self.assertEqual(lex.get_string(), "\xfd" + "\xbf" * 5)
 
 
 class TestNil(unittest.TestCase):
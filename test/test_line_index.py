@@ -0,0 +1,36 @@
+import unittest
+
+from tumfl.line_index import LineIndex
+
+
+class TestLineIndex(unittest.TestCase):
+    def test_position(self):
+        index = LineIndex("ab\ncd\n\nefg")
+        self.assertEqual(index.position(0), (1, 1))
+        self.assertEqual(index.position(2), (1, 3))
+        self.assertEqual(index.position(3), (2, 1))
+        self.assertEqual(index.position(6), (3, 1))
+        self.assertEqual(index.position(9), (4, 3))
+        self.assertEqual(index.position(10), (4, 4))
+        self.assertEqual(index.line(4), 2)
+        self.assertEqual(index.column(4), 2)
+
+    def test_lazy(self):
+        index = LineIndex("a\nb")
+        self.assertIsNone(index._newlines)
+        self.assertEqual(index.newlines, [1])
+
+    def test_get_line(self):
+        index = LineIndex("ab\ncd\n\nefg")
+        self.assertEqual(index.get_line(1), "ab")
+        self.assertEqual(index.get_line(2), "cd")
+        self.assertEqual(index.get_line(3), "")
+        self.assertEqual(index.get_line(4), "efg")
+
+    def test_excerpt(self):
+        index = LineIndex("ab\ncd\n\nefg")
+        self.assertEqual(index.excerpt(8), "Error on line 4:\nefg\n ^\n")
+        self.assertEqual(
+            index.excerpt(8, context_lines=2), "Error on line 4:\ncd\n\nefg\n ^\n"
+        )
+        self.assertEqual(index.excerpt(0, context_lines=1), "Error on line 1:\nab\n^\n")
@@ -0,0 +1,120 @@
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from tumfl.AST import Chunk, LocalAssign
+from tumfl.dependency_resolver import resolve_recursive
+from tumfl.formatter import format
+from tumfl.parse_cache import CACHE_SUFFIX, ParseCache
+from tumfl.parser import Parser, parse
+
+SOURCE = "-- comment\nlocal a <const> = {1, 'x', f(...)}\nreturn a .. b\n"
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.cache = ParseCache(self.path)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def entries(self) -> list[Path]:
+        return sorted(self.path.glob("*" + CACHE_SUFFIX))
+
+    def test_round_trip(self) -> None:
+        expected = parse(SOURCE)
+        self.assertIsNone(self.cache.load(SOURCE))
+        self.assertEqual(parse(SOURCE, cache=self.cache), expected)
+        self.assertEqual(len(self.entries()), 1)
+        with patch.object(Parser, "parse_chunk") as parse_chunk:
+            chunk = parse(SOURCE, cache=self.cache)
+        parse_chunk.assert_not_called()
+        self.assertEqual(chunk, expected)
+        self.assertEqual(format(chunk), format(expected))
+        self.assertEqual(chunk.comment, expected.comment)
+        self.assertIs(chunk.statements[0].parent_class, chunk)
+        assert isinstance(chunk.statements[0], LocalAssign)
+        token = chunk.statements[0].token
+        self.assertEqual((token.line, token.column), (2, 1))
+
+    def test_key(self) -> None:
+        keys = {
+            ParseCache.key(SOURCE),
+            ParseCache.key(SOURCE, typed=True),
+            ParseCache.key(SOURCE, include_comments=False),
+            ParseCache.key(SOURCE.encode()),
+            ParseCache.key(SOURCE + " "),
+        }
+        self.assertEqual(len(keys), 5)
+        self.assertEqual(
+            ParseCache.key(SOURCE.encode()), ParseCache.key(bytearray(SOURCE.encode()))
+        )
+        parse(SOURCE, cache=self.cache)
+        self.assertIsNone(self.cache.load(SOURCE, typed=True))
+        self.assertIsNone(self.cache.load(SOURCE, include_comments=False))
+        self.assertIsInstance(self.cache.load(SOURCE), Chunk)
+
+    def test_corrupted_entry(self) -> None:
+        parse(SOURCE, cache=self.cache)
+        (entry,) = self.entries()
+        entry.write_bytes(b"garbage")
+        self.assertIsNone(self.cache.load(SOURCE))
+        self.assertEqual(self.entries(), [])
+        self.assertEqual(parse(SOURCE, cache=self.cache), parse(SOURCE))
+
+    def test_eviction(self) -> None:
+        sources = [f"local a = {i}" for i in range(3)]
+        for i, source in enumerate(sources):
+            parse(source, cache=self.cache)
+            os.utime(self.path / (ParseCache.key(source) + CACHE_SUFFIX), (i, i))
+        size = sum(entry.stat().st_size for entry in self.entries())
+        self.cache.load(sources[0])
+        self.cache.max_size = size - 1
+        self.cache.evict()
+        self.assertIsNotNone(self.cache.load(sources[0]))
+        self.assertIsNone(self.cache.load(sources[1]))
+        self.assertIsNotNone(self.cache.load(sources[2]))
+        self.cache.clear()
+        self.assertEqual(self.entries(), [])
+
+    def test_size_tracking(self) -> None:
+        with patch.object(ParseCache, "evict", autospec=True) as evict:
+            evict.side_effect = lambda cache: setattr(cache, "_size", 0)
+            parse(SOURCE, cache=self.cache)
+            # the first store scans the directory, later ones count in memory
+            self.assertEqual(evict.call_count, 1)
+            for i in range(3):
+                parse(f"local a = {i}", cache=self.cache)
+            self.assertEqual(evict.call_count, 1)
+            self.cache.max_size = 0
+            parse("local b", cache=self.cache)
+            self.assertEqual(evict.call_count, 2)
+        self.cache.evict()
+        self.assertEqual(self.entries(), [])
+
+    def test_read_only(self) -> None:
+        expected = parse(SOURCE, cache=self.cache)
+        with patch("os.utime", side_effect=PermissionError):
+            self.assertEqual(self.cache.load(SOURCE), expected)
+
+    def test_fingerprint(self) -> None:
+        key = ParseCache.key(SOURCE)
+        with patch("tumfl.parse_cache.tumfl_fingerprint", return_value="changed"):
+            self.assertNotEqual(ParseCache.key(SOURCE), key)
+        with patch("tumfl.parse_cache.CACHE_FORMAT", -1):
+            self.assertNotEqual(ParseCache.key(SOURCE), key)
+        self.assertEqual(ParseCache.key(SOURCE), key)
+
+    def test_resolver(self) -> None:
+        base_path = Path(__file__).parent / "test_files"
+        expected = resolve_recursive(base_path / "main.lua", [base_path])
+        for _ in range(2):
+            ast = resolve_recursive(
+                base_path / "main.lua", [base_path], cache=self.cache
+            )
+            self.assertEqual(format(ast), format(expected))
+        self.assertGreater(len(self.entries()), 1)
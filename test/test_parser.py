@@ -1,9 +1,25 @@
 import unittest
+from unittest.mock import patch
 
 from tumfl.AST import *
 from tumfl.AST.base_function_definition import BaseFunctionDefinition
+from tumfl.formatter import format
 from tumfl.lexer import Lexer, LexerError
-from tumfl.parser import Hint, Parser, ParserError
+from tumfl.line_index import LineIndex
+from tumfl.parser import (
+    WHAT_ARGUMENTS,
+    WHAT_CONDITION,
+    WHAT_EXPRESSION,
+    WHAT_NAME,
+    WHERE_FUNCTION,
+    WHERE_FUNCTION_CALL,
+    WHERE_INDEX,
+    WHERE_WHILE,
+    Hint,
+    Parser,
+    ParserError,
+    parse,
+)
 from tumfl.token import Token, TokenType
 
 EOF_TOKEN: Token = Token(TokenType.EOF, "eof", 0, 0)
@@ -186,6 +202,183 @@ class TestParser(unittest.TestCase):
         self.assertEqual(len(parser.context_hints), 0)
         self.assertEqual(parser.current_token, EOF_TOKEN)
 
+    def test_unary_exponent(self):
+        parser = Parser("-1^-2^3*4")
+        expected_tree = BinOp.from_token(
+            Token(TokenType.MULT, "*", 0, 0),
+            UnOp.from_token(
+                Token(TokenType.MINUS, "-", 0, 0),
+                BinOp.from_token(
+                    Token(TokenType.EXPONENT, "^", 0, 0),
+                    self.parse_number("1"),
+                    UnOp.from_token(
+                        Token(TokenType.MINUS, "-", 0, 0),
+                        BinOp.from_token(
+                            Token(TokenType.EXPONENT, "^", 0, 0),
+                            self.parse_number("2"),
+                            self.parse_number("3"),
+                        ),
+                    ),
+                ),
+            ),
+            self.parse_number("4"),
+        )
+        self.assertEqual(parser._parse_exp(), expected_tree)
+        self.assertEqual(parser.current_token, EOF_TOKEN)
+
+    def test_deep_nesting(self):
+        depth = 10_000
+        parser = Parser("(" * depth + "1" + ")" * depth + " .. 2" * 5000)
+        node = parser._parse_exp()
+        for _ in range(5000):
+            self.assertIsInstance(node, BinOp)
+            node = node.right
+        self.assertEqual(node, self.parse_number("2"))
+
+    def test_deep_block_nesting(self):
+        depth = 10_000
+        chunk = parse(
+            "do " * depth + "local t = " + "{f(" * depth + ")}" * depth + " end" * depth
+        )
+        block = chunk
+        for _ in range(depth):
+            self.assertIsInstance(block.statements[0], Block)
+            self.assertIs(block.statements[0].parent_class, block)
+            block = block.statements[0]
+        self.assertIsInstance(block.statements[0], LocalAssign)
+
+    def test_deep_index_nesting(self):
+        depth = 20_000
+        node = Parser("a" + ".b" * depth + "[c.d](e)" + "\n")._parse_exp()
+        self.assertIsInstance(node, ExpFunctionCall)
+        node = node.function
+        self.assertIsInstance(node, Index)
+        node = node.lhs
+        for _ in range(depth):
+            self.assertIsInstance(node, NamedIndex)
+            node = node.lhs
+        self.assertEqual(node, self.parse_name("a"))
+        chunk = parse("if a then " * depth + "b()" + " end" * depth)
+        for _ in range(depth):
+            self.assertIsInstance(chunk.statements[0], If)
+            chunk = chunk.statements[0].true
+        self.assertIsInstance(chunk.statements[0], FunctionCall)
+
+    def test_explicit_stack(self):
+        source = (
+            "local function f(a, ...)\n"
+            "  if a then return function() repeat a = a - 1 until a < 0 end\n"
+            "  elseif a == 1 then do end else while a do end end\n"
+            "  for i = 1, 2 do end for k, v in pairs({1, [2] = 3; x = -#a ^ 2}) do end\n"
+            "  a.b[c]:d(e, 'f'){g} = ... or not a and 1 .. 2 .. 3\n"
+            "  goto l ::l:: return (...)\n"
+            "end\n"
+            "function a.b:c() end local x <const>, y = 1\n"
+        )
+        recursive = Parser(source).parse_chunk()
+        parser = Parser(source)
+        parser.max_recursion_depth = 0
+        self.assertEqual(parser.parse_chunk(), recursive)
+        self.assertEqual(parser.context_hints, [])
+        parser = Parser("a = {b = f(function() return 1 + end)}")
+        parser.max_recursion_depth = 0
+        with self.assertRaises(ParserError) as stack_error:
+            parser.parse_chunk()
+        with self.assertRaises(ParserError) as recursive_error:
+            parse("a = {b = f(function() return 1 + end)}")
+        self.assertEqual(stack_error.exception.hints, recursive_error.exception.hints)
+
+    def test_start(self):
+        source = "local a = 1\nreturn a"
+        line_index = LineIndex(source)
+        parser = Parser(source, start=11, line_index=line_index)
+        self.assertEqual(parser.current_token.type, TokenType.RETURN)
+        self.assertIs(parser.current_token.line_index, line_index)
+        self.assertEqual(parser.current_token.line, 2)
+        chunk = parser.parse_chunk()
+        self.assertEqual(chunk.statements, [])
+        self.assertEqual(chunk.returns, [self.parse_name("a")])
+
+    def test_iter_statements(self):
+        source = "-- a\nlocal a = 1\nf(a)\nreturn a, 2"
+        statements = Parser(source).iter_statements()
+        self.assertIsInstance(next(statements), LocalAssign)
+        self.assertIsInstance(next(statements), FunctionCall)
+        with self.assertRaises(StopIteration) as stop:
+            next(statements)
+        chunk = Parser(source).parse_chunk()
+        self.assertEqual(stop.exception.value, chunk.returns)
+        self.assertEqual(list(Parser(source).iter_statements()), chunk.statements)
+        self.assertEqual(list(Parser("").iter_statements()), [])
+
+    def test_lazy_function_bodies(self):
+        source = (
+            "local function f(a)\n"
+            "  if a then return function() repeat a = a - 1 until a < 0 end\n"
+            "  elseif a == 1 then do end else while a do end end\n"
+            "  -- comment\n"
+            "  for i = 1, 2 do end return a\n"
+            "end\n"
+            "t = {g = function(...) return ... end}\n"
+            "return f(1)"
+        )
+        chunk = parse(source, lazy=True)
+        function = chunk.statements[0]
+        self.assertIsInstance(function.body, LazyBlock)
+        self.assertIsInstance(
+            chunk.statements[1].expressions[0].fields[0].value.body, LazyBlock
+        )
+        self.assertEqual(chunk.returns, parse(source).returns)
+        self.assertEqual(len(function.body.statements), 2)
+        self.assertEqual(type(function.body), Block)
+        self.assertIs(function.body.parent_class, function)
+        self.assertIs(function.body.statements[0].parent_class, function.body)
+        self.assertIsInstance(
+            function.body.statements[0].true.returns[0].body, LazyBlock
+        )
+        self.assertEqual(chunk, parse(source))
+        self.assertEqual(parse(source, lazy=True), chunk)
+        self.assertEqual(format(parse(source, lazy=True)), format(chunk))
+        binary = b'function f() return function() return "\\255\xff" end end'
+        self.assertEqual(parse(binary, lazy=True), parse(binary))
+        # clones load their bodies on their own
+        chunk = parse(source, lazy=True)
+        for clone in (chunk.clone(), chunk.clone(lazy=True)):
+            self.assertIsInstance(clone.statements[0].body, LazyBlock)
+            self.assertEqual(format(clone), format(parse(source)))
+            self.assertIsInstance(chunk.statements[0].body, LazyBlock)
+        chunk.statements[0].body.load().statements.pop()
+        clone = chunk.clone()
+        self.assertEqual(format(clone), format(chunk))
+        self.assertNotEqual(clone, parse(source))
+        body = parse("local function f(a) return a + 1 end", lazy=True)
+        body = body.statements[0].body
+        body.load().returns.append(Name(body.token, "b"))
+        self.assertEqual(len(body.clone().returns), 2)
+        self.assertIsNot(body.clone().returns[1], body.returns[1])
+        # errors in a body are only found once it is parsed
+        chunk = parse("function f() a b end\nreturn 1", lazy=True)
+        with self.assertRaises(ParserError) as pe:
+            chunk.statements[0].body.load()
+        self.assertEqual(
+            pe.exception.hints,
+            [Hint(Token(TokenType.FUNCTION, "function", 0, 0), "function", "body")],
+        )
+        with self.assertRaises(ParserError):
+            parse("function f() if a then end", lazy=True)
+        # but unbalanced brackets and blocks are found right away
+        for body in ("a = (1 end", "t = {] end", "repeat end", "do until a end"):
+            with self.assertRaises(ParserError):
+                parse("function f() " + body, lazy=True)
+        # loading starts lexing at the body
+        chunk = parse("x = 1 y = 2 function f() return 1 end", lazy=True)
+        with patch.object(
+            Lexer, "get_next_token", autospec=True, side_effect=Lexer.get_next_token
+        ) as get_next_token:
+            chunk.statements[2].body.load()
+        # return, 1, end, and EOF after the current and the next token
+        self.assertEqual(get_next_token.call_count, 5)
+
     def test_wrong_token(self):
         parser = Parser("a,b+")
         with self.assertRaises(ParserError) as pe:
@@ -534,7 +727,7 @@ class TestParser(unittest.TestCase):
             function_token, [], Block(Token(TokenType.END, "end", 0, 0), [], None)
         )
         repr_test = repr(expected_tree)
-        parser._add_hint("function", "function")
+        parser._add_hint(WHERE_FUNCTION, WHAT_NAME)
         self.assertEqual(parser._parse_funcbody(function_token), expected_tree)
         self.assertEqual(len(parser.context_hints), 0)
         self.assertEqual(parser.current_token, EOF_TOKEN)
@@ -545,7 +738,7 @@ class TestParser(unittest.TestCase):
             Block(Token(TokenType.END, "end", 0, 0), [], None),
         )
         repr_test = repr(expected_tree)
-        parser._add_hint("function", "function")
+        parser._add_hint(WHERE_FUNCTION, WHAT_NAME)
         self.assertEqual(parser._parse_funcbody(function_token), expected_tree)
         self.assertEqual(len(parser.context_hints), 0)
         self.assertEqual(parser.current_token, EOF_TOKEN)
@@ -556,7 +749,7 @@ class TestParser(unittest.TestCase):
             Block(Token(TokenType.END, "end", 0, 0), [], None),
         )
         repr_test = repr(expected_tree)
-        parser._add_hint("function", "function")
+        parser._add_hint(WHERE_FUNCTION, WHAT_NAME)
         self.assertEqual(parser._parse_funcbody(function_token), expected_tree)
         self.assertEqual(len(parser.context_hints), 0)
         self.assertEqual(parser.current_token, EOF_TOKEN)
@@ -570,7 +763,7 @@ class TestParser(unittest.TestCase):
             Block(Token(TokenType.END, "end", 0, 0), [], None),
         )
         repr_test = repr(expected_tree)
-        parser._add_hint("function", "function")
+        parser._add_hint(WHERE_FUNCTION, WHAT_NAME)
         self.assertEqual(parser._parse_funcbody(function_token), expected_tree)
         self.assertEqual(len(parser.context_hints), 0)
         self.assertEqual(parser.current_token, EOF_TOKEN)
@@ -1445,6 +1638,30 @@ class TestParser(unittest.TestCase):
         with self.assertRaises(ParserError):
             parser.parse_chunk()
 
+    def test_bytes(self):
+        source = b"a = '\\xff\\0\xc3\xa9'"
+        parser = Parser(source)
+        expected_tree = self.get_chunk(
+            Assign(
+                Token(TokenType.ASSIGN, "=", 0, 0),
+                [self.parse_name("a")],
+                [self.parse_string("\xff\x00\xc3\xa9")],
+            )
+        )
+        chunk = parser.parse_chunk()
+        self.assertEqual(chunk, expected_tree)
+        self.assertEqual(parser.chunk, source.decode("latin-1"))
+        # binary data round-trips through the formatter
+        formatted = format(chunk)
+        self.assertEqual(formatted, '-- tumfl\na = "\\xff\\x00\\xc3\\xa9"\n')
+        self.assertEqual(Parser(formatted.encode()).parse_chunk(), chunk)
+        # comments keep their bytes, one character each, so the output is latin-1
+        source = b"-- caf\xc3\xa9\nx = 1"
+        formatted = format(parse(source))
+        self.assertEqual(formatted, "-- tumfl\n-- caf\xc3\xa9\nx = 1\n")
+        self.assertIn(b"-- caf\xc3\xa9\n", formatted.encode("latin-1"))
+        self.assertEqual(parse(formatted.encode("latin-1")), parse(source))
+
     def test_unicode_errors(self):
         parser = Parser("a = '\\xff'")
         with self.assertRaises(LexerError):
@@ -1459,6 +1676,52 @@ class TestParser(unittest.TestCase):
         )
         self.assertEqual(parser.parse_chunk(), expected_tree)
 
+    def test_buffered(self):
+        source = (
+            "--c\nlocal a, b = 1, 'x' -- d\nfunction a.b:c(...) return a .. b end\n"
+        )
+        parser = Parser(source, buffered=True)
+        chunk = parser.parse_chunk()
+        self.assertEqual(chunk, Parser(source).parse_chunk())
+        self.assertEqual(chunk.statements[0].comment, ["c"])
+        self.assertEqual(chunk.statements[1].comment, [" d"])
+        self.assertEqual(parser.current_token, EOF_TOKEN)
+        self.assertEqual(
+            (parser.current_token.line, parser.current_token.column), (4, 1)
+        )
+
+    def test_context_hints(self):
+        parser = Parser("a  b")
+        first_token = parser.current_token
+        parser._add_hint(WHERE_WHILE, WHAT_CONDITION)
+        parser._eat_token()
+        parser._add_hint(WHERE_INDEX, WHAT_NAME, first_token)
+        parser._add_hint(WHERE_FUNCTION_CALL, WHAT_ARGUMENTS)
+        parser._switch_hint(WHAT_EXPRESSION)
+        hints = parser.context_hints
+        self.assertEqual(
+            hints,
+            [
+                Hint(first_token, "while", "condition"),
+                Hint(first_token, "index", "name"),
+                Hint(Token(TokenType.NAME, "b", 1, 4), "function call", "expression"),
+            ],
+        )
+        self.assertEqual((hints[2].token.line, hints[2].token.column), (1, 4))
+        parser._remove_hint()
+        self.assertEqual(
+            parser.context_hints,
+            [
+                Hint(first_token, "while", "condition"),
+                Hint(first_token, "index", "name"),
+            ],
+        )
+        parser._drop_hints(0)
+        self.assertEqual(parser.context_hints, [])
+        # reading the hints does not move the parser
+        self.assertEqual(parser.current_token.value, "b")
+        self.assertEqual(parser.next_token.type, TokenType.EOF)
+
     def test_error_message(self):
         parser = Parser("foo()\nbar()\na = ()\nbaz()\n")
         with self.assertRaises(ParserError) as pe:
@@ -0,0 +1,90 @@
+import unittest
+from pathlib import Path
+
+from tumfl.AST import Chunk, LocalAssign, Number
+from tumfl.dependency_resolver import resolve_recursive
+from tumfl.formatter import format
+from tumfl.line_index import LineIndex
+from tumfl.parser import parse
+from tumfl.serialize import MAGIC, dumps, loads
+from tumfl.token import Token, TokenType
+
+SOURCE = """-- header comment
+local a <const>, b = [==[long
+string]==] .. "short \\n string", 0x1F.8p3
+function foo(c, ...) -- trailing
+    local t = {1, 2, [3] = c, d = ...}
+    if c then return t:bar(c.e) elseif not c then goto skip end
+    ::skip::
+    for i = 1, #t, 2 do t[i] = -i end
+    repeat c = c // 2 until c < 1
+    return foo(a)
+end
+return foo
+"""
+
+
+class TestSerialize(unittest.TestCase):
+    def test_round_trip(self):
+        chunk = parse(SOURCE)
+        data = dumps(chunk)
+        self.assertTrue(data.startswith(MAGIC))
+        loaded = loads(data)
+        self.assertIsInstance(loaded, Chunk)
+        self.assertEqual(loaded, chunk)
+        self.assertEqual(format(loaded), format(chunk))
+        assert isinstance(loaded, Chunk)
+        self.assertEqual(loaded.statements[0].comment, chunk.statements[0].comment)
+        self.assertIs(loaded.statements[0].parent_class, loaded)
+        token = loaded.statements[1].token
+        self.assertEqual((token.line, token.column), (4, 1))
+        # strings are stored once
+        self.assertEqual(data.count(b"foo"), 1)
+
+    def test_bytes(self):
+        source = b"local s = '\xff\\xfe'"
+        chunk = parse(source)
+        line_index = LineIndex(str(source, "latin-1"))
+        loaded = loads(dumps(chunk), line_index)
+        self.assertEqual(loaded, chunk)
+        self.assertIs(loaded.token.line_index, line_index)
+
+    def test_positions(self):
+        chunk = parse(SOURCE)
+        with_positions = dumps(chunk)
+        without_positions = dumps(chunk, positions=False)
+        self.assertLess(len(without_positions), len(with_positions))
+        loaded = loads(without_positions)
+        self.assertEqual(loaded, chunk)
+        self.assertEqual(format(loaded), format(chunk))
+        self.assertEqual(loaded.statements[1].token.start, 0)
+
+    def test_subtree(self):
+        chunk = parse(SOURCE)
+        statement = chunk.statements[0]
+        loaded = loads(dumps(statement))
+        self.assertIsInstance(loaded, LocalAssign)
+        self.assertEqual(loaded, statement)
+        self.assertIsNone(loaded.parent_class)
+        number = Number(Token(TokenType.NUMBER, "12", 3, 4), False, "12")
+        loaded = loads(dumps(number))
+        self.assertEqual(loaded, number)
+        self.assertEqual((loaded.token.line, loaded.token.column), (3, 4))
+
+    def test_file_names(self):
+        base_path = Path(__file__).parent / "test_files"
+        chunk = resolve_recursive(base_path / "main.lua", [base_path])
+        loaded = loads(dumps(chunk))
+        self.assertEqual(loaded, chunk)
+        assert isinstance(loaded, Chunk)
+        self.assertEqual(loaded.statements[0].file_name, chunk.statements[0].file_name)
+        # the chunk is from several sources
+        with self.assertRaises(ValueError):
+            loads(dumps(chunk), LineIndex(""))
+
+    def test_invalid(self):
+        data = dumps(parse(SOURCE))
+        with self.assertRaises(ValueError):
+            loads(b"garbage")
+        with self.assertRaises(ValueError):
+            loads(data[:50])
@@ -1,6 +1,8 @@
 from .ast_node import ASTNode
 from .base_function_definition import BaseFunctionDefinition
 from .expression import *
+from .node_list import NodeList
+from .side_table import SideTable
 from .statement import *
 
 # pylint: disable=duplicate-code
@@ -17,6 +19,8 @@ __all__ = [
     "Index",
     "Name",
     "NamedIndex",
+    "NodeList",
+    "SideTable",
     "Nil",
     "Number",
     "String",
@@ -39,6 +43,7 @@ __all__ = [
     "If",
     "IterativeFor",
     "Label",
+    "LazyBlock",
     "AttributedName",
     "LocalAssign",
     "LocalFunctionDefinition",
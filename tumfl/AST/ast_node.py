@@ -1,25 +1,155 @@
 from __future__ import annotations
 
-from abc import ABC
+from abc import ABCMeta
+from copy import copy
+from hashlib import blake2b
 from pathlib import Path
-from typing import Any, Generator, Optional, Type, TypeVar
+from typing import Any, Generator, Optional, SupportsIndex, Type, TypeVar
 from weakref import ReferenceType, ref
 
 from tumfl.token import Token
 from tumfl.utils import generic_str
 
+from .attributed_name import AttributedName
+from .node_list import NodeList
+
 T = TypeVar("T")
+N = TypeVar("N", bound="ASTNode")
+
+DIGEST_SIZE: int = 16
+# appended to the digests of subtrees with unloaded lazy bodies
+UNLOADED: bytes = b"\x00"
+
+# nodes work on the slots of other nodes, and use the slot descriptors directly
+# pylint: disable=protected-access,unnecessary-dunder-call
+
+
+# Slots that are not part of the structure of a node, ignored for comparison and traversal
+_NON_FIELDS: frozenset[str] = frozenset(("name", "token", "comment"))
+# Slots describing the place of a node and its cached state, not copied by clone
+_OWN_SLOTS: frozenset[str] = frozenset(
+    ("_parent_class", "_inherited_file_name", "_digest", "_template")
+)
+
+# the inherited file name of nodes that have not read it yet
+_NOT_INHERITED: tuple[int, Path] = (-1, Path())
+
+
+def _slots(cls: type) -> Generator[str, None, None]:
+    """All slots holding values of instances of a class, from the base class down"""
+    for klass in reversed(cls.__mro__):
+        for slot in klass.__dict__.get("__slots__", ()):
+            if slot not in ("__weakref__", "__dict__"):
+                yield slot
+
+
+class _NodeMeta(ABCMeta):
+    """Metaclass of the nodes, checking for it is a lot faster than the ABC check"""
 
 
-class ASTNode(ABC):
+class ASTNode(metaclass=_NodeMeta):
     """Base class for all AST nodes"""
 
+    # there can be millions of nodes, so none of them has a __dict__
+    __slots__ = (
+        "name",
+        "token",
+        "_parent_class",
+        "_file_name",
+        "_inherited_file_name",
+        "_attributes",
+        "_digest",
+        "_template",
+        "__weakref__",
+    )
+
+    # The fields making up a node (children and plain values), like `ast.AST._fields`.
+    # Unless a class declares them, they are computed from its slots.
+    _fields: tuple[str, ...] = ()
+    # the slot descriptors of the fields, and of the other slots copied as they are by
+    # clone, to get and set them without going through properties or __setattr__
+    _field_members: tuple[Any, ...] = ()
+    _state_members: tuple[Any, ...] = ()
+    # slots caching values computed from the fields, reset when a field is assigned
+    _caches: tuple[str, ...] = ()
+    # whether the class is the lazy clone of a node class, see `clone`
+    _lazy: bool = False
+    # counts the linked nodes moved to another parent and the file names set, inherited
+    # file names cached before are outdated
+    _relinks: int = 0
+    # the file name inherited from the parents, and the relinks it is valid for, only
+    # set once it is read
+    _inherited_file_name: tuple[int, Path]
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if "_fields" not in cls.__dict__:
+            cls._fields = tuple(
+                slot
+                for slot in _slots(cls)
+                if not slot.startswith("_") and slot not in _NON_FIELDS
+            )
+        caches: tuple[Any, ...] = tuple(_member(cls, slot) for slot in cls._caches)
+        for slot in cls.__dict__.get("__slots__", ()):
+            if slot in cls._fields:
+                setattr(cls, slot, _Field(cls.__dict__[slot], caches))
+        cls._field_members = tuple(_member(cls, field) for field in cls._fields)
+        cls._state_members = tuple(
+            _member(cls, slot)
+            for slot in _slots(cls)
+            if slot not in cls._fields and slot not in _OWN_SLOTS
+        )
+
     def __init__(self, token: Token, name: str) -> None:
         self.name: str = name
         self.token: Token = token
         self._parent_class: Optional[ReferenceType[ASTNode]] = None
-        self.file_name: Optional[Path] = None
-        self.attributes: dict[Type[Any], Any] = {}
+        self._file_name: Optional[Path] = None
+        # only few nodes have attributes, so the dict is created on first use
+        self._attributes: Optional[dict[Type[Any], Any]] = None
+        self._digest: Optional[bytes] = None
+        # the node a lazy clone copies its fields from
+        self._template: Optional[ASTNode] = None
+
+    @property
+    def attributes(self) -> dict[Type[Any], Any]:
+        if self._attributes is None:
+            self._attributes = {}
+        return self._attributes
+
+    @property
+    def file_name(self) -> Optional[Path]:
+        """
+        The file a node is from, nodes without their own inherit it from the parent.
+        Inherited names are cached on every node up to the one they come from.
+        """
+        if self._file_name is not None:
+            return self._file_name
+        relinks: int = ASTNode._relinks
+        path: list[ASTNode] = []
+        node: Optional[ASTNode] = self
+        while node is not None:
+            if node._file_name is not None:
+                file_name: Path = node._file_name
+                break
+            generation, inherited = getattr(
+                node, "_inherited_file_name", _NOT_INHERITED
+            )
+            if generation == relinks:
+                file_name = inherited
+                break
+            path.append(node)
+            node = node.parent_class
+        else:
+            return None
+        for node in path:
+            node._inherited_file_name = (relinks, file_name)
+        return file_name
+
+    @file_name.setter
+    def file_name(self, value: Optional[Path]) -> None:
+        self._file_name = value
+        ASTNode._relinks += 1
 
     @property
     def parent_class(self) -> Optional[ASTNode]:
@@ -27,41 +157,297 @@ class ASTNode(ABC):
 
     @parent_class.setter
     def parent_class(self, value: Optional[ASTNode]) -> None:
-        self._parent_class = ref(value) if value is not None else None
+        parent: Optional[ReferenceType[ASTNode]] = (
+            ref(value) if value is not None else None
+        )
+        if self._parent_class is not None and self._parent_class is not parent:
+            self._moved()
+        self._parent_class = parent
+
+    def _moved(self) -> None:
+        """
+        Called before a linked node is linked to another parent. The inherited file
+        names below it may change, and the old parent may still hold it.
+        """
+        ASTNode._relinks += 1
+        parent: Optional[ASTNode] = self.parent_class
+        if parent is not None:
+            parent.invalidate_digest()
+
+    @property
+    def digest(self) -> bytes:
+        """
+        Structural digest of the subtree, equal for equal subtrees. It is built from the
+        digests of the children (like a Merkle tree), and cached until a field of the
+        node or of one of its descendants is assigned.
+
+        Unloaded lazy bodies are digested from their source without parsing them, which
+        marks the digests of their ancestors (see `UNLOADED`). Equal trees with
+        unloaded bodies may have different digests, but compare equal. Nodes holding a
+        child that is linked to another parent (shared between trees) are not cached,
+        as changes of the child do not reach them.
+        """
+        if self._digest is None:
+            if self._lazy:
+                assert self._template is not None
+                self._digest = self._template.digest
+            else:
+                return self.__digest_subtree()
+        return self._digest
+
+    def __digest_subtree(self) -> bytes:
+        from tumfl.AST.statement.lazy_block import LazyBlock
+
+        # iterative, children are digested before their parents
+        stack: list[tuple[ASTNode, int]] = [(self, -1)]
+        # the nodes with their field values and the index of their parent
+        nodes: list[tuple[ASTNode, list[Any], int]] = []
+        shared: set[int] = set()
+        unloaded: set[int] = set()
+        while stack:
+            node, parent = stack.pop()
+            index: int = len(nodes)
+            values: list[Any] = [getattr(node, field) for field in node._fields]
+            nodes.append((node, values, parent))
+            link: ReferenceType[ASTNode] = ref(node)
+            for value in values:
+                children: Any = (value,) if isinstance(type(value), _NodeMeta) else ()
+                if isinstance(value, list):
+                    children = _list_children(value)
+                for child in children:
+                    if child._parent_class is not link:
+                        shared.add(index)
+                    # lazy bodies and lazy clones have digests of their own (the exact
+                    # type check is a lot faster than the ABC instance check)
+                    if (
+                        child._digest is None
+                        and not child._lazy
+                        # pylint: disable-next=unidiomatic-typecheck
+                        and type(child) is not LazyBlock
+                    ):
+                        stack.append((child, index))
+                    elif len(child.digest) > DIGEST_SIZE:
+                        unloaded.add(index)
+        for index in range(len(nodes) - 1, -1, -1):
+            node, values, parent = nodes[index]
+            digest: bytes = blake2b(
+                repr(
+                    (type(node).__name__, [_digest_value(value) for value in values])
+                ).encode("utf-8", "surrogatepass"),
+                digest_size=DIGEST_SIZE,
+            ).digest()
+            if index in unloaded:
+                digest += UNLOADED
+                unloaded.add(parent)
+            if index in shared:
+                shared.add(parent)
+            node._digest = digest
+        for index in shared:
+            if index >= 0:
+                nodes[index][0]._digest = None
+        return digest
+
+    def load_bodies(self) -> None:
+        """Load the lazy bodies in the subtree, and the ones in them"""
+        from tumfl.AST.statement.lazy_block import LazyBlock
+
+        while len(self.digest) > DIGEST_SIZE:
+            # only subtrees with unloaded bodies are searched
+            stack: list[ASTNode] = [self]
+            bodies: list[LazyBlock] = []
+            while stack:
+                node: ASTNode = stack.pop()
+                if isinstance(node, LazyBlock):
+                    bodies.append(node)
+                    continue
+                for child in node._get_children():
+                    if len(child.digest) > DIGEST_SIZE:
+                        stack.append(child)
+            if not bodies:
+                break
+            for body in bodies:
+                body.load()
+
+    def clone(self: N, lazy: bool = False) -> N:
+        """
+        Copy the subtree, the copy is not linked to a parent. Attributes are copied
+        shallowly, and the tokens are shared.
+
+        :param lazy: only copy this node, the fields of the copy (and their fields,
+            and so on) are copied from the original once they are read. This makes
+            copies that are only read in parts, or not at all, a lot cheaper, but the
+            original must not be changed while there are unread copies.
+        :return: the copy
+        """
+        root: N = self.__shell(lazy)
+        if not lazy:
+            # iterative, as generated code might be nested too deep for recursion
+            stack: list[tuple[ASTNode, ASTNode]] = [(self.__source(), root)]
+            while stack:
+                source, node = stack.pop()
+                stack.extend(node.__copy_fields(source, False))
+        return root
+
+    def __source(self) -> ASTNode:
+        """The node the fields are copied from, for lazy clones that were not read"""
+        if self._lazy:
+            assert self._template is not None
+            return self._template
+        return self
+
+    def __shell(self: N, lazy: bool) -> N:
+        """Copy of the node without its fields"""
+        source: ASTNode = self.__source()
+        cls: Type[ASTNode] = type(source)
+        # without fields, there is nothing to copy later
+        lazy = lazy and bool(cls._fields)
+        node: Any = object.__new__(cls.__lazy_class() if lazy else cls)
+        for member in cls._state_members:
+            try:
+                value: Any = member.__get__(source)
+            except AttributeError:
+                # slots a class leaves unset, like the children of an unloaded body
+                continue
+            # comments and attributes
+            if isinstance(value, (list, dict)):
+                value = copy(value)
+            # nodes kept outside the fields, like a loaded body, are not shared
+            elif isinstance(type(value), _NodeMeta):
+                value = value.clone(lazy)
+            member.__set__(node, value)
+        object.__setattr__(node, "_parent_class", None)
+        object.__setattr__(node, "_digest", source._digest)
+        object.__setattr__(node, "_template", source if lazy else None)
+        return node  # type: ignore[no-any-return]
+
+    def __copy_fields(
+        self, source: ASTNode, lazy: bool
+    ) -> list[tuple[ASTNode, ASTNode]]:
+        """
+        Set the fields of a shell to copies of the ones of source
+
+        :return: the children of source, with the shells taking their place
+        """
+        children: list[tuple[ASTNode, ASTNode]] = []
+
+        def shell(child: N) -> N:
+            node: N = child.__shell(lazy)
+            children.append((child.__source(), node))
+            return node
+
+        parent: ReferenceType[ASTNode] = ref(self)
+        # the slots are set directly, the digest of the copy stays valid
+        for field, member in zip(self._fields, self._field_members):
+            value: Any = getattr(source, field)
+            if isinstance(type(value), _NodeMeta):
+                value = shell(value)
+                object.__setattr__(value, "_parent_class", parent)
+            elif isinstance(value, list):
+                value = NodeList(
+                    self,
+                    [
+                        (
+                            shell(item)
+                            if isinstance(type(item), _NodeMeta)
+                            else AttributedName(
+                                shell(item.name),
+                                shell(item.attribute) if item.attribute else None,
+                            )
+                        )
+                        for item in value
+                    ],
+                )
+            member.__set__(self, value)
+        return children
+
+    def __materialize(self) -> None:
+        """Copy the fields of a lazy clone from its template, making it a regular node"""
+        template: ASTNode = self.__source()
+        object.__setattr__(self, "__class__", type(template))
+        self._template = None
+        self.__copy_fields(template, True)
+
+    def __read_lazy(self, name: str) -> Any:
+        # only reached for unset slots, the fields of a lazy clone are read on first use
+        if name not in self._fields:
+            raise AttributeError(name)
+        self.__materialize()
+        return getattr(self, name)
+
+    def __set_lazy(self, name: str, value: Any) -> None:
+        if name in self._fields:
+            # the other fields would otherwise be copied over this one later
+            self.__materialize()
+        object.__setattr__(self, name, value)
+
+    def __reduce_lazy(self, protocol: SupportsIndex) -> Any:
+        self.__materialize()
+        return self.__reduce_ex__(protocol)
+
+    @classmethod
+    def __lazy_class(cls) -> Type[ASTNode]:
+        """
+        Subclass for lazy clones. It has the same name and layout, and turns back into
+        cls once a field is read.
+        """
+        lazy: Optional[Type[ASTNode]] = _LAZY_CLASSES.get(cls)
+        if lazy is None:
+
+            def eq(node: ASTNode, other: Any) -> bool:
+                return node is other or (
+                    isinstance(other, cls) and node.digest == other.digest
+                )
+
+            lazy = _NodeMeta(  # type: ignore[assignment]
+                cls.__name__,
+                (cls,),
+                {
+                    "__slots__": (),
+                    "__module__": cls.__module__,
+                    "__qualname__": cls.__qualname__,
+                    "_lazy": True,
+                    "__getattr__": cls.__read_lazy,
+                    "__setattr__": cls.__set_lazy,
+                    "__reduce_ex__": cls.__reduce_lazy,
+                    "__eq__": eq,
+                    "__hash__": cls.__hash__,
+                },
+            )
+            assert lazy is not None
+            _LAZY_CLASSES[cls] = lazy
+        return lazy
+
+    def invalidate_digest(self) -> None:
+        """
+        Drop the cached digest of this node and its ancestors. This happens when fields
+        are assigned, it is only needed after changing a list that is not a NodeList.
+        """
+        node: Optional[ASTNode] = self
+        # ancestors of a node without digest have none either
+        while node is not None and getattr(node, "_digest", None) is not None:
+            node._digest = None
+            node = node.parent_class
 
     def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
         if not isinstance(other, self.__class__):
             return False
-        return all(
-            callable(getattr(self, i)) or getattr(self, i) == getattr(other, i)
-            for i in self.__dir()
-        )
+        if self.digest == other.digest:
+            return True
+        if len(self.digest) == len(other.digest) == DIGEST_SIZE:
+            return False
+        # unloaded bodies with different sources can still be equal
+        self.load_bodies()
+        other.load_bodies()
+        return self.digest == other.digest
 
     def __repr__(self) -> str:
         return generic_str(self, ["parent_class"])
 
-    def __dir(self) -> Generator[str, None, None]:
-        return (
-            i
-            for i in dir(self)
-            if not i.startswith("_")
-            # ignore "token" for comparison (and parent check)
-            and i
-            not in [
-                "parent_class",
-                "token",
-                "comment",
-                "attributes",
-                "file_name",
-                "name",
-            ]
-        )
-
-    def __get_children(self) -> Generator[ASTNode, None, None]:
-        from tumfl.AST.statement.local_assign import AttributedName
-
-        for name in self.__dir():
-            node: Any = getattr(self, name)
+    def _get_children(self) -> Generator[ASTNode, None, None]:
+        for field in self._fields:
+            node: Any = getattr(self, field)
             if isinstance(node, ASTNode):
                 yield node
             elif isinstance(node, list):
@@ -73,22 +459,99 @@ class ASTNode(ABC):
                         if child.attribute is not None:
                             yield child.attribute
 
+    def link_children(self) -> None:
+        """
+        Link the direct children to this node, and turn list fields into NodeLists.
+        Assigning a field links it, so this is only needed for fields that were set
+        without going through the node.
+        """
+        parent: ReferenceType[ASTNode] = ref(self)
+        for field in self._fields:
+            value: Any = getattr(self, field)
+            # checking the metaclass is a lot faster than the ABC instance check
+            if isinstance(type(value), _NodeMeta):
+                if (
+                    value._parent_class is not None
+                    and value._parent_class is not parent
+                ):
+                    value._moved()
+                value._parent_class = parent
+            elif isinstance(value, list):
+                setattr(self, field, NodeList(self, value))
+
     def parent(
         self, parent: Optional[ASTNode], file_name: Optional[Path] = None
     ) -> None:
-
+        """
+        Set the parent and file name of a node, and relink the whole subtree. Links are
+        kept up to date as nodes are created and replaced, so this is only needed for
+        trees that were modified without them.
+        """
         self.parent_class = parent
         self.file_name = file_name
-        for child in self.__get_children():
-            child.parent(self, child.file_name or file_name)
+        stack: list[ASTNode] = [self]
+        while stack:
+            node: ASTNode = stack.pop()
+            for child in node._get_children():
+                child.parent_class = node
+                stack.append(child)
 
-    def replace(self, replacement: ASTNode) -> None:
-        """Replaces node in-place"""
-        self.__class__ = replacement.__class__  # type: ignore
-        self.__dict__.clear()
-        self.__dict__.update(replacement.__dict__)
-        for child in self.__get_children():
-            child.parent_class = self
+    def _replace_child(self, child: ASTNode, replacement: ASTNode) -> None:
+        for field in self._fields:
+            node: Any = getattr(self, field)
+            if node is child:
+                setattr(self, field, replacement)
+                return
+            if isinstance(node, list):
+                for i, item in enumerate(node):
+                    if item is child:
+                        node[i] = replacement
+                        return
+                    if isinstance(item, AttributedName):
+                        if item.name is child:
+                            item.name = replacement  # type: ignore
+                            self.invalidate_digest()
+                            return
+                        if item.attribute is child:
+                            item.attribute = replacement  # type: ignore
+                            self.invalidate_digest()
+                            return
+        raise ValueError(f"{child.name} is not a child of {self.name}")
+
+    def replace(self, replacement: ASTNode) -> ASTNode:
+        """
+        Replaces node with a shallow copy of replacement. If both classes have the same
+        slots, the node is changed in-place, otherwise the copy takes its place in the
+        parent.
+
+        :param replacement: the node to replace this one with
+        :return: the node now in the tree
+        """
+        parent: Optional[ASTNode] = self.parent_class
+        node: ASTNode = self
+        if replacement._lazy:
+            replacement.__materialize()
+        try:
+            object.__setattr__(self, "__class__", replacement.__class__)
+        except TypeError:
+            if parent is None:
+                raise
+            node = copy(replacement)
+            parent._replace_child(self, node)
+        else:
+            for slot in _slots(type(replacement)):
+                if hasattr(replacement, slot):
+                    object.__setattr__(self, slot, getattr(replacement, slot))
+                elif hasattr(self, slot):
+                    object.__delattr__(self, slot)
+            if hasattr(replacement, "__dict__"):
+                self.__dict__.clear()
+                self.__dict__.update(replacement.__dict__)
+        node.parent_class = parent or replacement.parent_class
+        node.link_children()
+        if parent is not None:
+            parent.invalidate_digest()
+        return node
 
     def remove(self) -> None:
         """Removes a child by replacing it with Semicolon or Boolean"""
@@ -101,25 +564,94 @@ class ASTNode(ABC):
             replacement = Semicolon(self.token)
         else:
             replacement = Boolean(self.token, False)
-        replacement.parent(self.parent_class, self.file_name)
         self.replace(replacement)
 
     def set_attribute(self, value: Any) -> None:
         self.attributes[type(value)] = value
 
     def set_attribute_if_not_exists(self, value: Any) -> None:
-        if type(value) not in self.attributes:
+        if self._attributes is None or type(value) not in self._attributes:
             self.set_attribute(value)
 
     def get_attribute(self, key: Type[T]) -> Optional[T]:
-        return self.attributes.get(key)
+        return None if self._attributes is None else self._attributes.get(key)
 
     def __hash__(self) -> int:
-        return hash(
-            tuple(
-                var
-                for name in self.__dir()
-                if not callable(var := getattr(self, name))
-                and getattr(var, "__hash__", None)
-            )
+        return hash(self.digest)
+
+
+_LAZY_CLASSES: dict[Type[ASTNode], Type[ASTNode]] = {}
+
+
+class _Field(property):
+    """
+    Wraps the slot of a field. Assigning it links the value to the node (as nodes
+    assign their fields in the constructor, trees are linked as they are built) and
+    drops the cached digests.
+    """
+
+    def __init__(self, member: Any, caches: tuple[Any, ...] = ()) -> None:
+        # this runs for every field of every node that is built, so it is kept short
+        set_slot: Any = member.__set__
+
+        def set_field(node: ASTNode, value: Any) -> None:
+            value_type: type = type(value)
+            if isinstance(value_type, _NodeMeta):
+                parent: ReferenceType[ASTNode] = ref(node)
+                if (
+                    value._parent_class is not None
+                    and value._parent_class is not parent
+                ):
+                    value._moved()
+                value._parent_class = parent
+            elif value_type is list:
+                value = NodeList(node, value)
+            set_slot(node, value)
+            # a node that is still being built has no digest, and neither have its
+            # ancestors, so only changes to finished trees walk up the parents
+            try:
+                if node._digest is not None:
+                    node.invalidate_digest()
+            except AttributeError:
+                # copies set their slots one by one, the digest might come later
+                pass
+
+        def set_cached_field(node: ASTNode, value: Any) -> None:
+            set_field(node, value)
+            for cache in caches:
+                cache.__set__(node, None)
+
+        super().__init__(
+            member.__get__, set_cached_field if caches else set_field, member.__delete__
         )
+        self.member: Any = member
+
+
+def _member(cls: type, slot: str) -> Any:
+    """The descriptor of a slot, below the property wrapping it for fields"""
+    for klass in cls.__mro__:
+        if slot in klass.__dict__:
+            descriptor: Any = klass.__dict__[slot]
+            return descriptor.member if isinstance(descriptor, _Field) else descriptor
+    raise AttributeError(slot)
+
+
+def _list_children(items: list[Any]) -> Generator[ASTNode, None, None]:
+    """The nodes in a list field, which might hold the AttributedNames of a LocalAssign"""
+    for item in items:
+        if isinstance(type(item), _NodeMeta):
+            yield item
+        elif item is not None:
+            yield item.name
+            if item.attribute is not None:
+                yield item.attribute
+
+
+def _digest_value(value: Any) -> Any:
+    """Value of a field to digest, with nodes replaced by their digest"""
+    if isinstance(type(value), _NodeMeta):
+        return value.digest
+    if isinstance(value, list):
+        # nodes, or the AttributedNames of a LocalAssign
+        return tuple(item.digest for item in value)
+    return value
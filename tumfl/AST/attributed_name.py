@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from tumfl.AST import Name
+
+
+class AttributedName:
+    __slots__ = ("name", "attribute")
+
+    def __init__(self, name: Name, attribute: Optional[Name] = None):
+        self.name: Name = name
+        self.attribute: Optional[Name] = attribute
+
+    def __repr__(self) -> str:
+        return f"AttributedName(name={self.name!r}, attribute={self.attribute!r})"
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, AttributedName):
+            return self.name == other.name and self.attribute == other.attribute
+        return False
+
+    @property
+    def digest(self) -> bytes:
+        return self.name.digest + (self.attribute.digest if self.attribute else b"")
+
+    def __str__(self) -> str:
+        if self.attribute:
+            return f"{self.name.variable_name} <{self.attribute.variable_name}>"
+        return self.name.variable_name
@@ -16,6 +16,8 @@ if TYPE_CHECKING:
 class BaseFunctionDefinition(ASTNode, ABC):
     """Definition of a lua function, NOT local"""
 
+    __slots__ = ("parameters", "body")
+
     def __init__(
         self,
         token: Token,
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from enum import Enum
 
-from tumfl.token import Token
+from tumfl.token import Token, TokenType
 
 from .expression import Expression
 
@@ -31,102 +31,103 @@ class BinaryOperand(Enum):
     AND = "and"
     OR = "or"
 
-    @property
-    def __lvl2(self) -> tuple[BinaryOperand, ...]:
-        return (
-            BinaryOperand.EQUALS,
-            BinaryOperand.NOT_EQUALS,
-            BinaryOperand.LESS_EQUALS,
-            BinaryOperand.GREATER_EQUALS,
-            BinaryOperand.LESS_THAN,
-            BinaryOperand.GREATER_THAN,
-        )
-
-    @property
-    def __bitwise_operands(self) -> tuple[BinaryOperand, ...]:
-        return (
-            BinaryOperand.BIT_XOR,
-            BinaryOperand.BIT_AND,
-            BinaryOperand.BIT_SHIFT_LEFT,
-            BinaryOperand.BIT_SHIFT_RIGHT,
-            BinaryOperand.CONCAT,
-            BinaryOperand.PLUS,
-            BinaryOperand.MINUS,
-        )
-
-    @property
-    def __lvl8(self) -> tuple[BinaryOperand, ...]:
-        return (
-            BinaryOperand.MULT,
-            BinaryOperand.DIVIDE,
-            BinaryOperand.INTEGER_DIVISION,
-            BinaryOperand.MODULO,
-        )
-
     def get_precedence(self) -> int:
-        if self == BinaryOperand.OR:
-            return 0
-        if self == BinaryOperand.AND:
-            return 1
-        if self in self.__lvl2:
-            return 2
-        if self == BinaryOperand.BIT_OR:
-            return 3
-        if self == BinaryOperand.BIT_XOR:
-            return 4
-        if self == BinaryOperand.BIT_AND:
-            return 5
-        if self in (BinaryOperand.BIT_SHIFT_RIGHT, BinaryOperand.BIT_SHIFT_LEFT):
-            return 6
-        if self == BinaryOperand.CONCAT:
-            return 7
-        if self in (BinaryOperand.PLUS, BinaryOperand.MINUS):
-            return 8
-        if self in self.__lvl8:
-            return 9
-        # precedence 10 is unop
-        if self == BinaryOperand.EXPONENT:
-            return 11
-        assert False, f"Unknown Binary Operand {self}"
+        return PRECEDENCE[self]
 
     def get_optional_brackets(self) -> tuple[BinaryOperand, ...]:
-        if self == BinaryOperand.OR:
-            return (BinaryOperand.AND,)
-        if self == BinaryOperand.AND:
-            return ()
-        if self in self.__lvl2:
-            return self.__lvl2
-        if self == BinaryOperand.BIT_OR:
-            return self.__bitwise_operands
-        if self == BinaryOperand.BIT_XOR:
-            return self.__bitwise_operands
-        if self == BinaryOperand.BIT_AND:
-            return self.__bitwise_operands
-        if self in (BinaryOperand.BIT_SHIFT_RIGHT, BinaryOperand.BIT_SHIFT_LEFT):
-            return self.__bitwise_operands
-        if self == BinaryOperand.CONCAT:
-            return BinaryOperand.PLUS, BinaryOperand.MINUS
-        if self in (BinaryOperand.PLUS, BinaryOperand.MINUS):
-            return self.__lvl8
-        if self in self.__lvl8:
-            return (BinaryOperand.EXPONENT,)
-        # precedence 10 is unop
-        if self == BinaryOperand.EXPONENT:
-            return ()
-        assert False, f"Unknown Binary Operand {self}"
+        return OPTIONAL_BRACKETS[self]
 
     def non_commutative(self) -> bool:
-        if self in (BinaryOperand.MINUS, BinaryOperand.DIVIDE, BinaryOperand.EXPONENT):
-            return True
-        return False
+        return self in NON_COMMUTATIVE
 
     def __repr__(self) -> str:
         return f"BinaryOperand.{self.name}"
 
 
+# Operator precedence, from lowest to highest. Shared by the parser and the formatter.
+PRECEDENCE: dict[BinaryOperand, int] = {
+    BinaryOperand.OR: 0,
+    BinaryOperand.AND: 1,
+    BinaryOperand.EQUALS: 2,
+    BinaryOperand.NOT_EQUALS: 2,
+    BinaryOperand.LESS_EQUALS: 2,
+    BinaryOperand.GREATER_EQUALS: 2,
+    BinaryOperand.LESS_THAN: 2,
+    BinaryOperand.GREATER_THAN: 2,
+    BinaryOperand.BIT_OR: 3,
+    BinaryOperand.BIT_XOR: 4,
+    BinaryOperand.BIT_AND: 5,
+    BinaryOperand.BIT_SHIFT_LEFT: 6,
+    BinaryOperand.BIT_SHIFT_RIGHT: 6,
+    BinaryOperand.CONCAT: 7,
+    BinaryOperand.PLUS: 8,
+    BinaryOperand.MINUS: 8,
+    BinaryOperand.MULT: 9,
+    BinaryOperand.DIVIDE: 9,
+    BinaryOperand.INTEGER_DIVISION: 9,
+    BinaryOperand.MODULO: 9,
+    # precedence 10 is unop
+    BinaryOperand.EXPONENT: 11,
+}
+UNARY_PRECEDENCE: int = 10
+RIGHT_ASSOCIATIVE: frozenset[BinaryOperand] = frozenset(
+    (BinaryOperand.CONCAT, BinaryOperand.EXPONENT)
+)
+NON_COMMUTATIVE: frozenset[BinaryOperand] = frozenset(
+    (BinaryOperand.MINUS, BinaryOperand.DIVIDE, BinaryOperand.EXPONENT)
+)
+_COMPARISONS: tuple[BinaryOperand, ...] = (
+    BinaryOperand.EQUALS,
+    BinaryOperand.NOT_EQUALS,
+    BinaryOperand.LESS_EQUALS,
+    BinaryOperand.GREATER_EQUALS,
+    BinaryOperand.LESS_THAN,
+    BinaryOperand.GREATER_THAN,
+)
+_BITWISE_OPERANDS: tuple[BinaryOperand, ...] = (
+    BinaryOperand.BIT_XOR,
+    BinaryOperand.BIT_AND,
+    BinaryOperand.BIT_SHIFT_LEFT,
+    BinaryOperand.BIT_SHIFT_RIGHT,
+    BinaryOperand.CONCAT,
+    BinaryOperand.PLUS,
+    BinaryOperand.MINUS,
+)
+_MULTIPLICATIVE: tuple[BinaryOperand, ...] = (
+    BinaryOperand.MULT,
+    BinaryOperand.DIVIDE,
+    BinaryOperand.INTEGER_DIVISION,
+    BinaryOperand.MODULO,
+)
+# operands of lower precedence, which are still put in brackets for readability
+OPTIONAL_BRACKETS: dict[BinaryOperand, tuple[BinaryOperand, ...]] = {
+    BinaryOperand.OR: (BinaryOperand.AND,),
+    BinaryOperand.AND: (),
+    **{operand: _COMPARISONS for operand in _COMPARISONS},
+    BinaryOperand.BIT_OR: _BITWISE_OPERANDS,
+    BinaryOperand.BIT_XOR: _BITWISE_OPERANDS,
+    BinaryOperand.BIT_AND: _BITWISE_OPERANDS,
+    BinaryOperand.BIT_SHIFT_LEFT: _BITWISE_OPERANDS,
+    BinaryOperand.BIT_SHIFT_RIGHT: _BITWISE_OPERANDS,
+    BinaryOperand.CONCAT: (BinaryOperand.PLUS, BinaryOperand.MINUS),
+    BinaryOperand.PLUS: _MULTIPLICATIVE,
+    BinaryOperand.MINUS: _MULTIPLICATIVE,
+    **{operand: (BinaryOperand.EXPONENT,) for operand in _MULTIPLICATIVE},
+    BinaryOperand.EXPONENT: (),
+}
+
+
+# looking up the name of the token type goes through two Python level calls
+_BY_TOKEN_TYPE: dict[TokenType, BinaryOperand] = {
+    TokenType[operand.name]: operand for operand in BinaryOperand
+}
+
+
 class BinOp(Expression):
     """Binary Operation, like a + b, 1 and 2 or 4 == b"""
 
+    __slots__ = ("op", "left", "right")
+
     def __init__(
         self, token: Token, op: BinaryOperand, left: Expression, right: Expression
     ) -> None:
@@ -137,6 +138,4 @@ class BinOp(Expression):
 
     @staticmethod
     def from_token(token: Token, left: Expression, right: Expression) -> BinOp:
-        binop: BinaryOperand = BinaryOperand[token.type.name]
-        assert binop
-        return BinOp(token, binop, left, right)
+        return BinOp(token, _BY_TOKEN_TYPE[token.type], left, right)
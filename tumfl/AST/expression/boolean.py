@@ -8,6 +8,8 @@ from .expression import Expression
 class Boolean(Expression):
     """A boolean value (true or false)"""
 
+    __slots__ = ("value",)
+
     def __init__(self, token: Token, value: bool) -> None:
         super().__init__(token, "Boolean")
         self.value: bool = value
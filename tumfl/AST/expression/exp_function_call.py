@@ -10,6 +10,8 @@ from .expression import Expression
 class ExpFunctionCall(Expression):
     """A function call, may be a statement or an expression. Like f(a,b,c) or f()"""
 
+    __slots__ = ("function", "arguments", "has_parentheses")
+
     def __init__(
         self,
         token: Token,
@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class ExpFunctionDefinition(Expression):
     """Definition of a lua function expression"""
 
+    __slots__ = ("parameters", "body")
+
     def __init__(
         self,
         token: Token,
@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class ExpMethodInvocation(Expression):
     """A method invocation, may be a statement or an expression. Like f:b(a,b,c) or f:b()"""
 
+    __slots__ = ("function", "method", "arguments", "has_parentheses")
+
     def __init__(
         self,
         token: Token,
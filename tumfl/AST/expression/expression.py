@@ -5,3 +5,5 @@ from tumfl.AST.ast_node import ASTNode
 
 class Expression(ASTNode, ABC):
     """Base class for all expressions"""
+
+    __slots__ = ()
@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class Index(Variable):
     """A index, like a[1], b[c] or d["abc"]"""
 
+    __slots__ = ("lhs", "variable_name")
+
     def __init__(self, token: Token, lhs: Expression, variable_name: Expression):
         super().__init__(token, "Index")
         self.lhs: Expression = lhs
@@ -8,6 +8,8 @@ from .variable import Variable
 class Name(Variable):
     """The name of the variable, like a, b or very_long_variable_name, NOT a.b"""
 
+    __slots__ = ("variable_name",)
+
     def __init__(self, token: Token, name: str):
         super().__init__(token, "Name")
         self.variable_name: str = name
@@ -20,6 +22,3 @@ class Name(Variable):
 
     def __str__(self) -> str:
         return self.variable_name
-
-    def clone(self) -> Name:
-        return Name(self.token, self.variable_name)
@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class NamedIndex(Variable):
     """A named index, like a.b, c.e, NOT a["b"]"""
 
+    __slots__ = ("lhs", "variable_name")
+
     def __init__(self, token: Token, lhs: Expression, variable_name: Name):
         super().__init__(token, "NamedIndex")
         self.lhs: Expression = lhs
@@ -8,6 +8,8 @@ from .expression import Expression
 class Nil(Expression):
     """The nil value"""
 
+    __slots__ = ()
+
     def __init__(self, token: Token) -> None:
         super().__init__(token, "Nil")
 
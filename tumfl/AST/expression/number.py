@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import math
 from typing import Optional
 
 from tumfl.token import Token, TokenType
@@ -8,7 +9,23 @@ from .expression import Expression
 
 
 class Number(Expression):
-    """A number, still preserved in the original representation, like 1.2, 3 or 0x123f"""
+    """
+    A number, still preserved in the original representation, like 1.2, 3 or 0x123f
+
+    The python value is cached after the first conversion, and dropped again as soon as
+    any part of the representation changes.
+    """
+
+    __slots__ = (
+        "_value",
+        "is_hex",
+        "integer_part",
+        "fractional_part",
+        "exponent",
+        "float_offset",
+    )
+
+    _caches: tuple[str, ...] = ("_value",)
 
     def __init__(
         self,
@@ -20,6 +37,7 @@ class Number(Expression):
         float_offset: Optional[str] = None,
     ):
         super().__init__(token, "Number")
+        self._value: Optional[int | float] = None
         self.is_hex: bool = is_hex
         self.integer_part: Optional[str] = integer_part
         self.fractional_part: Optional[str] = fractional_part
@@ -40,18 +58,31 @@ class Number(Expression):
             float_offset=value[4],
         )
 
+    def to_python(self) -> int | float:
+        """The value of the number, an int for integer literals, a float otherwise"""
+        if self._value is None:
+            if self.exponent or self.fractional_part or self.float_offset:
+                str_repr: str = str(self)
+                self._value = (
+                    float.fromhex(str_repr) if self.is_hex else float(str_repr)
+                )
+            else:
+                assert self.integer_part
+                self._value = int(self.integer_part, 16 if self.is_hex else 10)
+        return self._value
+
     def to_int(self) -> Optional[int]:
-        if self.exponent or self.fractional_part or self.float_offset:
-            # is a float
-            return None
-        assert self.integer_part
-        return int(self.integer_part, 16) if self.is_hex else int(self.integer_part)
+        value: int | float = self.to_python()
+        # floats are never converted to integers
+        return value if isinstance(value, int) else None
 
     def to_float(self) -> float:
-        str_repr: str = str(self)
-        if self.is_hex:
-            return float.fromhex(str_repr)
-        return float(str_repr)
+        value: int | float = self.to_python()
+        try:
+            return float(value)
+        except OverflowError:
+            # very long integer literals are infinite as floats
+            return math.inf
 
     def __str__(self) -> str:
         str_repr: str = ""
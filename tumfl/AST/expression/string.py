@@ -8,6 +8,8 @@ from .expression import Expression
 class String(Expression):
     """A lua string, like "abc" or [[abc]]"""
 
+    __slots__ = ("value",)
+
     def __init__(self, token: Token, value: str) -> None:
         super().__init__(token, "String")
         self.value: str = value
@@ -13,6 +13,8 @@ if TYPE_CHECKING:
 class Table(Expression):
     """A lua table constructor, like {[1]=2, 3; b=4}"""
 
+    __slots__ = ("fields",)
+
     def __init__(self, token: Token, fields: Sequence[TableField]):
         super().__init__(token, "Table")
         self.fields: list[TableField] = list(fields)
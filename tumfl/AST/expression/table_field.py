@@ -13,6 +13,8 @@ if TYPE_CHECKING:
 class TableField(ASTNode, ABC):
     """Base class for all table fields"""
 
+    __slots__ = ("value",)
+
     def __init__(self, token: Token, name: str, value: Expression):
         super().__init__(token, name)
         self.value: Expression = value
@@ -21,6 +23,8 @@ class TableField(ASTNode, ABC):
 class ExplicitTableField(TableField):
     """Table field of the form `[ expr ] = expr`"""
 
+    __slots__ = ("at",)
+
     def __init__(self, token: Token, at: Expression, value: Expression):
         super().__init__(token, "ExplicitTableField", value)
         self.at: Expression = at
@@ -29,6 +33,8 @@ class ExplicitTableField(TableField):
 class NamedTableField(TableField):
     """Table field of the form `Name = expr`"""
 
+    __slots__ = ("field_name",)
+
     def __init__(self, token: Token, field_name: Name, value: Expression):
         super().__init__(token, "NamedTableField", value)
         self.field_name: Name = field_name
@@ -37,5 +43,7 @@ class NamedTableField(TableField):
 class NumberedTableField(TableField):
     """Table field of the form `expr`"""
 
+    __slots__ = ()
+
     def __init__(self, token: Token, value: Expression):
         super().__init__(token, "NumberedTableField", value)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from enum import Enum
 
-from tumfl.token import Token
+from tumfl.token import Token, TokenType
 
 from .expression import Expression
 
@@ -17,9 +17,16 @@ class UnaryOperand(Enum):
         return f"UnaryOperand.{self.name}"
 
 
+_BY_TOKEN_TYPE: dict[TokenType, UnaryOperand] = {
+    TokenType[operand.name]: operand for operand in UnaryOperand
+}
+
+
 class UnOp(Expression):
     """A unary operation, like -a, #c or not true"""
 
+    __slots__ = ("op", "right")
+
     def __init__(self, token: Token, op: UnaryOperand, right: Expression) -> None:
         super().__init__(token, "UnOp")
         self.op: UnaryOperand = op
@@ -27,6 +34,4 @@ class UnOp(Expression):
 
     @staticmethod
     def from_token(token: Token, right: Expression) -> UnOp:
-        unop: UnaryOperand = UnaryOperand[token.type.name]
-        assert unop
-        return UnOp(token, unop, right)
+        return UnOp(token, _BY_TOKEN_TYPE[token.type], right)
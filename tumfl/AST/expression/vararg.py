@@ -8,6 +8,8 @@ from .expression import Expression
 class Vararg(Expression):
     """The vararg expression (...)"""
 
+    __slots__ = ("has_parentheses",)
+
     def __init__(self, token: Token, has_parentheses: bool = False) -> None:
         super().__init__(token, "Vararg")
         self.has_parentheses: bool = has_parentheses
@@ -7,3 +7,5 @@ from .expression import Expression
 
 class Variable(Expression, ABC):
     """Base class for all variable types"""
+
+    __slots__ = ()
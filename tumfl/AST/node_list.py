@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Iterable,
+    Optional,
+    SupportsIndex,
+    TypeVar,
+    overload,
+)
+from weakref import ReferenceType, ref
+
+from .attributed_name import AttributedName
+
+if TYPE_CHECKING:
+    from .ast_node import ASTNode
+
+T = TypeVar("T")
+
+
+class NodeList(list[T]):
+    """
+    List of children of a node. Everything added to it is linked to the node, so parent
+    links stay up to date without walking the tree, and changes drop the digest of the
+    node.
+    """
+
+    __slots__ = ("_owner",)
+
+    def __init__(self, owner: ASTNode, items: Iterable[T] = ()):
+        # called for every list of every node that is built, list.__init__ is a lot
+        # faster than going through super()
+        list.__init__(self, items)
+        self._owner: ReferenceType[ASTNode] = ref(owner)
+        # the owner is assigned the list, which drops its digest
+        self.__link(self)
+
+    def __link(self, items: Iterable[Any]) -> None:
+        # pylint: disable=protected-access
+        owner: ReferenceType[ASTNode] = self._owner
+        for item in items:
+            if isinstance(item, AttributedName):
+                self.__link((item.name,))
+                if item.attribute is not None:
+                    self.__link((item.attribute,))
+            elif item is not None:
+                if item._parent_class is not None and item._parent_class is not owner:
+                    # inherited file names below it may change
+                    item._moved()
+                item._parent_class = owner
+
+    def __changed(self) -> None:
+        owner: Optional[ASTNode] = self._owner()
+        if owner is not None:
+            owner.invalidate_digest()
+
+    def __reduce__(self) -> Any:
+        return NodeList, (self._owner(), list(self))
+
+    def append(self, item: T) -> None:
+        super().append(item)
+        self.__link((item,))
+        self.__changed()
+
+    def extend(self, items: Iterable[T]) -> None:
+        items = list(items)
+        super().extend(items)
+        self.__link(items)
+        self.__changed()
+
+    def insert(self, index: SupportsIndex, item: T) -> None:
+        super().insert(index, item)
+        self.__link((item,))
+        self.__changed()
+
+    def __iadd__(self, items: Iterable[T]) -> NodeList[T]:  # type: ignore[override, misc]
+        self.extend(items)
+        return self
+
+    @overload
+    def __setitem__(self, index: SupportsIndex, item: T) -> None: ...
+
+    @overload
+    def __setitem__(self, index: slice, item: Iterable[T]) -> None: ...
+
+    def __setitem__(self, index: Any, item: Any) -> None:
+        if isinstance(index, slice):
+            item = list(item)
+            super().__setitem__(index, item)
+            self.__link(item)
+        else:
+            super().__setitem__(index, item)
+            self.__link((item,))
+        self.__changed()
+
+    def __delitem__(self, index: SupportsIndex | slice) -> None:
+        super().__delitem__(index)
+        self.__changed()
+
+    def pop(self, index: SupportsIndex = -1) -> T:
+        item: T = super().pop(index)
+        self.__changed()
+        return item
+
+    def remove(self, item: T) -> None:
+        super().remove(item)
+        self.__changed()
+
+    def clear(self) -> None:
+        super().clear()
+        self.__changed()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self.__changed()
+
+    def sort(self, *args: Any, **kwargs: Any) -> None:
+        super().sort(*args, **kwargs)
+        self.__changed()
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Optional, Type, TypeVar
+
+if TYPE_CHECKING:
+    from .ast_node import ASTNode
+
+T = TypeVar("T")
+
+
+class SideTable:
+    """
+    Data of an analysis about nodes, like their attributes, but kept outside of the
+    nodes. Values are keyed by the identity of the node and their type. The nodes are
+    kept alive as long as the table, so an identity is never reused for another node.
+    Everything is released at once with the table, i.e. at the end of a pass.
+    """
+
+    __slots__ = ("_values", "_nodes")
+
+    def __init__(self) -> None:
+        self._values: dict[tuple[int, Type[Any]], Any] = {}
+        self._nodes: dict[int, ASTNode] = {}
+
+    def set(self, node: ASTNode, value: Any) -> None:
+        self._nodes[id(node)] = node
+        self._values[id(node), type(value)] = value
+
+    def set_if_not_exists(self, node: ASTNode, value: Any) -> None:
+        if (id(node), type(value)) not in self._values:
+            self.set(node, value)
+
+    def get(self, node: ASTNode, key: Type[T]) -> Optional[T]:
+        return self._values.get((id(node), key))
+
+    def clear(self) -> None:
+        self._values.clear()
+        self._nodes.clear()
+
+    def __len__(self) -> int:
+        return len(self._values)
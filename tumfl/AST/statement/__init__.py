@@ -1,3 +1,4 @@
+from ..attributed_name import AttributedName
 from .assign import Assign
 from .block import Block
 from .break_ import Break
@@ -8,7 +9,8 @@ from .goto import Goto
 from .if_ import If
 from .iterative_for import IterativeFor
 from .label import Label
-from .local_assign import AttributedName, LocalAssign
+from .lazy_block import LazyBlock
+from .local_assign import LocalAssign
 from .local_function_definition import LocalFunctionDefinition
 from .method_invocation import MethodInvocation
 from .numeric_for import NumericFor
@@ -28,6 +30,7 @@ __all__ = [
     "If",
     "IterativeFor",
     "Label",
+    "LazyBlock",
     "AttributedName",
     "LocalAssign",
     "LocalFunctionDefinition",
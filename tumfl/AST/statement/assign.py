@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class Assign(Statement):
     """The assignment statement, like a,b = 1,nil"""
 
+    __slots__ = ("targets", "expressions")
+
     def __init__(
         self,
         token: Token,
@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class Block(Statement):
     """A block consisting of statements"""
 
+    __slots__ = ("statements", "returns")
+
     def __init__(
         self,
         token: Token,
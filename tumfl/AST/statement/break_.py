@@ -8,5 +8,7 @@ from .statement import Statement
 class Break(Statement):
     """The break statement to exit loops"""
 
+    __slots__ = ()
+
     def __init__(self, token: Token):
         super().__init__(token, "Break")
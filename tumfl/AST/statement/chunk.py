@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class Chunk(Block):
     """Same as block, but individually executable."""
 
+    __slots__ = ()
+
     def __init__(
         self,
         token: Token,
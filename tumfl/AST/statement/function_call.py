@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class FunctionCall(Statement):
     """A function call, may be a statement or an expression. Like f(a,b,c) or f()"""
 
+    __slots__ = ("function", "arguments")
+
     def __init__(
         self,
         token: Token,
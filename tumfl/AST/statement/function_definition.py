@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class FunctionDefinition(Statement):
     """Definition of a lua function, NOT local"""
 
+    __slots__ = ("names", "method_name", "parameters", "body")
+
     def __init__(
         self,
         token: Token,
@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class Goto(Statement):
     """The goto statement"""
 
+    __slots__ = ("label_name",)
+
     def __init__(self, token: Token, label_name: Name):
         super().__init__(token, "Goto")
         self.label_name: Name = label_name
@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class If(Statement):
     """An if statement, may contain a block or other if as false condition"""
 
+    __slots__ = ("test", "true", "false")
+
     def __init__(
         self,
         token: Token,
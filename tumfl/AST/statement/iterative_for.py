@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class IterativeFor(Statement):
     """The iterative for, i.e. using pairs() or ipairs()"""
 
+    __slots__ = ("namelist", "explist", "body")
+
     def __init__(
         self,
         token: Token,
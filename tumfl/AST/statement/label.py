@@ -13,6 +13,8 @@ if TYPE_CHECKING:
 class Label(Statement):
     """A label to be used with goto"""
 
+    __slots__ = ("label_name",)
+
     def __init__(self, token: Token, label_name: Name):
         super().__init__(token, "Label")
         self.label_name: Name = label_name
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from hashlib import blake2b
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from tumfl.AST.ast_node import DIGEST_SIZE, UNLOADED
+
+from .block import Block
+
+if TYPE_CHECKING:
+    from tumfl.AST.ast_node import ASTNode
+    from tumfl.token import Token
+
+
+class LazyBlock(Block):
+    """
+    A function body, that is only parsed once it is used. Reading its statements or
+    returns (or visiting it) parses the body, and replaces it with a regular Block.
+    """
+
+    __slots__ = ("_loader", "_block", "_end")
+    # the children are only known once the body is loaded
+    _fields: tuple[str, ...] = ()
+
+    def __init__(self, token: Token, loader: Callable[[], Block], end: int):
+        """
+        :param token: the token right before the body
+        :param loader: parses the body
+        :param end: where the source of the body ends, at the start of its END
+        """
+        super().__init__(token, [], None)
+        # without them, reading either one is forwarded to __getattr__, which loads them
+        del self.statements, self.returns
+        self._loader: Callable[[], Block] = loader
+        self._block: Optional[Block] = None
+        self._end: int = end
+
+    def load(self) -> Block:
+        """Parse the body, and replace this node with it in the parent"""
+        if self._block is None:
+            block: Block = self._loader()
+            block.comment = self.comment
+            # pylint: disable=protected-access
+            block._attributes = self._attributes
+            if self.parent_class:
+                # the parent gets a shallow copy of the block
+                replaced: ASTNode = self.replace(block)
+                assert isinstance(replaced, Block)
+                block = replaced
+            self._block = block
+        return self._block
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in ("statements", "returns"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+    def __eq__(self, other: Any) -> bool:
+        # bodies with the same source are equal without parsing them
+        if (
+            isinstance(other, LazyBlock)
+            and self._block is None
+            and other._block is None
+            and self.digest == other.digest
+        ):
+            return True
+        return self.load() == other
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+    @property
+    def digest(self) -> bytes:
+        """Digest of the source of the body, until it is loaded"""
+        if self._block is not None:
+            return self._block.digest
+        if self._digest is None:
+            assert self.token.line_index is not None
+            source: str = self.token.line_index.text[self.token.end : self._end]
+            data: bytes = repr(("LazyBlock", source)).encode("utf-8", "surrogatepass")
+            self._digest = blake2b(data, digest_size=DIGEST_SIZE).digest() + UNLOADED
+        return self._digest
+
+    def __repr__(self) -> str:
+        return repr(self.load())
@@ -1,36 +1,20 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Optional, Sequence
+from typing import TYPE_CHECKING, Optional, Sequence
 
+from ..attributed_name import AttributedName
 from .statement import Statement
 
 if TYPE_CHECKING:
-    from tumfl.AST import Expression, Name
+    from tumfl.AST import Expression
     from tumfl.token import Token
 
 
-class AttributedName:
-    def __init__(self, name: Name, attribute: Optional[Name] = None):
-        self.name: Name = name
-        self.attribute: Optional[Name] = attribute
-
-    def __repr__(self) -> str:
-        return f"AttributedName(name={self.name!r}, attribute={self.attribute!r})"
-
-    def __eq__(self, other: Any) -> bool:
-        if isinstance(other, AttributedName):
-            return self.name == other.name and self.attribute == other.attribute
-        return False
-
-    def __str__(self) -> str:
-        if self.attribute:
-            return f"{self.name.variable_name} <{self.attribute.variable_name}>"
-        return self.name.variable_name
-
-
 class LocalAssign(Statement):
     """Assignment of local variables"""
 
+    __slots__ = ("variable_names", "expressions")
+
     def __init__(
         self,
         token: Token,
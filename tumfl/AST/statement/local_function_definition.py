@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class LocalFunctionDefinition(Statement):
     """Definition for a local function"""
 
+    __slots__ = ("function_name", "parameters", "body")
+
     def __init__(
         self,
         token: Token,
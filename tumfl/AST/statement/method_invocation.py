@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class MethodInvocation(Statement):
     """A method invocation, may be a statement or an expression. Like f:b(a,b,c) or f:b()"""
 
+    __slots__ = ("function", "method", "arguments")
+
     def __init__(
         self,
         token: Token,
@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class NumericFor(Statement):
     """The numeric for, i.e. for i=1,10 do"""
 
+    __slots__ = ("variable_name", "start", "stop", "step", "body")
+
     def __init__(
         self,
         token: Token,
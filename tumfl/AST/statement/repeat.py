@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class Repeat(Statement):
     """The repeat ... until loop"""
 
+    __slots__ = ("condition", "body")
+
     def __init__(self, token: Token, condition: Expression, body: Block):
         super().__init__(token, "Repeat")
         self.condition: Expression = condition
@@ -8,5 +8,7 @@ from .statement import Statement
 class Semicolon(Statement):
     """A semicolon"""
 
+    __slots__ = ()
+
     def __init__(self, token: Token):
         super().__init__(token, "Semicolon")
@@ -9,6 +9,8 @@ from tumfl.token import Token
 class Statement(ASTNode, ABC):
     """Baseclass for all statements, must contain comments"""
 
+    __slots__ = ("comment",)
+
     def __init__(self, token: Token, name: str):
         super().__init__(token, name)
         self.comment: list[str] = token.comment
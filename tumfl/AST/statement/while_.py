@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 class While(Statement):
     """The while loop"""
 
+    __slots__ = ("condition", "body")
+
     def __init__(self, token: Token, condition: Expression, body: Block):
         super().__init__(token, "While")
         self.condition: Expression = condition
@@ -16,26 +16,41 @@ except ImportError:
 from tumfl import ParserError, format, minifier
 from tumfl.AST import ASTNode
 from tumfl.config import Config, parse_config
-from tumfl.dependency_resolver import resolve_recursive
-from tumfl.error import TumflError
+from tumfl.dependency_resolver import dependency_graph, resolve_recursive
+from tumfl.error import InvalidDependencyError, TumflError
 from tumfl.formatter import MinifiedStyle
+from tumfl.parse_cache import ParseCache
 
 
 class RunConfig:
     # pylint: disable=too-few-public-methods
     def __init__(
-        self, source: Path, destination: Optional[Path], config: Config, minify: bool
+        self,
+        source: Path,
+        destination: Optional[Path],
+        config: Config,
+        minify: bool,
+        cache: Optional[ParseCache] = None,
     ) -> None:
         self.source: Path = source
         self.destination: Optional[Path] = destination
         self.config: Config = config
         self.minify: bool = minify
+        self.cache: Optional[ParseCache] = cache
 
 
-def compile_file(filename: Path, config: Config, minify: bool) -> str:
+def compile_file(
+    filename: Path, config: Config, minify: bool, cache: Optional[ParseCache] = None
+) -> str:
     source_directory: Path = filename.parent
+    # minified output never contains comments, so don't collect them in the first place
     result: ASTNode = resolve_recursive(
-        filename, [source_directory], add_source_description=True, config=config
+        filename,
+        [source_directory],
+        add_source_description=True,
+        config=config,
+        include_comments=not minify,
+        cache=cache,
     )
     if minify:
         minifier.minify(result)
@@ -47,11 +62,13 @@ def run(config: RunConfig) -> None:
     if not config.destination:
         config.destination = config.source.with_stem(config.source.stem + "_result")
     try:
-        compiled = compile_file(config.source, config.config, config.minify)
+        compiled = compile_file(
+            config.source, config.config, config.minify, config.cache
+        )
     except RuntimeError:
         return
     except TumflError as e:
-        if isinstance(e, ParserError):
+        if isinstance(e, (ParserError, InvalidDependencyError)):
             error(e.full_error)
         else:
             error(e)
@@ -60,6 +77,16 @@ def run(config: RunConfig) -> None:
         f.write(compiled)
 
 
+def list_dependencies(source: Path, config: Config) -> None:
+    try:
+        graph = dependency_graph(source, [source.parent], config)
+    except TumflError as e:
+        error(e.full_error if isinstance(e, InvalidDependencyError) else e)
+        return
+    for module, dependencies in graph.items():
+        print(f"{module}:" + "".join(f" {dependency}" for dependency in dependencies))
+
+
 class EventHandler(FileSystemEventHandler):
     def __init__(self, config: RunConfig):
         self.config: RunConfig = config
@@ -121,6 +148,16 @@ def main() -> None:
         action="store_true",
         help="Minify the output",
     )
+    parser.add_argument(
+        "--list-deps",
+        action="store_true",
+        help="List the dependencies of every module, instead of compiling",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="Cache parsed files in this directory, to skip parsing unchanged files",
+    )
     args = parser.parse_args()
     loglevel = logging.WARN
     if args.verbose == 1:
@@ -132,12 +169,19 @@ def main() -> None:
         datefmt="%Y-%m-%dT%H:%M:%S%z",
         level=loglevel,
     )
+    cache: Optional[ParseCache] = None
+    if args.cache_dir:
+        cache = ParseCache(args.cache_dir)
     config = Config({})
     if args.config_file:
-        config = parse_config(args.config_file)
+        config = parse_config(args.config_file, cache)
     config.prefix = args.config_prefix
-    run_config = RunConfig(args.source_file, args.destination_file, config, args.minify)
-    if args.follow:
+    run_config = RunConfig(
+        args.source_file, args.destination_file, config, args.minify, cache
+    )
+    if args.list_deps:
+        list_dependencies(args.source_file, config)
+    elif args.follow:
         follow(run_config)
     else:
         run(run_config)
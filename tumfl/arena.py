@@ -0,0 +1,512 @@
+from __future__ import annotations
+
+from array import array
+from inspect import isabstract
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Type, Union
+from weakref import ReferenceType, ref
+
+from . import AST
+from .AST import (
+    ASTNode,
+    AttributedName,
+    Chunk,
+    Expression,
+    LazyBlock,
+    NodeList,
+    Statement,
+)
+from .lexer import NumberTuple, Source
+from .line_index import LineIndex
+from .parser import Parser
+from .token import TOKEN_TYPES, Token, TokenBuffer
+
+# the arena builds nodes and tokens from their slots, bypassing their constructors
+# pylint: disable=protected-access,unnecessary-dunder-call
+
+# every class of node that can be stored, the index is the kind of a node
+NODE_CLASSES: list[Type[ASTNode]] = sorted(
+    (
+        cls
+        for cls in vars(AST).values()
+        if isinstance(cls, type)
+        and issubclass(cls, ASTNode)
+        and not isabstract(cls)
+        and cls is not LazyBlock
+    ),
+    key=lambda cls: cls.__name__,
+)
+NODE_KINDS: dict[Type[ASTNode], int] = {
+    cls: kind for kind, cls in enumerate(NODE_CLASSES)
+}
+
+# how a field is stored
+_NONE: int = 0
+_NODE: int = 1
+_VALUE: int = 2
+_LIST: int = 3
+# a list of AttributedNames, stored as pairs of name and attribute
+_NAMES: int = 4
+
+# the buffer code of tokens that don't belong to a source, kept as objects
+_LOOSE: int = 0xFFFF
+
+
+class Arena:
+    """
+    Flat storage for syntax trees, with far fewer objects than the ASTNode classes.
+
+    Every node is an index into parallel arrays of its kind, its token and the position
+    of its fields. The fields of all nodes are tagged entries in one pair of arrays,
+    children are referenced by index, and list fields are runs in `items`, starting
+    with their length. Plain values (names, strings, operands, ...) are kept once in
+    `values`. Tokens are kept in a columnar TokenBuffer per source. The fields are
+    stored in the order of the nodes, so the positions of the fields follow from the
+    kinds of the nodes.
+
+    `view` gives read-only nodes backed by the arena, which the walkers and the
+    formatter can traverse, `to_node` converts (a part of) the arena back to nodes.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self) -> None:
+        self.kinds: array[int] = array("B")
+        self.token_buffers: array[int] = array("H")
+        self.token_indexes: array[int] = array("I")
+        self.firsts: array[int] = array("I")
+        self.tags: array[int] = array("B")
+        self.data: array[int] = array("i")
+        self.items: array[int] = array("i")
+        self.values: list[Any] = []
+        self.buffers: list[TokenBuffer] = []
+        self.loose_tokens: list[Token] = []
+        # only for the nodes that have them
+        self.comments: dict[int, list[str]] = {}
+        self.file_names: dict[int, Path] = {}
+        self.attributes: dict[int, dict[Type[Any], Any]] = {}
+        # the node viewed or converted by default, the last one added
+        self.root: int = 0
+        self.__value_codes: dict[tuple[type, Any], int] = {}
+        self.__buffer_codes: dict[int, int] = {}
+        # tokens of the subtree being added, shared tokens are stored once
+        self.__token_refs: dict[int, tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def add(self, node: ASTNode) -> int:
+        """
+        Add a subtree, lazily parsed bodies in it are loaded
+
+        :param node: root of the subtree
+        :return: the index of the root
+        """
+        self.root = self.__add_node(node)
+        self.__add_fields([(node, self.root)])
+        return self.root
+
+    def _add_chunk(
+        self, token: Token, statements: list[int], returns: Optional[list[Expression]]
+    ) -> int:
+        """Add a chunk of statements that were already added"""
+        chunk: Chunk = Chunk(token, [], returns)
+        self.root = self.__add_node(chunk)
+        self.firsts[self.root] = len(self.tags)
+        pending: list[tuple[ASTNode, int]] = []
+        for field in chunk._fields:
+            if field == "statements":
+                self.tags.append(_LIST)
+                self.data.append(len(self.items))
+                self.items.append(len(statements))
+                self.items.extend(statements)
+            else:
+                self.__add_field(getattr(chunk, field), pending)
+        self.__add_fields(pending)
+        return self.root
+
+    def __add_fields(self, pending: list[tuple[ASTNode, int]]) -> None:
+        """Add the fields of nodes, and of the children that are added on the way"""
+        # children are appended while iterating, so they come in the order of nodes
+        for node, index in pending:
+            self.firsts[index] = len(self.tags)
+            for field in node._fields:
+                self.__add_field(getattr(node, field), pending)
+        self.__token_refs.clear()
+
+    def __add_node(self, node: ASTNode) -> int:
+        index: int = len(self.kinds)
+        self.kinds.append(_kind(node))
+        token: Token = node.token
+        buffer, token_index = self.__add_token(token)
+        self.token_buffers.append(buffer)
+        self.token_indexes.append(token_index)
+        # set once the fields are added
+        self.firsts.append(0)
+        if isinstance(node, Statement) and node.comment is not token._comment:
+            self.comments[index] = list(node.comment)
+        if node._file_name is not None:
+            self.file_names[index] = node._file_name
+        if node._attributes:
+            self.attributes[index] = dict(node._attributes)
+        return index
+
+    def __add_token(self, token: Token) -> tuple[int, int]:
+        if (known := self.__token_refs.get(id(token))) is not None:
+            return known
+        line_index: Optional[LineIndex] = token.line_index
+        buffer: int
+        if line_index is None:
+            buffer = _LOOSE
+            self.loose_tokens.append(token)
+            reference: tuple[int, int] = buffer, len(self.loose_tokens) - 1
+        else:
+            buffer = self.__buffer_codes.setdefault(id(line_index), len(self.buffers))
+            if buffer == len(self.buffers):
+                self.buffers.append(TokenBuffer(line_index))
+            tokens: TokenBuffer = self.buffers[buffer]
+            tokens.append(
+                token.type, token.value, token.start, token.end, token._comment  # type: ignore[arg-type]
+            )
+            reference = buffer, len(tokens) - 1
+        self.__token_refs[id(token)] = reference
+        return reference
+
+    def __add_field(self, value: Any, pending: list[tuple[ASTNode, int]]) -> None:
+        tags: array[int] = self.tags
+        if value is None:
+            tags.append(_NONE)
+            self.data.append(0)
+        elif isinstance(value, ASTNode):
+            tags.append(_NODE)
+            self.data.append(self.__add_child(value, pending))
+        elif isinstance(value, list):
+            items: array[int] = self.items
+            tags.append(
+                _NAMES if value and isinstance(value[0], AttributedName) else _LIST
+            )
+            self.data.append(len(items))
+            items.append(len(value))
+            for item in value:
+                if isinstance(item, AttributedName):
+                    items.append(self.__add_child(item.name, pending))
+                    attribute: Optional[ASTNode] = item.attribute
+                    items.append(
+                        -1
+                        if attribute is None
+                        else self.__add_child(attribute, pending)
+                    )
+                else:
+                    items.append(self.__add_child(item, pending))
+        else:
+            tags.append(_VALUE)
+            code: int = self.__value_codes.setdefault(
+                (type(value), value), len(self.values)
+            )
+            if code == len(self.values):
+                self.values.append(value)
+            self.data.append(code)
+
+    def __add_child(self, node: ASTNode, pending: list[tuple[ASTNode, int]]) -> int:
+        if isinstance(node, LazyBlock):
+            node = node.load()
+        index: int = self.__add_node(node)
+        pending.append((node, index))
+        return index
+
+    def token(self, index: int) -> Token:
+        """The token of a node, as a new Token"""
+        buffer: int = self.token_buffers[index]
+        if buffer == _LOOSE:
+            return self.loose_tokens[self.token_indexes[index]]
+        return self.buffers[buffer][self.token_indexes[index]]
+
+    def comment(self, index: int) -> list[str]:
+        """The comment of a statement"""
+        if index in self.comments:
+            return self.comments[index]
+        buffer: int = self.token_buffers[index]
+        if buffer == _LOOSE:
+            return self.loose_tokens[self.token_indexes[index]].comment
+        return self.buffers[buffer].comments.get(self.token_indexes[index], [])
+
+    def field(self, index: int, position: int, node: Callable[[int], ASTNode]) -> Any:
+        """
+        Get a field of a node
+
+        :param index: the node
+        :param position: the position of the field in `_fields`
+        :param node: gets the node for the index of a child
+        :return: the value of the field
+        """
+        entry: int = self.firsts[index] + position
+        tag: int = self.tags[entry]
+        data: int = self.data[entry]
+        if tag == _NODE:
+            return node(data)
+        if tag == _VALUE:
+            return self.values[data]
+        if tag == _NONE:
+            return None
+        items: array[int] = self.items
+        length: int = items[data]
+        if tag == _LIST:
+            return [node(child) for child in items[data + 1 : data + 1 + length]]
+        return [
+            AttributedName(
+                node(items[position]),  # type: ignore[arg-type]
+                node(items[position + 1]) if items[position + 1] >= 0 else None,  # type: ignore[arg-type]
+            )
+            for position in range(data + 1, data + 1 + 2 * length, 2)
+        ]
+
+    def view(self, index: Optional[int] = None) -> ASTNode:
+        """
+        A read-only node, reading its fields from the arena. It is an instance of a
+        subclass of the class of the node with the same name, so visitors and
+        isinstance checks treat it like the node. Every read of a field creates new
+        views, so nothing is kept alive that is no longer used.
+        """
+        return self.__view(self.root if index is None else index, None)
+
+    def __view(self, index: int, parent: Optional[ReferenceType[ASTNode]]) -> ASTNode:
+        view_class: Any = _view_class(NODE_CLASSES[self.kinds[index]])
+        view: Any = object.__new__(view_class)
+        for member in view_class._view_members:
+            member.__set__(view, None)
+        view._arena = self
+        view._index = index
+        view._parent_class = parent
+        if self.file_names:
+            view._file_name = self.file_names.get(index)
+        if self.attributes:
+            view._attributes = self.attributes.get(index)
+        return view  # type: ignore[no-any-return]
+
+    def _view_field(self, view: ASTNode, position: int) -> Any:
+        parent: ReferenceType[ASTNode] = ref(view)
+        return self.field(
+            view._index,  # type: ignore[attr-defined]
+            position,
+            lambda child: self.__view(child, parent),
+        )
+
+    def to_node(self, index: Optional[int] = None) -> ASTNode:
+        """
+        Convert a subtree to regular nodes
+
+        :param index: the root of the subtree, defaults to the last one added
+        :return: the root node
+        """
+        # pylint: disable=too-many-locals
+        index = self.root if index is None else index
+        kinds: array[int] = self.kinds
+        firsts: array[int] = self.firsts
+        tags: array[int] = self.tags
+        data: array[int] = self.data
+        items: array[int] = self.items
+        values: list[Any] = self.values
+        shell: Callable[[int], ASTNode] = self.__shells()
+        root: ASTNode = shell(index)
+        stack: list[tuple[int, ASTNode]] = [(index, root)]
+        push: Callable[[tuple[int, ASTNode]], None] = stack.append
+        while stack:
+            index, node = stack.pop()
+            parent: ReferenceType[ASTNode] = ref(node)
+            entry: int = firsts[index]
+            for member in _LAYOUTS[kinds[index]][1]:
+                tag: int = tags[entry]
+                position: int = data[entry]
+                entry += 1
+                value: Any
+                if tag == _NODE:
+                    value = shell(position)
+                    value._parent_class = parent
+                    push((position, value))
+                elif tag == _VALUE:
+                    value = values[position]
+                elif tag == _NONE:
+                    value = None
+                elif tag == _LIST:
+                    value = []
+                    for child in items[position + 1 : position + 1 + items[position]]:
+                        value.append(shell(child))
+                        push((child, value[-1]))
+                    value = NodeList(node, value)
+                else:
+                    value = []
+                    for position in range(
+                        position + 1, position + 1 + 2 * items[position], 2
+                    ):
+                        name: ASTNode = shell(items[position])
+                        push((items[position], name))
+                        attribute: Optional[ASTNode] = None
+                        if items[position + 1] >= 0:
+                            attribute = shell(items[position + 1])
+                            push((items[position + 1], attribute))
+                        value.append(AttributedName(name, attribute))  # type: ignore
+                    value = NodeList(node, value)
+                member.__set__(node, value)
+        return root
+
+    def __shells(self) -> Callable[[int], ASTNode]:
+        """Creates nodes without their fields, tokens are shared like in the arena"""
+        tokens: dict[int, Token] = {}
+        kinds: array[int] = self.kinds
+        token_buffers: array[int] = self.token_buffers
+        token_indexes: array[int] = self.token_indexes
+        comments: dict[int, list[str]] = self.comments
+        file_names: dict[int, Path] = self.file_names
+        attributes: dict[int, dict[Type[Any], Any]] = self.attributes
+
+        def shell(index: int) -> ASTNode:
+            cls, _, statement, clear = _LAYOUTS[kinds[index]]
+            node: Any = object.__new__(cls)
+            for set_none in clear:
+                set_none(node, None)
+            buffer: int = token_buffers[index]
+            key: int = buffer << 32 | token_indexes[index]
+            token: Optional[Token] = tokens.get(key)
+            if token is None:
+                token = tokens[key] = self.__copy_token(buffer, token_indexes[index])
+            node.name = cls.__name__
+            node.token = token
+            if statement:
+                node.comment = (
+                    list(comments[index]) if index in comments else token.comment
+                )
+            node._parent_class = None
+            node._file_name = file_names.get(index)
+            node._attributes = dict(attributes[index]) if index in attributes else None
+            node._digest = None
+            node._template = None
+            return node  # type: ignore[no-any-return]
+
+        return shell
+
+    def __copy_token(self, buffer: int, index: int) -> Token:
+        """A token of the arena, not sharing its comment"""
+        if buffer == _LOOSE:
+            token: Token = self.loose_tokens[index]
+            return Token(
+                token.type,
+                token.value,
+                token._line,
+                token._column,
+                list(token.comment),
+                token.start,
+                token.end,
+            )
+        tokens: TokenBuffer = self.buffers[buffer]
+        code: int = tokens.types[index]
+        value: Optional[Union[str, NumberTuple]] = tokens.values[index]
+        comment: Optional[list[str]] = tokens.comments.get(index)
+        return Token(
+            TOKEN_TYPES[code],
+            _TOKEN_VALUES[code] if value is None else value,
+            0,
+            0,
+            list(comment) if comment else None,
+            tokens.starts[index],
+            tokens.ends[index],
+            tokens.line_index,
+        )
+
+
+def _kind(node: ASTNode) -> int:
+    kind: Optional[int] = NODE_KINDS.get(type(node))
+    if kind is None:
+        # lazy clones are subclasses of the classes of nodes
+        kind = next(NODE_KINDS[cls] for cls in type(node).__mro__ if cls in NODE_KINDS)
+    return kind
+
+
+def _layout(cls: Type[ASTNode]) -> tuple[Any, ...]:
+    """
+    The class, the descriptors of its fields, whether it is a statement and the
+    setters of the slots that are None for new nodes
+    """
+    assigned: tuple[str, ...] = (
+        "name",
+        "token",
+        "comment",
+        "_file_name",
+        "_attributes",
+    )
+    return (
+        cls,
+        cls._field_members,
+        issubclass(cls, Statement),
+        tuple(
+            member.__set__
+            for member in cls._state_members
+            if member.__name__ not in assigned
+        ),
+    )
+
+
+_LAYOUTS: list[tuple[Any, ...]] = [_layout(cls) for cls in NODE_CLASSES]
+# reading the value of an enum member is slow
+_TOKEN_VALUES: list[str] = [token_type.value for token_type in TOKEN_TYPES]
+
+_VIEW_CLASSES: dict[Type[ASTNode], Type[ASTNode]] = {}
+
+
+def _view_class(cls: Type[ASTNode]) -> Type[ASTNode]:
+    """Subclass of a node class for views, reading the fields from the arena"""
+    view_class: Optional[Type[ASTNode]] = _VIEW_CLASSES.get(cls)
+    if view_class is not None:
+        return view_class
+
+    def field(position: int) -> property:
+        def get(view: Any) -> Any:
+            return view._arena._view_field(view, position)
+
+        return property(get)
+
+    namespace: dict[str, Any] = {
+        "__slots__": ("_arena", "_index"),
+        "__module__": cls.__module__,
+        "__qualname__": cls.__qualname__,
+        # views are never changed or lazy, so these don't need to be slots
+        "name": cls.__name__,
+        "_template": None,
+        "token": property(lambda view: view._arena.token(view._index)),
+    }
+    if issubclass(cls, Statement):
+        namespace["comment"] = property(lambda view: view._arena.comment(view._index))
+    for position, name in enumerate(cls._fields):
+        namespace[name] = field(position)
+    new_class: Any = type(cls)(cls.__name__, (cls,), namespace)  # type: ignore[misc]
+    # the other slots that are not read from the arena, set to None for new views
+    new_class._view_members = tuple(
+        klass.__dict__[slot]
+        for klass in cls.__mro__
+        for slot in klass.__dict__.get("__slots__", ())
+        if slot not in namespace and slot not in cls._fields and slot != "__weakref__"
+    )
+    _VIEW_CLASSES[cls] = new_class
+    return new_class  # type: ignore[no-any-return]
+
+
+def parse_arena(
+    chunk: Source, include_comments: bool = True, typed: bool = False
+) -> Arena:
+    """
+    Parse a chunk into an arena. Every top-level statement is added as soon as it is
+    parsed, so the nodes of only one statement exist at a time.
+    """
+    parser: Parser = Parser(chunk, typed=typed, include_comments=include_comments)
+    token: Token = parser.current_token
+    arena: Arena = Arena()
+    returns: Optional[list[Expression]] = None
+
+    def top_level() -> Iterator[Statement]:
+        nonlocal returns
+        returns = yield from parser.iter_statements()
+
+    statements: list[int] = [arena.add(statement) for statement in top_level()]
+    # same as Parser.parse_chunk, the comments belong to the first statement
+    token.comment = []
+    arena._add_chunk(token, statements, returns)
+    return arena
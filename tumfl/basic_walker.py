@@ -20,6 +20,10 @@ class NodeVisitor(Generic[T]):
     def __call__(self, node: ASTNode) -> T:
         return self.visit(node)
 
+    def visit_LazyBlock(self, node: LazyBlock) -> T:
+        # a function body of a lazily parsed chunk is parsed on its first visit
+        return self.visit(node.load())
+
 
 class BasicWalker(NodeVisitor[T], ABC):
     # pylint: disable=unused-argument,too-many-public-methods
@@ -1,9 +1,11 @@
 from logging import warning
 from pathlib import Path
+from typing import Optional
 
 from .AST import Assign, ASTNode, Name, String
 from .basic_walker import NoneWalker
 from .dependency_resolver import resolve_recursive
+from .parse_cache import ParseCache
 
 
 class Config(NoneWalker):
@@ -15,7 +17,9 @@ class Config(NoneWalker):
     def visit_String(self, node: String) -> None:
         if node.value.startswith(self.prefix):
             if node.value[len(self.prefix) :] in self.replacements:
-                node.replace(self.replacements[node.value[len(self.prefix) :]])
+                # every placeholder gets its own copy, only copied as far as it is read
+                replacement: ASTNode = self.replacements[node.value[len(self.prefix) :]]
+                node.replace(replacement.clone(lazy=True))
             else:
                 warning(f"Found placeholder with no assigned value: {node.value}")
 
@@ -38,8 +42,8 @@ class ParameterGetter(NoneWalker):
             warning(f"Ignoring config parameter {node}")
 
 
-def parse_config(file: Path) -> Config:
-    chunk: ASTNode = resolve_recursive(file, [file.parent])
+def parse_config(file: Path, cache: Optional[ParseCache] = None) -> Config:
+    chunk: ASTNode = resolve_recursive(file, [file.parent], cache=cache)
     getter = ParameterGetter()
     getter.visit(chunk)
     return Config(getter.parameters)
@@ -18,34 +18,145 @@ from .AST import (
 )
 from .basic_walker import NoneWalker
 from .error import InvalidDependencyError
+from .lexer import Lexer, Source
+from .parse_cache import ParseCache
 from .parser import parse
-from .token import Token
+from .token import Token, TokenBuffer, TokenType
 
 if TYPE_CHECKING:
     from .config import Config
 
 
-def _parse_file(path: Path, config: Optional[Config]) -> Chunk:
+def _parse_file(
+    path: Path,
+    config: Optional[Config],
+    include_comments: bool = True,
+    cache: Optional[ParseCache] = None,
+) -> Chunk:
     with path.open() as f:
         chunk: str = f.read()
-    ast: Chunk = parse(chunk)
-    ast.parent(None, path)
+    ast: Chunk = parse(chunk, include_comments, cache=cache)
+    ast.file_name = path
     if config:
         config.visit(ast)
     return ast
 
 
+class Require:
+    """The literal target of a `require` call, found without parsing"""
+
+    def __init__(self, name: str, token: Token) -> None:
+        self.name: str = name
+        # the string token of the target, for its position
+        self.token: Token = token
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Require):
+            return False
+        return (self.name, self.token.start) == (other.name, other.token.start)
+
+    def __repr__(self) -> str:
+        return f"Require({self.name!r}, {self.token.line}:{self.token.column})"
+
+
+# `require` after one of these is a field or a declaration, not the function
+_NOT_REQUIRE: tuple[TokenType, ...] = (
+    TokenType.DOT,
+    TokenType.COLON,
+    TokenType.FUNCTION,
+)
+
+
+def _skim_argument(
+    text: str, tokens: TokenBuffer, index: int, requires: list[Require]
+) -> int:
+    """Skim a string or a table of strings, and return the index after it"""
+    if tokens.type(index) == TokenType.STRING:
+        requires.append(Require(str(tokens.value(index)), tokens[index]))
+        return index + 1
+    if tokens.type(index) != TokenType.L_CURL:
+        # the value of a number is parsed, the source shows it as it was written
+        got: str = text[tokens.starts[index] : tokens.ends[index]] or "end of file"
+        raise InvalidDependencyError(
+            f"Wrong require() arguments. Expected string or table, got {got}",
+            tokens[index],
+        )
+    index += 1
+    while tokens.type(index) != TokenType.R_CURL:
+        if tokens.type(index) != TokenType.STRING or tokens.type(index + 1) not in (
+            TokenType.COMMA,
+            TokenType.SEMICOLON,
+            TokenType.R_CURL,
+        ):
+            raise InvalidDependencyError(
+                "Wrong require() arguments. Table can only contain strings with no explicit index",
+                tokens[index],
+            )
+        requires.append(Require(str(tokens.value(index)), tokens[index]))
+        index += 1
+        if tokens.type(index) != TokenType.R_CURL:
+            index += 1
+    return index + 1
+
+
+def skim_requires(source: Source, typed: bool = False) -> list[Require]:
+    """
+    Find the literal targets of all `require` calls, only looking at the tokens.
+
+    Accepts the same arguments as resolving: strings and tables of strings, with or
+    without brackets. Other arguments raise an InvalidDependencyError, as they would
+    when resolving.
+
+    :param source: the source to skim
+    :param typed: whether the source is typed lua
+    :return: all targets, in order of appearance
+    """
+    lexer: Lexer = Lexer(source, typed, include_comments=False)
+    tokens: TokenBuffer = lexer.tokenize_all()
+    requires: list[Require] = []
+    for name_index, value in enumerate(tokens.values):
+        if (
+            value != "require"
+            or tokens.type(name_index) != TokenType.NAME
+            or name_index > 0
+            and tokens.type(name_index - 1) in _NOT_REQUIRE
+        ):
+            continue
+        index: int = name_index + 1
+        if tokens.type(index) != TokenType.L_PAREN:
+            if tokens.type(index) in (TokenType.STRING, TokenType.L_CURL):
+                _skim_argument(lexer.text, tokens, index, requires)
+            continue
+        index += 1
+        while tokens.type(index) != TokenType.R_PAREN:
+            index = _skim_argument(lexer.text, tokens, index, requires)
+            if tokens.type(index) == TokenType.COMMA:
+                index += 1
+            elif tokens.type(index) != TokenType.R_PAREN:
+                raise InvalidDependencyError(
+                    "Wrong require() arguments. Expected strings or tables",
+                    tokens[index],
+                )
+    return requires
+
+
 class ResolveDependencies(NoneWalker):
     def __init__(
         self,
         search_path: list[Path],
         add_source_description: bool = False,
         config: Optional[Config] = None,
+        include_comments: bool = True,
+        cache: Optional[ParseCache] = None,
     ):
         self.search_path: list[Path] = search_path
+        self.include_comments: bool = include_comments
+        self.cache: Optional[ParseCache] = cache
         self.found: dict[Path, Optional[list[Name]]] = {}
         self.add_source_description: bool = add_source_description
         self.config: Optional[Config] = config
+        # modules inlined more than once are parsed a second time, and then cloned
+        self.templates: dict[Path, Optional[Chunk]] = {}
 
     def _find_file_in_path(self, name: str, start_path: Path) -> Optional[Path]:
         parts: list[str] = name.split(".")
@@ -61,6 +172,48 @@ class ResolveDependencies(NoneWalker):
                     return current_path
         return None
 
+    def _configured(self, name: str) -> str:
+        """A require target, with the config placeholder replaced"""
+        if self.config and name.startswith(self.config.prefix):
+            replacement: Optional[ASTNode] = self.config.replacements.get(
+                name[len(self.config.prefix) :]
+            )
+            if isinstance(replacement, String):
+                return replacement.value
+        return name
+
+    def dependency_graph(self, path: Path) -> dict[Path, list[Path]]:
+        """
+        Find all modules a file depends on, by skimming the tokens of every module
+        instead of parsing it.
+
+        :param path: the file to start from
+        :return: the direct dependencies of every module, in the order they are found
+        """
+        graph: dict[Path, list[Path]] = {}
+        pending: list[Path] = [path]
+        while pending:
+            module: Path = pending.pop(0)
+            if module in graph:
+                continue
+            with module.open() as f:
+                source: str = f.read()
+            dependencies: list[Path] = []
+            for require in skim_requires(source):
+                name: str = self._configured(require.name).replace("/", ".")
+                dependency: Optional[Path] = self._find_file_in_path(
+                    name, module.parent
+                )
+                if not dependency:
+                    raise InvalidDependencyError(
+                        f"Could not find dependency with name {name}", require.token
+                    )
+                if dependency not in dependencies:
+                    dependencies.append(dependency)
+                    pending.append(dependency)
+            graph[module] = dependencies
+        return graph
+
     def _get_block_dependency_path(
         self, name: str, start_path: Path, token: Token, deduplicate: bool = True
     ) -> Optional[Path]:
@@ -74,6 +227,20 @@ class ResolveDependencies(NoneWalker):
         self.found[path] = None
         return path
 
+    def _parse_module(self, path: Path) -> Chunk:
+        """
+        Parse a module to inline. The first time, the chunk is returned as it is,
+        the second parse is kept as template, and every further use gets a lazy clone.
+        """
+        if path not in self.templates:
+            self.templates[path] = None
+            return _parse_file(path, self.config, self.include_comments, self.cache)
+        template: Optional[Chunk] = self.templates[path]
+        if template is None:
+            template = _parse_file(path, self.config, self.include_comments, self.cache)
+            self.templates[path] = template
+        return template.clone(lazy=True)
+
     def __find_and_parse(
         self, name: str, node: ASTNode, deduplicate: bool, results: list[Block]
     ) -> None:
@@ -83,8 +250,9 @@ class ResolveDependencies(NoneWalker):
             name, node.file_name.parent, node.token, deduplicate
         )
         if dependency_path:
-            chunk: Chunk = _parse_file(dependency_path, self.config)
+            chunk: Chunk = self._parse_module(dependency_path)
             ast = Block(chunk.token, chunk.statements, chunk.returns)
+            ast.file_name = dependency_path
             if self.add_source_description:
                 ast.comment.insert(0, f"Sourced from {dependency_path}")
             results.append(ast)
@@ -137,8 +305,7 @@ class ResolveDependencies(NoneWalker):
             if isinstance(ast, Semicolon):
                 node.remove()
             else:
-                node.replace(ast)
-                self.visit(ast)
+                self.visit(node.replace(ast))
         else:
             super().visit_FunctionCall(node)
 
@@ -150,8 +317,7 @@ class ResolveDependencies(NoneWalker):
             function = ExpFunctionDefinition(node.token, [], ast)
             node.function = function
             call = ExpFunctionCall(node.token, function, [])
-            node.replace(call)
-            self.visit(call)
+            self.visit(node.replace(call))
         else:
             super().visit_ExpFunctionCall(node)
 
@@ -161,9 +327,24 @@ def resolve_recursive(
     search_path: list[Path],
     add_source_description: bool = False,
     config: Optional[Config] = None,
+    include_comments: bool = True,
+    cache: Optional[ParseCache] = None,
 ) -> ASTNode:
-    ast = _parse_file(path, config)
-    resolver = ResolveDependencies(search_path, add_source_description, config=config)
+    ast = _parse_file(path, config, include_comments, cache)
+    resolver = ResolveDependencies(
+        search_path,
+        add_source_description,
+        config=config,
+        include_comments=include_comments,
+        cache=cache,
+    )
     resolver.visit(ast)
-    ast.parent(None, None)
     return ast
+
+
+def dependency_graph(
+    path: Path,
+    search_path: list[Path],
+    config: Optional[Config] = None,
+) -> dict[Path, list[Path]]:
+    return ResolveDependencies(search_path, config=config).dependency_graph(path)
@@ -25,6 +25,11 @@ class InvalidDependencyError(TumflError):
     def __init__(self, message: str, token: Token):
         super().__init__(message)
         self.token: Token = token
+        # Fully rendered error message, pointing into the source if the token has one
+        self.full_error: str = message + "\n"
+        if token.line_index is not None:
+            excerpt: str = token.line_index.excerpt(token.start, context_lines=1)
+            self.full_error = excerpt + self.full_error
 
 
 class LexerError(TumflError):
@@ -1,10 +1,17 @@
+# pylint: disable=too-many-lines
 from __future__ import annotations
 
 import string
 from enum import Enum
-from typing import Any, Iterator, Literal, Optional, Sequence, Type
+from typing import Any, Iterable, Iterator, Literal, Optional, Sequence, Type
 
 from .AST import *
+from .AST.expression.bin_op import (
+    NON_COMMUTATIVE,
+    OPTIONAL_BRACKETS,
+    PRECEDENCE,
+    UNARY_PRECEDENCE,
+)
 from .basic_walker import BasicWalker
 
 
@@ -159,19 +166,53 @@ class Formatter(BasicWalker[Retype]):
             *self._format_args(node.expressions),
         ]
 
+    def _format_statement(self, statement: Statement) -> Retype:
+        result: Retype = []
+        if self.s.INCLUDE_COMMENTS and statement.comment:
+            for comment in statement.comment:
+                result += self._format_comment(comment)
+        return result + self.visit(statement) + [Separators.Statement]
+
+    def _format_returns(self, returns: Sequence[Expression]) -> Retype:
+        opt_space: tuple[Separators, ...] = (Separators.Space,) if returns else ()
+        return ["return", *opt_space, *self._format_args(returns), Separators.Statement]
+
+    def visit_statements(self, statements: Iterable[Statement]) -> Iterator[Retype]:
+        """
+        Format top-level statements one by one, the same as visit_Chunk would.
+
+        If `statements` is a generator returning the returns of the chunk (like
+        Parser.iter_statements), those are formatted as the last statement.
+
+        :param statements: the statements to format
+        :return: the token stream of every statement
+        """
+        iterator: Iterator[Statement] = iter(statements)
+        previous: Optional[Retype] = None
+        returns: Optional[Sequence[Expression]] = None
+        while True:
+            try:
+                statement: Statement = next(iterator)
+            except StopIteration as stop:
+                returns = stop.value
+                break
+            if previous is not None:
+                yield previous
+            previous = self._format_statement(statement)
+        if returns is not None:
+            if previous is not None:
+                yield previous
+            previous = self._format_returns(returns)
+        if previous is not None:
+            # the same as visit_Chunk, the last statement is not separated
+            yield previous[:-1]
+
     def visit_Block(self, node: Block) -> Retype:
         result: Retype = ["do", Separators.Block, Separators.Indent]
         for statement in node.statements:
-            if self.s.INCLUDE_COMMENTS and statement.comment:
-                for comment in statement.comment:
-                    result += self._format_comment(comment)
-            result += self.visit(statement) + [Separators.Statement]
+            result += self._format_statement(statement)
         if node.returns is not None:
-            opt_space: tuple[Separators, ...] = (
-                (Separators.Space,) if node.returns else ()
-            )
-            returns: Retype = self._format_args(node.returns)
-            result += ["return", *opt_space, *returns, Separators.Statement]
+            result += self._format_returns(node.returns)
         result += [Separators.DeIndent, "end"]
         return result
 
@@ -296,21 +337,23 @@ class Formatter(BasicWalker[Retype]):
     def _need_brackets(
         self, own_node: BinOp, other_node: Expression, care_unop: bool
     ) -> bool:
-        own_precedence: int = own_node.op.get_precedence()
+        own_precedence: int = PRECEDENCE[own_node.op]
         return (
             self.s.ADD_ALL_BRACKETS
             or isinstance(other_node, BinOp)
             and (
-                own_precedence > other_node.op.get_precedence()
+                own_precedence > PRECEDENCE[other_node.op]
                 or self.s.ADD_CLOSE_BRACKETS
-                and other_node.op in own_node.op.get_optional_brackets()
-                or other_node.op.non_commutative()
-                and own_precedence == other_node.op.get_precedence()
+                and other_node.op in OPTIONAL_BRACKETS[own_node.op]
+                or other_node.op in NON_COMMUTATIVE
+                and own_precedence == PRECEDENCE[other_node.op]
             )
             or (care_unop or self.s.ADD_CLOSE_BRACKETS)
             and isinstance(other_node, UnOp)
             and (
-                own_precedence > 10 or self.s.ADD_CLOSE_BRACKETS and own_precedence >= 9
+                own_precedence > UNARY_PRECEDENCE
+                or self.s.ADD_CLOSE_BRACKETS
+                and own_precedence >= UNARY_PRECEDENCE - 1
             )
         )
 
@@ -527,14 +570,19 @@ def add_semi(tokens: Retype) -> None:
             next_str = tokens[i - 1]
             # This is guranteed by __remove_orphaned_tokens
             assert isinstance(next_str, str)
-            if (
-                next_str[-1] in string.ascii_letters
-                or next_str[-1] in string.digits
-                or next_str[-1] == ")"
-            ):
+            if __is_continuable(next_str):
                 tokens.insert(i + 1, Separators.Semicolon)
 
 
+def __is_continuable(last_token: str) -> bool:
+    """Whether a statement ending with this token would be continued by a bracket"""
+    return (
+        last_token[-1] in string.ascii_letters
+        or last_token[-1] in string.digits
+        or last_token[-1] == ")"
+    )
+
+
 def search_token(
     start_idx: int, direction: Literal[1, -1], tokens: Retype
 ) -> str | Separators:
@@ -563,6 +611,13 @@ def remove_separators(token_stream: Retype) -> None:
     """
     # Add a dummy token so that there is definitely a valid final token to look for
     token_stream.append("/")
+    __remove_inner_separators(token_stream)
+    # Remove the dummy token again
+    token_stream.pop()
+
+
+def __remove_inner_separators(token_stream: Retype) -> None:
+    """Remove all unnecessary separators, except for the first and the last token"""
     for i in range(len(token_stream) - 2, 0, -1):
         if isinstance(own_token := token_stream[i], Separators):
             if own_token not in (
@@ -579,8 +634,6 @@ def remove_separators(token_stream: Retype) -> None:
                 or not sep_required(previous_token[-1], next_token[0])
             ):
                 token_stream.pop(i)
-    # Remove the dummy token again
-    token_stream.pop()
 
 
 def __get_indentation_width(style: Type[FormattingStyle]) -> int:
@@ -884,7 +937,8 @@ def format(ast: ASTNode, style: Optional[Type[FormattingStyle]] = None) -> str:
 
     :param ast: The AST Node to format, usually a chunk
     :param style: Optional style definition
-    :return: Formatted lua
+    :return: Formatted lua. Trees parsed from bytes hold one character per byte, so
+        their output has to be encoded as latin-1, not utf-8
     """
     style = style or FormattingStyle
     formatter: Formatter = Formatter(style)
@@ -906,3 +960,193 @@ def format(ast: ASTNode, style: Optional[Type[FormattingStyle]] = None) -> str:
         end = ""
     formatted = join_tokens(token_stream)
     return "\n".join(line.rstrip() for line in formatted.split("\n")).strip() + end
+
+
+def __stream_segments(
+    formatter: Formatter, statements: Iterable[Statement]
+) -> Iterator[Retype]:
+    """The token streams of all statements, with the orphaned tokens removed"""
+    # segments are never empty, so an empty one means there is none
+    previous: Retype = []
+    for segment in formatter.visit_statements(statements):
+        __remove_orphaned_tokens(segment)
+        if not segment:
+            continue
+        add_semi(segment)
+        # add_semi for the separator between this and the previous statement
+        first_string: str = next(
+            (token for token in segment if isinstance(token, str)), "/"
+        )
+        if first_string.startswith("(") and previous[-1:] == [Separators.Statement]:
+            last_string = previous[-2]
+            assert isinstance(last_string, str)
+            if __is_continuable(last_string):
+                segment.insert(0, Separators.Semicolon)
+        if previous:
+            yield previous
+        previous = segment
+    if previous:
+        yield previous
+
+
+def __stream_remove_separators(segments: Iterator[Retype]) -> Iterator[Retype]:
+    """
+    remove_separators for a stream of statements. The separators at the borders of a
+    statement depend on the neighbouring tokens, the last token of the previous
+    statement before, and the first token of the next one after removing separators.
+    """
+    before: Optional[str | Separators] = None
+    segment: Optional[Retype] = next(segments, None)
+    while segment is not None:
+        following: Optional[Retype] = next(segments, None)
+        last: str | Separators = search_token(len(segment) - 1, -1, segment)
+        after: str | Separators = "/"
+        if following is not None:
+            preview: Retype = [last, *following, "/"]
+            __remove_inner_separators(preview)
+            after = search_token(1, 1, preview)
+        context: Retype = [] if before is None else [before]
+        token_stream: Retype = [*context, *segment, after]
+        __remove_inner_separators(token_stream)
+        yield token_stream[len(context) : -1]
+        before = last
+        segment = following
+
+
+def __stream_indent_brackets(
+    segments: Iterator[Retype], style: Type[FormattingStyle]
+) -> Iterator[Retype]:
+    for segment in segments:
+        indent_brackets(segment, style)
+        yield segment
+
+
+def __stream_spacing(
+    segments: Iterator[Retype], style: Type[FormattingStyle]
+) -> Iterator[Retype]:
+    """
+    add_spacing for a stream of statements, if the style uses spacing. Yields pieces
+    that can be resolved one by one. The spacer in front of a long statement is inserted
+    after the previous top-level statement separator, so everything after it is kept
+    until the next separator decides whether a spacer is needed.
+    """
+    spacing: bool = style.BLOCK_SPACER > 0
+    piece: Retype = []
+    # whether the piece since the last top-level separator starts with a spacer
+    spaced: bool = False
+    seen_statement: bool = False
+    line_breaks: int = 0
+    for segment in segments:
+        to_add: set[int] = set()
+        splits: dict[int, bool] = {}
+        index: int = 0
+        while index < len(segment):
+            token = segment[index]
+            if token == Separators.Indent:
+                index, newlines = __inner_add_spacing(segment, index + 1, to_add, style)
+                line_breaks += newlines
+            elif token == Separators.Newline:
+                line_breaks += 1
+            elif isinstance(token, str):
+                line_breaks += token.count("\n")
+            elif token == Separators.Statement:
+                splits[index] = (
+                    spacing and line_breaks > style.BLOCK_SPACER and seen_statement
+                )
+                seen_statement = True
+                line_breaks = 0
+            index += 1
+        if not spacing:
+            to_add.clear()
+        for index, token in enumerate(segment):
+            if index in to_add:
+                piece.append(Separators.Newline)
+            piece.append(token)
+            if index in splits:
+                if splits[index] and not spaced:
+                    piece.insert(0, Separators.Newline)
+                yield piece
+                spaced = splits[index]
+                piece = [Separators.Newline] if spaced else []
+        # a spacer in front of a single newline is dropped again by resolve_tokens,
+        # so it does not matter whether the next separator adds one (i.e. functions)
+        if (
+            len(piece) > 1
+            and piece[0] == Separators.Newline
+            and piece[1] != Separators.Newline
+        ):
+            spaced = True
+        if piece and (spaced or not spacing or not seen_statement):
+            yield piece
+            piece = []
+    yield piece
+
+
+def __strip_lines(parts: Iterator[str], end: str) -> Iterator[str]:
+    """Strip every line, and the whole text, while it is still being generated"""
+    line: str = ""
+    started: bool = False
+    empty_lines: int = 0
+    for part in parts:
+        *lines, line = (line + part).split("\n")
+        result: str = ""
+        for complete in lines:
+            complete = complete.rstrip()
+            if not started:
+                complete = complete.lstrip()
+                started = bool(complete)
+                result += complete
+            elif complete:
+                result += "\n" * (empty_lines + 1) + complete
+                empty_lines = 0
+            else:
+                empty_lines += 1
+        if result:
+            yield result
+    line = line.strip() if not started else line.rstrip()
+    if line and started:
+        line = "\n" * (empty_lines + 1) + line
+    yield line + end
+
+
+def format_stream(
+    statements: Iterable[Statement], style: Optional[Type[FormattingStyle]] = None
+) -> Iterator[str]:
+    """
+    Format top-level statements as they come in, i.e. from Parser.iter_statements.
+
+    The output is the same as formatting the chunk, split into parts. Only a few
+    statements are kept at a time, so the output can be written while parsing.
+
+    :param statements: The statements to format, a generator may return the returns
+    :param style: Optional style definition
+    :return: Formatted lua, in parts
+    """
+    style = style or FormattingStyle
+    segments: Iterator[Retype] = __stream_segments(Formatter(style), statements)
+    if style.REMOVE_UNNECESSARY_CHARS:
+        segments = __stream_remove_separators(segments)
+    if style.LINE_WIDTH > 0:
+        segments = __stream_indent_brackets(segments, style)
+
+    def resolve() -> Iterator[str]:
+        header: Retype = [f"--{style.COMMENT_SEP}tumfl", Separators.Newline]
+        newline: bool = False
+        for piece in __stream_spacing(segments, style):
+            piece[0:0] = header
+            header = []
+            __remove_orphaned_tokens(piece)
+            # resolve_tokens drops a newline directly after a resolved newline
+            if newline and piece and piece[0] == Separators.Newline:
+                piece[0] = ""
+            ends_with_newline: bool = bool(piece) and piece[-1] == Separators.Newline
+            resolve_tokens(piece, style)
+            if piece:
+                newline = ends_with_newline and piece[-1] != ""
+            indent(piece, style.INDENTATION)
+            yield join_tokens(piece)
+
+    end = style.STATEMENT_SEPARATOR
+    if style.REMOVE_UNNECESSARY_CHARS:
+        end = ""
+    return __strip_lines(resolve(), end)
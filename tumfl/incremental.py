@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Optional, Sequence
+
+from .AST import ASTNode, Chunk, Expression, Statement
+from .basic_walker import NoneWalker
+from .lexer import Lexer
+from .line_index import LineIndex
+from .parser import Parser
+from .token import Token, TokenBuffer, TokenType
+
+
+class Edit:
+    """
+    A single edit of a source: `removed` characters at `offset` are replaced by `inserted`
+    """
+
+    def __init__(self, offset: int, removed: int, inserted: str) -> None:
+        self.offset: int = offset
+        self.removed: int = removed
+        self.inserted: str = inserted
+
+    @property
+    def shift(self) -> int:
+        """How far everything after the edit moves"""
+        return len(self.inserted) - self.removed
+
+    def apply(self, text: str) -> str:
+        return text[: self.offset] + self.inserted + text[self.offset + self.removed :]
+
+    @staticmethod
+    def from_texts(old: str, new: str) -> Edit:
+        """
+        Get the smallest single edit that turns one text into another
+
+        :param old: the text before the edit
+        :param new: the text after the edit
+        :return: the edit
+        """
+        max_common: int = min(len(old), len(new))
+        # binary searches over slice comparisons, which run in C instead of a char loop
+        low: int = 0
+        high: int = max_common
+        while low < high:
+            middle: int = (low + high + 1) // 2
+            if old[:middle] == new[:middle]:
+                low = middle
+            else:
+                high = middle - 1
+        prefix: int = low
+        low, high = 0, max_common - prefix
+        while low < high:
+            middle = (low + high + 1) // 2
+            if old[len(old) - middle :] == new[len(new) - middle :]:
+                low = middle
+            else:
+                high = middle - 1
+        suffix: int = low
+        return Edit(prefix, len(old) - prefix - suffix, new[prefix : len(new) - suffix])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Edit):
+            return False
+        return (self.offset, self.removed, self.inserted) == (
+            other.offset,
+            other.removed,
+            other.inserted,
+        )
+
+    def __repr__(self) -> str:
+        return f"Edit({self.offset}, {self.removed}, {self.inserted!r})"
+
+
+def _restart_index(tokens: TokenBuffer, offset: int) -> int:
+    """
+    Index of the first token to relex. All tokens before it end strictly before the
+    edit, so the character that ended them is untouched, and they can't change.
+    """
+    low: int = 0
+    high: int = len(tokens)
+    # binary search for the first token that does not end before the offset
+    while low < high:
+        middle: int = (low + high) // 2
+        if tokens.ends[middle] < offset:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _matches(tokens: TokenBuffer, index: int, token: Token, shift: int) -> bool:
+    """Whether an old token is the same as a relexed one, once moved by `shift`"""
+    return (
+        tokens.starts[index] + shift == token.start
+        and tokens.ends[index] + shift == token.end
+        and tokens.type(index) == token.type
+        and tokens.value(index) == token.value
+        and tokens.comments.get(index, []) == token.comment
+    )
+
+
+def relex(
+    tokens: TokenBuffer,
+    edit: Edit,
+    typed: bool = False,
+    ignore_unicode_errors: bool = False,
+    include_comments: bool = True,
+) -> TokenBuffer:
+    """
+    Lex a source again after an edit, only relexing the tokens around the edit
+
+    Lexing restarts at the last token boundary before the edit, and stops as soon as a
+    relexed token after the edit is identical to a (shifted) old one. From there on, the
+    old tokens are reused with shifted offsets. Since the lexer only looks at the source
+    from a token boundary on, long brackets and comments spanning the edit are
+    relexed as a whole.
+
+    :param tokens: the tokens of the source before the edit
+    :param edit: the edit to apply
+    :param typed: the same as for the lexer that produced `tokens`
+    :param ignore_unicode_errors: the same as for the lexer that produced `tokens`
+    :param include_comments: the same as for the lexer that produced `tokens`
+    :return: the tokens of the edited source
+    """
+    text: str = edit.apply(tokens.line_index.text)
+    result: TokenBuffer = TokenBuffer(LineIndex(text))
+    restart: int = _restart_index(tokens, edit.offset)
+    result.extend(tokens, 0, restart)
+    lexer: Lexer = Lexer(text, typed, ignore_unicode_errors, include_comments)
+    lexer.seek(tokens.ends[restart - 1] if restart else 0)
+    # old tokens starting after the edit are candidates to resynchronize with
+    edit_end: int = edit.offset + edit.removed
+    candidate: int = restart
+    resync: Optional[int] = None
+    while True:
+        token: Token = lexer.get_next_token()
+        if token.start >= edit.offset + len(edit.inserted):
+            while (
+                candidate < len(tokens)
+                and tokens.starts[candidate] + edit.shift < token.start
+            ):
+                candidate += 1
+            if (
+                candidate < len(tokens)
+                and tokens.starts[candidate] >= edit_end
+                and _matches(tokens, candidate, token, edit.shift)
+            ):
+                resync = candidate
+                break
+        # only synthesized tokens have boolean values
+        assert not isinstance(token.value, bool)
+        result.append(token.type, token.value, token.start, token.end, token.comment)
+        if token.type == TokenType.EOF:
+            break
+    if resync is not None:
+        result.extend(tokens, resync, shift=edit.shift)
+    return result
+
+
+class StatementIndex:
+    """
+    Where the top-level statements of a chunk start, and where their last tokens end.
+
+    Attached to chunks by `reparse`, the last entry of both lists belongs to the end of
+    the chunk (the return statement, or nothing but EOF).
+    """
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(
+        self, line_index: LineIndex, starts: list[int], ends: list[int]
+    ) -> None:
+        self.line_index: LineIndex = line_index
+        self.starts: list[int] = starts
+        self.ends: list[int] = ends
+
+
+class _TokenShifter(NoneWalker):
+    """Moves the tokens of reused statements by the length difference of an edit"""
+
+    def __init__(self, shift: int) -> None:
+        self.shift: int = shift
+        # nodes may share a token, which must only move once
+        self.shifted: set[int] = set()
+
+    def visit(self, node: ASTNode) -> None:
+        token: Token = node.token
+        if id(token) not in self.shifted:
+            self.shifted.add(id(token))
+            token.start += self.shift
+            token.end += self.shift
+        super().visit(node)
+
+
+class _StatementParser(Parser):
+    """Parses top-level statements one by one, and records where each ends"""
+
+    def __init__(
+        self,
+        text: str,
+        line_index: LineIndex,
+        offset: int,
+        typed: bool,
+        ignore_unicode_errors: bool,
+        include_comments: bool,
+    ) -> None:
+        # all tokens of a chunk share one line index, so reused ones stay valid
+        super().__init__(
+            text,
+            typed,
+            ignore_unicode_errors,
+            include_comments=include_comments,
+            start=offset,
+            line_index=line_index,
+        )
+        # end of the last eaten token
+        self.end: int = offset
+
+    def _eat_token(self, token_type: Optional[TokenType] = None) -> None:
+        self.end = self.current_token.end
+        super()._eat_token(token_type)
+
+    def parse_next(self) -> Optional[Statement]:
+        """Parse the next top-level statement, or None at the end of the chunk"""
+        if self.current_token.type in self._BLOCK_END_TYPES:
+            return None
+        return self._parse_statement()
+
+    def parse_returns(self) -> Optional[list[Expression]]:
+        """Parse the end of the chunk"""
+        return self._parse_block(self.current_token).returns
+
+
+def reparse(
+    chunk: Chunk,
+    text: str,
+    edit: Optional[Edit] = None,
+    typed: bool = False,
+    ignore_unicode_errors: bool = False,
+    include_comments: bool = True,
+) -> Chunk:
+    """
+    Update a chunk to a new version of its source, only reparsing the top-level
+    statements around the edit
+
+    Parsing restarts two statements before the edit, as the statement before the edit
+    could be continued by it (`f` followed by an inserted `(x)`). Once the last reparsed
+    statement ends after the edit, and the next one starts at the (shifted) start of an
+    old one, the rest of the source is unchanged. From there on, the old statements are
+    reused as they are, with the offsets of their tokens shifted. The first call on a chunk from `parse`
+    parses everything, to record where the statements start.
+
+    :param chunk: the chunk to update, either from `parse` or an earlier `reparse`
+    :param text: the new source
+    :param edit: the edit turning the old source into the new one, computed if None
+    :param typed: the same as for the parser that produced `chunk`
+    :param ignore_unicode_errors: the same as for the parser that produced `chunk`
+    :param include_comments: the same as for the parser that produced `chunk`
+    :return: the updated chunk, which is the same object as `chunk`
+    """
+    index: Optional[StatementIndex] = chunk.get_attribute(StatementIndex)
+    if index is None:
+        index = StatementIndex(LineIndex(text), [], [])
+        edit = Edit(0, len(text), text)
+        restart: int = 0
+    else:
+        edit = edit or Edit.from_texts(index.line_index.text, text)
+        # the statement the edit starts in and the one before may both change
+        restart = max(bisect_left(index.starts, edit.offset) - 2, 0)
+    old_text: str = index.line_index.text
+    index.line_index.update(text)
+    try:
+        parser = _StatementParser(
+            text,
+            index.line_index,
+            index.ends[restart - 1] if restart else 0,
+            typed,
+            ignore_unicode_errors,
+            include_comments,
+        )
+        first_token: Token = parser.current_token
+        new_index: StatementIndex = StatementIndex(
+            index.line_index, index.starts[:restart], index.ends[:restart]
+        )
+        statements: list[Statement] = list(chunk.statements[:restart])
+        resync: Optional[int] = _parse_changed(
+            parser, index, edit, new_index, statements
+        )
+        returns: Optional[list[Expression]] = chunk.returns
+        if resync is None:
+            new_index.starts.append(parser.current_token.start)
+            returns = parser.parse_returns()
+            new_index.ends.append(parser.end)
+    except BaseException:
+        # leave the chunk as it was
+        index.line_index.update(old_text)
+        raise
+    if resync is not None:
+        if edit.shift:
+            _shift_tokens(
+                [*chunk.statements[resync:], *(chunk.returns or [])], edit.shift
+            )
+        new_index.starts += [start + edit.shift for start in index.starts[resync:]]
+        new_index.ends += [end + edit.shift for end in index.ends[resync:]]
+        statements += chunk.statements[resync:]
+    if restart == 0 and resync != 0:
+        # the same as in parse_chunk, the comments are already part of the statement
+        first_token.comment = []
+        chunk.token = first_token
+        chunk.comment = first_token.comment
+    chunk.statements = statements
+    chunk.returns = returns
+    chunk.set_attribute(new_index)
+    return chunk
+
+
+def _parse_changed(
+    parser: _StatementParser,
+    index: StatementIndex,
+    edit: Edit,
+    new_index: StatementIndex,
+    statements: list[Statement],
+) -> Optional[int]:
+    """
+    Parse top-level statements until the rest of the source is unchanged
+
+    :param parser: the parser, at the start of the first statement to parse
+    :param index: the statement index of the old source
+    :param edit: the edit turning the old source into the new one
+    :param new_index: the statement index to add the parsed statements to
+    :param statements: the list to add the parsed statements to
+    :return: the first old statement that can be reused, None if there is none
+    """
+    shift: int = edit.shift
+    edit_end: int = edit.offset + len(edit.inserted)
+    offset: int = parser.end
+    while True:
+        # once the source from the end of the last token on is unchanged, so is
+        # every statement from here on, including the comments before it
+        start: int = parser.current_token.start
+        if offset >= edit_end:
+            old: int = bisect_left(index.starts, start - shift)
+            if (
+                old < len(index.starts)
+                and index.starts[old] == start - shift
+                and (index.ends[old - 1] if old else 0) == offset - shift
+            ):
+                return old
+        statement: Optional[Statement] = parser.parse_next()
+        if statement is None:
+            return None
+        new_index.starts.append(start)
+        new_index.ends.append(parser.end)
+        statements.append(statement)
+        offset = parser.end
+
+
+def _shift_tokens(nodes: Sequence[ASTNode], shift: int) -> None:
+    """Move the tokens of reused nodes by `shift`"""
+    shifter: _TokenShifter = _TokenShifter(shift)
+    for node in nodes:
+        shifter.visit(node)
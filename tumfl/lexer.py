@@ -1,13 +1,20 @@
+import mmap
+import re
 import sys
-from typing import Dict, List, NoReturn, Optional, Tuple, TypedDict
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NoReturn, Optional, Tuple, Union
 
 from .error import LexerError
-from .token import Token, TokenType
+from .line_index import LineIndex
+from .token import Token, TokenBuffer, TokenType
 
+# keywords only reserved in typed lua
+TYPING_KEYWORDS: Dict[str, TokenType] = {"as": TokenType.AS, "is": TokenType.IS}
 RESERVED_KEYWORDS: Dict[str, TokenType] = {
     t.value: t
     for t in list(TokenType)
-    if t.value.isalpha() and t.value not in ["name", "number", "eof", "string"]
+    if t.value.isalpha()
+    and t.value not in ["name", "number", "eof", "string", *TYPING_KEYWORDS]
 }
 SYMBOLS: Dict[str, TokenType] = {
     t.value: t for t in list(TokenType) if not t.value.isalpha()
@@ -39,88 +46,179 @@ ESCAPE_CODES: Dict[str, str] = {
     "'": "'",
 }
 
+# Character classes used by the dispatch table in `Lexer.get_next_token`
+_SPACE: int = 0
+_LETTER: int = 1
+_DIGIT: int = 2
+_DOT: int = 3
+_MINUS: int = 4
+_QUOTE: int = 5
+_L_BRACKET: int = 6
+_SYMBOL: int = 7
+CHARACTER_CLASSES: Dict[str, int] = {
+    **{char: _SYMBOL for symbol in SYMBOLS for char in symbol},
+    **{char: _SPACE for char in " \t\n\r\f\v"},
+    **{char: _LETTER for char in LETTER},
+    **{char: _DIGIT for char in NUMBER},
+    ".": _DOT,
+    "-": _MINUS,
+    "'": _QUOTE,
+    '"': _QUOTE,
+    "[": _L_BRACKET,
+}
+WHITESPACE_PATTERN: re.Pattern[str] = re.compile(r"\s+")
+NAME_PATTERN: re.Pattern[str] = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*")
+DIGITS_PATTERN: re.Pattern[str] = re.compile(r"[0-9]*")
+# numbers in one step: integer digits, optional fraction and an optional exponent
+# (which is called float offset for hex numbers)
+DECIMAL_NUMBER_PATTERN: re.Pattern[str] = re.compile(
+    r"(?P<int>[0-9]*)(?:\.(?P<frac>[0-9]*))?(?:[eE](?P<exp>[+-]?[0-9]*))?"
+)
+HEX_NUMBER_PATTERN: re.Pattern[str] = re.compile(
+    r"0[xX](?P<int>[0-9a-fA-F]*)(?:\.(?P<frac>[0-9a-fA-F]*))?(?:[pP](?P<exp>[+-]?[0-9]*))?"
+)
+HEX_DIGITS_PATTERN: re.Pattern[str] = re.compile(r"[0-9a-fA-F]*")
+# characters that end a plain segment of a string: the closing quote, an escape or a newline
+STRING_STOP_PATTERNS: Dict[str, re.Pattern[str]] = {
+    quote: re.compile(f"[{quote}\\\\\\n]") for quote in "'\""
+}
+# longest symbols first, so that `...` wins over `..` and `.`
+SYMBOL_PATTERN: re.Pattern[str] = re.compile(
+    "|".join(re.escape(symbol) for symbol in sorted(SYMBOLS, key=len, reverse=True))
+)
+
+# comments with this marker (like `-- tumfl: preserve`) are always kept, as the minifier
+# relies on them
+PRESERVE_MARKER: re.Pattern[str] = re.compile(r"tumfl\W*preserve")
+
+# sources which are not a `str` are lexed as bytes
+Source = Union[str, bytes, bytearray, memoryview, mmap.mmap]
+
 NumberTuple = Tuple[bool, Optional[str], Optional[str], Optional[str], Optional[str]]
 
 
-class TokenArgs(TypedDict):
-    line: int
-    column: int
-    comment: list[str]
+def utf8_encode(code_point: int) -> str:
+    """
+    Encode a code point like lua does for `\\u{XXX}` escapes, with one character per byte.
+    Unlike python, lua allows code points up to 2^31 - 1.
 
+    :param code_point: the code point to encode
+    :return: the encoded bytes, as latin-1 string
+    """
+    if code_point < 0x80:
+        return chr(code_point)
+    encoded: List[str] = []
+    # the maximum value that still fits into the first byte
+    max_first: int = 0x3F
+    while True:
+        encoded.append(chr(0x80 | code_point & 0x3F))
+        code_point >>= 6
+        max_first >>= 1
+        if code_point <= max_first:
+            break
+    encoded.append(chr((~max_first << 1 | code_point) & 0xFF))
+    return "".join(reversed(encoded))
+
+
+class Dialect:
+    """
+    The keywords of a flavour of lua.
 
-def include_typing(do_include: bool) -> None:
+    Dialects are read-only, so lexers of different dialects can safely run at the same time.
     """
-    Change the keywords to include typing
 
-    :param do_include: whether to include typing keywords
-    :return: None
+    def __init__(self, name: str, keywords: Mapping[str, TokenType]) -> None:
+        self.name: str = name
+        self.keywords: Mapping[str, TokenType] = MappingProxyType(dict(keywords))
+
+    def is_keyword(self, name: str) -> bool:
+        return name in self.keywords
+
+    def __repr__(self) -> str:
+        return f"Dialect({self.name!r})"
+
+
+LUA_DIALECT: Dialect = Dialect("lua", RESERVED_KEYWORDS)
+TYPED_DIALECT: Dialect = Dialect("typed lua", {**RESERVED_KEYWORDS, **TYPING_KEYWORDS})
+
+
+def get_dialect(typed: bool) -> Dialect:
     """
-    if do_include and "as" not in RESERVED_KEYWORDS:
-        RESERVED_KEYWORDS["as"] = TokenType.AS
-        RESERVED_KEYWORDS["is"] = TokenType.IS
-    elif not do_include and "as" in RESERVED_KEYWORDS:
-        RESERVED_KEYWORDS.pop("as")
-        RESERVED_KEYWORDS.pop("is")
+    Get the dialect to lex with
+
+    :param typed: whether to include typing keywords
+    :return: the dialect
+    """
+    return TYPED_DIALECT if typed else LUA_DIALECT
 
 
 class Lexer:
+    # pylint: disable=too-many-instance-attributes
     def __init__(
-        self, text: str, typed: bool = False, ignore_unicode_errors: bool = False
+        self,
+        text: Source,
+        typed: bool = False,
+        ignore_unicode_errors: bool = False,
+        include_comments: bool = True,
+        start: int = 0,
+        line_index: Optional[LineIndex] = None,
+        binary: bool = False,
     ) -> None:
-        self.text: str = text
+        # bytes are lexed as latin-1, so every character is exactly one byte, and
+        # strings come out as exact byte values (one character per byte), binary marks
+        # a str that was already decoded that way
+        self.binary: bool = binary or not isinstance(text, str)
+        self.text: str = text if isinstance(text, str) else str(text, "latin-1")
+        self.include_comments: bool = include_comments
         self.text_len: int = len(self.text)
-        self.line: int = 0
-        self.column: int = -1
-        self.pos: int = -1
-        self.newline_warn: int = 0
+        # lexers of parts of a source share the line index of the whole source
+        self.line_index: LineIndex = line_index or LineIndex(self.text)
+        self.pos: int = start
+        # start of the last scanned token
+        self.token_start: int = 0
         self.current_char: Optional[str] = None
-        self.last_hint: Optional[Tuple[str, int, int]] = None
         self.comments: list[str] = []
         self.unicode_errors: str = "ignore" if ignore_unicode_errors else "strict"
-        self.advance()
-        include_typing(typed)
-
-    def error(
-        self, message: str, line: Optional[int] = None, column: Optional[int] = None
-    ) -> NoReturn:
-        current_line: int = line if line is not None else self.line
-        current_column = column if column is not None else self.column
-        print(f"Error on line {current_line + 1}:", file=sys.stderr)
-        print(self.text.split("\n")[current_line], file=sys.stderr)
-        print(" " * current_column + "^", file=sys.stderr)
-        print(message, file=sys.stderr)
-        raise LexerError(message, current_line, current_column)
-
-    def get_token_args(self) -> TokenArgs:
-        comment: list[str] = self.comments[:]
-        self.comments.clear()
-        return {"line": self.line + 1, "column": self.column + 1, "comment": comment}
+        self.dialect: Dialect = get_dialect(typed)
+        self._seek(start)
+
+    def error(self, message: str, pos: Optional[int] = None) -> NoReturn:
+        offset: int = min(pos if pos is not None else self.pos, self.text_len)
+        line, column = self.line_index.position(offset)
+        print(self.line_index.excerpt(offset) + message, file=sys.stderr)
+        raise LexerError(message, line - 1, column - 1)
 
     def advance(self) -> None:
         """Advance the `pos` pointer"""
         self.pos += 1
-        if self.pos < self.text_len:
-            self.current_char = self.text[self.pos]
-            self.column += 1
+        self.current_char = self.text[self.pos] if self.pos < self.text_len else None
+
+    def _seek(self, pos: int) -> None:
+        """Move the `pos` pointer to `pos` in one step"""
+        self.pos = pos
+        self.current_char = self.text[pos] if pos < self.text_len else None
+
+    def seek(self, pos: int) -> None:
+        """Continue lexing at `pos`, which has to be the end of a token (or 0)"""
+        self.comments = []
+        self._seek(pos)
+
+    def _match(self, pattern: re.Pattern[str]) -> re.Match[str]:
+        """Match a pattern at the current position"""
+        match: Optional[re.Match[str]] = pattern.match(self.text, self.pos)
+        assert match
+        return match
+
+    def _take(self, pattern: re.Pattern[str]) -> str:
+        """Consume the match of a pattern at the current position and return it"""
+        result: str = self._match(pattern).group()
+        self._seek(self.pos + len(result))
+        return result
 
-            if self.current_char == "\n":
-                self.column = -1
-                self.line += 1
-                # init newline state machine
-                self.newline_warn = 1
-            elif self.current_char.isspace():
-                # third state: space after text after newline
-                if self.newline_warn == 2:
-                    self.newline_warn = 3
-            else:
-                # second state: text after newline
-                if self.newline_warn == 1:
-                    self.newline_warn = 2
-                # reset if text after third state
-                if self.newline_warn == 3:
-                    self.newline_warn = 0
-        else:
-            self.current_char = None
+    def _find_line_end(self, start: int) -> int:
+        """Position of the next newline at or after `start`, or the end of the text"""
+        end: int = self.text.find("\n", start)
+        return self.text_len if end < 0 else end
 
     def peek(self) -> Optional[str]:
         peek_pos = self.pos + 1
@@ -129,15 +227,19 @@ class Lexer:
         return None
 
     def skip_whitespace(self) -> None:
-        while self.current_char and self.current_char.isspace():
-            self.advance()
+        if self.current_char and self.current_char.isspace():
+            self._seek(self._match(WHITESPACE_PATTERN).end())
 
     def get_long_brackets(self) -> str:
         """Returns the inner content of long brackets, or none if there are no long brackets"""
+        start, end = self._skip_long_brackets()
+        return self.text[start:end]
+
+    def _skip_long_brackets(self) -> Tuple[int, int]:
+        """Skip long brackets, and return the start and end offset of their content"""
         # check if in the right conditions
         assert self.current_char == "[" and self.peek() in ["=", "["]
-        line: int = self.line
-        column: int = self.column
+        start: int = self.pos
         # skip opening bracket
         self.advance()
         # the amount of equals signs in the long string
@@ -150,115 +252,53 @@ class Lexer:
         if self.current_char != "[":
             self.error("Malformed long bracket")
         self.advance()
-        inner_string: str = ""
-        # closing_equals is zero on an encountered closing bracket, and will be incremented with each equals sign
-        closing_equals: int = -1
-        while self.current_char:
-            if self.current_char == "]" and closing_equals == equals:
-                self.advance()
-                return inner_string[: -equals - 1]
-            if self.current_char == "=" and closing_equals >= 0:
-                closing_equals += 1
-            elif self.current_char == "]":
-                closing_equals = 0
-            else:
-                closing_equals = -1
-            inner_string += self.current_char
-            self.advance()
-        self.error("long brackets never closed", line, column)
+        closing: str = "]" + "=" * equals + "]"
+        end: int = self.text.find(closing, self.pos)
+        if end < 0:
+            self.error("long brackets never closed", start)
+        content_start: int = self.pos
+        self._seek(end + len(closing))
+        return content_start, end
 
     def skip_comment(self) -> None:
         """Skip a comment (long or short)"""
         assert self.current_char == "-" and self.peek() == "-"
         self.advance()
         self.advance()
-        comment: str = ""
+        start: int = self.pos
+        end: int
         if self.current_char == "[" and self.peek() in ["[", "="]:
-            comment = self.get_long_brackets()
+            start, end = self._skip_long_brackets()
         else:
-            while self.current_char and self.current_char != "\n":
-                comment += self.current_char
-                self.advance()
-        self.comments.append(comment)
+            end = self._find_line_end(start)
+            self._seek(end)
+        # when comments are not included, only keep the ones marking names to preserve
+        if self.include_comments or PRESERVE_MARKER.search(self.text, start, end):
+            self.comments.append(self.text[start:end])
 
     def get_number(self) -> NumberTuple:
         """Parses a number into the Number ast node"""
-        current_numbers: List[str] = NUMBER
-        is_hex: bool = False
-        integer_part: Optional[str] = None
-        # starts with a digit
-        if self.current_char in NUMBER:
-            # is a hex number
-            if self.current_char == "0" and self.peek() in ["x", "X"]:
-                is_hex = True
-                current_numbers = HEX_NUMBER
-                self.advance()
-                self.advance()
-            # gather integer digits
-            result: str = ""
-            while self.current_char in current_numbers:
-                result += self.current_char.lower()
-                self.advance()
-            if result:
-                integer_part = result
-        if not integer_part:
-            self.last_hint = (
-                "forgot an integer part of a number",
-                self.line,
-                self.column,
-            )
-        # has a fractional part
-        fractional_part: Optional[str] = None
-        exponent: Optional[str] = None
-        float_offset: Optional[str] = None
-        if self.current_char == ".":
-            self.advance()
-            # gather fractional digits
-            result = ""
-            while self.current_char in current_numbers:
-                result += self.current_char.lower()
-                self.advance()
-            if result:
-                fractional_part = result
-            else:
-                self.last_hint = (
-                    "forgot a fractional part after a dot",
-                    self.line,
-                    self.column,
-                )
-        # test for a float_offset in hex numbers or an exponent in non-hex numbers
-        if (
-            is_hex
-            and self.current_char in ["p", "P"]
-            or not is_hex
-            and self.current_char in ["e", "E"]
-        ):
-            self.advance()
-            result = ""
-            # take a sign if it exists
-            if self.current_char in ["+", "-"]:
-                result += self.current_char
-                self.advance()
-            # gather digits
-            while self.current_char in NUMBER:
-                result += self.current_char
-                self.advance()
-            # store in the respective field
-            if result and is_hex:
-                float_offset = result
-            elif result:
-                exponent = result
-        return is_hex, integer_part, fractional_part, exponent, float_offset
+        match: Optional[re.Match[str]] = HEX_NUMBER_PATTERN.match(self.text, self.pos)
+        is_hex: bool = match is not None
+        if not match:
+            match = self._match(DECIMAL_NUMBER_PATTERN)
+        integer_part, fractional_part, exponent = match.group("int", "frac", "exp")
+        self._seek(match.end())
+        return (
+            is_hex,
+            integer_part.lower() or None,
+            fractional_part.lower() if fractional_part else None,
+            None if is_hex else exponent or None,
+            exponent or None if is_hex else None,
+        )
 
     def get_name(self) -> str:
         assert self.current_char in LETTER
-        result: str = ""
-        while self.current_char in ALPHANUMERIC:
-            result += self.current_char
-            self.advance()
-        return result
+        return self._take(NAME_PATTERN)
 
     def _safe_decode(self, base: int) -> str:
+        if self.binary:
+            return chr(base)
         try:
             return bytes((base,)).decode("utf-8", self.unicode_errors)
         except UnicodeDecodeError:
@@ -267,6 +307,8 @@ class Lexer:
             )
 
     def _safe_code_point(self, base: int) -> str:
+        if self.binary and base < 2**31:
+            return utf8_encode(base)
         try:
             return chr(base)
         except ValueError:
@@ -276,155 +318,160 @@ class Lexer:
 
     def get_string(self) -> str:
         assert self.current_char in ["'", '"']
-        # character that is needed to close the string
-        closing: str = self.current_char
-        # whether the next character has been escaped
-        escape: bool = False
+        text: str = self.text
+        stop_pattern: re.Pattern[str] = STRING_STOP_PATTERNS[self.current_char]
         self.advance()
-        # the result string that will contain the parsed string
-        result: str = ""
-        # iterate until either the end is reached, or an unescaped closing character is encountered
-        while self.current_char and (escape or self.current_char != closing):
-            # handle an escaped character
-            if escape:
-                column: int = self.column
-                # handle the skip next whitespace escape sequence
-                if self.current_char == "z":
-                    self.advance()
-                    self.skip_whitespace()
-                # handle the hexadecimal character specification case
-                elif self.current_char == "x":
-                    self.advance()
-                    digits: str = self.current_char
-                    # needs to have exactly 2 digits
-                    if self.current_char not in HEX_NUMBER:
-                        self.error("Invalid hex digit", column=column)
-                    self.advance()
-                    digits += self.current_char
-                    if self.current_char not in HEX_NUMBER:
-                        self.error("Invalid hex digit", column=column)
-                    self.advance()
-                    result += self._safe_decode(int(digits, 16))
-                elif self.current_char == "u":
-                    self.advance()
-                    if self.current_char != "{":
-                        self.error("Invalid character after \\u, expected {")
-                    self.advance()
-                    codepoint: str = ""
-                    for _ in range(8):
-                        codepoint += self.current_char
-                        if self.current_char not in HEX_NUMBER:
-                            self.error(
-                                "Invalid unicode codepoint, expected hexadecimal number"
-                            )
-                        self.advance()
-                        if self.current_char == "}":
-                            break
-                    else:
-                        self.error(
-                            "Unicode codepoints can be at most 2^31 - 1, did not close unicode escape"
-                        )
-                    result += self._safe_code_point(int(codepoint, 16))
-                # handle the decimal character specification case
-                elif self.current_char in NUMBER:
-                    digits = self.current_char
-                    self.advance()
-                    # may have up to 3 digits
-                    if self.current_char in NUMBER:
-                        digits += self.current_char
-                        self.advance()
-                    if self.current_char in NUMBER:
-                        digits += self.current_char
-                        self.advance()
-                    char: int = int(digits)
-                    if char > 255:
-                        self.error(f"Invalid char with number {char}", column=column)
-                    result += self._safe_decode(char)
-                else:
-                    # handle all simple escape sequences
-                    if self.current_char not in ESCAPE_CODES:
-                        self.error(
-                            f"Invalid escape sequence: \\{self.current_char}",
-                            column=column,
-                        )
-                    result += ESCAPE_CODES[self.current_char]
-                    self.advance()
-                escape = False
-            elif self.current_char == "\\":
-                # escape the next character. don't do anything in this loop
-                escape = True
-                self.advance()
-            else:
-                # normal characters
-                if self.current_char == "\n":
-                    self.error("Invalid end of string")
-                result += self.current_char
-                self.advance()
-        # eof before closing character
-        if self.current_char != closing:
-            self.error("Did not close string")
+        # plain segments are sliced out in one piece, only escapes are decoded
+        segments: List[str] = []
+        while True:
+            stop: Optional[re.Match[str]] = stop_pattern.search(text, self.pos)
+            # eof before closing character
+            if not stop:
+                self._seek(self.text_len)
+                self.error("Did not close string")
+            segments.append(text[self.pos : stop.start()])
+            self._seek(stop.start())
+            if self.current_char == "\n":
+                self.error("Invalid end of string")
+            self.advance()
+            if stop.group() != "\\":
+                return "".join(segments)
+            # eof directly after the backslash
+            if self.current_char is None:
+                self.error("Did not close string")
+            segments.append(self._get_escape())
+
+    def _get_escape(self) -> str:
+        """Decode the escape sequence after a backslash"""
+        assert self.current_char
+        escape_start: int = self.pos
+        # handle the skip next whitespace escape sequence
+        if self.current_char == "z":
+            self.advance()
+            self.skip_whitespace()
+            return ""
+        # handle the hexadecimal character specification case
+        if self.current_char == "x":
+            self.advance()
+            digits: str = self.text[self.pos : self.pos + 2]
+            # needs to have exactly 2 digits
+            if len(digits) != 2 or any(digit not in HEX_NUMBER for digit in digits):
+                self.error("Invalid hex digit", escape_start)
+            self._seek(self.pos + 2)
+            return self._safe_decode(int(digits, 16))
+        if self.current_char == "u":
+            self.advance()
+            if self.current_char != "{":
+                self.error("Invalid character after \\u, expected {")
+            self.advance()
+            codepoint: str = self._take(HEX_DIGITS_PATTERN)
+            if not codepoint:
+                self.error("Invalid unicode codepoint, expected hexadecimal number")
+            if len(codepoint) > 8:
+                self._seek(self.pos - len(codepoint) + 8)
+                self.error(
+                    "Unicode codepoints can be at most 2^31 - 1, did not close unicode escape"
+                )
+            if self.current_char != "}":
+                self.error("Invalid unicode codepoint, expected hexadecimal number")
+            self.advance()
+            return self._safe_code_point(int(codepoint, 16))
+        # handle the decimal character specification case
+        if self.current_char in NUMBER:
+            # may have up to 3 digits
+            digits = self._match(DIGITS_PATTERN).group()[:3]
+            self._seek(self.pos + len(digits))
+            char: int = int(digits)
+            if char > 255:
+                self.error(f"Invalid char with number {char}", escape_start)
+            return self._safe_decode(char)
+        # handle all simple escape sequences
+        if self.current_char not in ESCAPE_CODES:
+            self.error(
+                f"Invalid escape sequence: \\{self.current_char}",
+                escape_start,
+            )
+        result: str = ESCAPE_CODES[self.current_char]
         self.advance()
         return result
 
-    def get_next_token(self) -> Token:
+    def _scan(self) -> Tuple[TokenType, Union[str, NumberTuple]]:
+        """
+        Scan the next token, skipping whitespace and collecting comments on the way
+
+        :return: type and value of the token, which spans from `token_start` to `pos`
+        """
+        text: str = self.text
         # skip prelude
-        if self.line == 0 and self.column == 0 and self.current_char == "#":
-            while self.current_char and self.current_char != "\n":
-                self.advance()
-        while self.current_char:
-            self.last_hint = None
-            # skip whitespace
-            if self.current_char.isspace():
+        if self.pos == 0 and self.current_char == "#":
+            self._seek(self._find_line_end(0))
+        while self.pos < self.text_len:
+            char: str = text[self.pos]
+            kind: Optional[int] = CHARACTER_CLASSES.get(char)
+            # skip whitespace, including the unicode whitespace `str.isspace` knows
+            if kind == _SPACE or kind is None and char.isspace():
                 self.skip_whitespace()
                 continue
 
             # skip comments
-            if self.current_char == "-" and self.peek() == "-":
+            if kind == _MINUS and text.startswith("--", self.pos):
                 self.skip_comment()
                 continue
 
-            args: TokenArgs = self.get_token_args()
-
-            if self.current_char in LETTER:
-                name: str = self.get_name()
-                if token_type := RESERVED_KEYWORDS.get(name):
-                    return Token(token_type, name, **args)
-                return Token(TokenType.NAME, name, **args)
-
-            if (
-                self.current_char in NUMBER
-                or self.current_char == "."
-                and self.peek() in NUMBER
-            ):
-                number: NumberTuple = self.get_number()
-                return Token(TokenType.NUMBER, number, **args)
-
-            if self.current_char in ["'", '"']:
-                string: str = self.get_string()
-                return Token(TokenType.STRING, string, **args)
-
-            if self.current_char == "[" and self.peek() in ["[", "="]:
-                string = self.get_long_brackets()
-                return Token(TokenType.STRING, string, **args)
-
-            if self.current_char == "." and self.peek() == ".":
-                self.advance()
-                self.advance()
-                if self.current_char == ".":
-                    self.advance()
-                    return Token(TokenType.ELLIPSIS, "...", **args)
-                return Token(TokenType.CONCAT, "..", **args)
-
-            if peek := self.peek():
-                double_character: str = self.current_char + peek
-                if token_type := SYMBOLS.get(double_character):
-                    self.advance()
-                    self.advance()
-                    return Token(token_type, double_character, **args)
-            char: str = self.current_char
-            if token_type := SYMBOLS.get(char):
-                self.advance()
-                return Token(token_type, char, **args)
+            self.token_start = self.pos
+
+            # names and strings repeat a lot, interning keeps one copy of each
+            if kind == _LETTER:
+                name: str = sys.intern(self.get_name())
+                return self.dialect.keywords.get(name, TokenType.NAME), name
+
+            if kind == _DIGIT or kind == _DOT and self.peek() in NUMBER:
+                return TokenType.NUMBER, self.get_number()
+
+            if kind == _QUOTE:
+                return TokenType.STRING, sys.intern(self.get_string())
+
+            if kind == _L_BRACKET and self.peek() in ["[", "="]:
+                return TokenType.STRING, self.get_long_brackets()
+
+            if kind is not None:
+                symbol: str = self._take(SYMBOL_PATTERN)
+                return SYMBOLS[symbol], symbol
 
             self.error(f"unrecognised character {self.current_char}")
-        return Token(TokenType.EOF, "eof", **self.get_token_args())
+        self.token_start = self.pos
+        return TokenType.EOF, "eof"
+
+    def _take_comments(self) -> Optional[list[str]]:
+        """Hand the collected comments over to the token being created"""
+        if not self.comments:
+            return None
+        comments: list[str] = self.comments
+        self.comments = []
+        return comments
+
+    def get_next_token(self) -> Token:
+        token_type, value = self._scan()
+        return Token(
+            token_type,
+            value,
+            comment=self._take_comments(),
+            start=self.token_start,
+            end=self.pos,
+            line_index=self.line_index,
+        )
+
+    def tokenize_all(self) -> TokenBuffer:
+        """
+        Lex all remaining tokens into a columnar buffer, without creating token objects
+
+        :return: the buffer, ending with the EOF token
+        """
+        buffer: TokenBuffer = TokenBuffer(self.line_index)
+        append = buffer.append
+        scan = self._scan
+        while True:
+            token_type, value = scan()
+            append(token_type, value, self.token_start, self.pos, self._take_comments())
+            if token_type == TokenType.EOF:
+                return buffer
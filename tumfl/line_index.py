@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Optional
+
+
+class LineIndex:
+    """
+    Maps offsets of a source text to lines and columns.
+
+    The index of newline offsets is only built once the first position is requested,
+    so sources that never need a position (no errors) never pay for it.
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text: str = text
+        self._newlines: Optional[list[int]] = None
+
+    @classmethod
+    def from_newlines(cls, newlines: list[int]) -> LineIndex:
+        """An index of a source that is not available, only lines and columns work"""
+        line_index: LineIndex = cls("")
+        line_index._newlines = newlines
+        return line_index
+
+    def update(self, text: str) -> None:
+        """Switch to a new version of the text, the newline offsets are computed again"""
+        self.text = text
+        self._newlines = None
+
+    @property
+    def newlines(self) -> list[int]:
+        """Offsets of all newline characters, in ascending order"""
+        if self._newlines is None:
+            newlines: list[int] = []
+            text: str = self.text
+            pos: int = text.find("\n")
+            while pos >= 0:
+                newlines.append(pos)
+                pos = text.find("\n", pos + 1)
+            self._newlines = newlines
+        return self._newlines
+
+    def line(self, offset: int) -> int:
+        """The line (starting at 1) an offset is on"""
+        return bisect_left(self.newlines, offset) + 1
+
+    def line_start(self, line: int) -> int:
+        """The offset of the first character of a line (starting at 1)"""
+        return self.newlines[line - 2] + 1 if line > 1 else 0
+
+    def column(self, offset: int) -> int:
+        """The column (starting at 1) an offset is on"""
+        return offset - self.line_start(self.line(offset)) + 1
+
+    def position(self, offset: int) -> tuple[int, int]:
+        """Line and column (both starting at 1) of an offset"""
+        line: int = self.line(offset)
+        return line, offset - self.line_start(line) + 1
+
+    def get_line(self, line: int) -> str:
+        """The content of a line (starting at 1), without the newline character"""
+        newlines: list[int] = self.newlines
+        end: int = newlines[line - 1] if line <= len(newlines) else len(self.text)
+        return self.text[self.line_start(line) : end]
+
+    def excerpt(self, offset: int, context_lines: int = 0) -> str:
+        """
+        Render the line an offset is on, with a marker below the offset.
+
+        :param offset: the offset to point to
+        :param context_lines: how many preceding lines to include
+        :return: the rendered excerpt, ending with a newline
+        """
+        line, column = self.position(offset)
+        result: str = f"Error on line {line}:\n"
+        for context_line in range(max(line - context_lines, 1), line + 1):
+            result += self.get_line(context_line) + "\n"
+        return result + " " * (column - 1) + "^\n"
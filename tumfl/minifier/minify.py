@@ -17,4 +17,4 @@ def minify(ast: ASTNode, preserve_names: Optional[set[str]] = None) -> None:
     replacements = r.current_scope.collect_replacements()
     full_replace(ast, replacements, preserve_names or set())
     Optimize()(ast)
-    Simplify()(ast)
+    Simplify(r.metadata)(ast)
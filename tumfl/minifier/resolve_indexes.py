@@ -9,13 +9,13 @@ from tumfl.basic_walker import (
     NoneWalker,
     String,
 )
-from tumfl.lexer import RESERVED_KEYWORDS
+from tumfl.lexer import LUA_DIALECT, Dialect
 
 VALID_NAME: re.Pattern[str] = re.compile(r"[a-zA-Z_][a-zA-Z_0-9]*")
 
 
-def is_valid_name(name: str) -> bool:
-    return bool(VALID_NAME.fullmatch(name)) and name not in RESERVED_KEYWORDS
+def is_valid_name(name: str, dialect: Dialect = LUA_DIALECT) -> bool:
+    return bool(VALID_NAME.fullmatch(name)) and not dialect.is_keyword(name)
 
 
 class Resolve(NoneWalker):
@@ -24,8 +24,11 @@ class Resolve(NoneWalker):
     This is mostly done in order to simplify further minifications
     """
 
+    def __init__(self, dialect: Dialect = LUA_DIALECT) -> None:
+        self.dialect: Dialect = dialect
+
     def visit_ExplicitTableField(self, node: ExplicitTableField) -> None:
-        if isinstance(node.at, String) and is_valid_name(node.at.name):
+        if isinstance(node.at, String) and is_valid_name(node.at.name, self.dialect):
             new_node = NamedTableField(
                 node.token, Name(node.at.token, node.at.value), node.value
             )
@@ -35,7 +38,7 @@ class Resolve(NoneWalker):
 
     def visit_Index(self, node: Index) -> None:
         if isinstance(node.variable_name, String) and is_valid_name(
-            node.variable_name.value
+            node.variable_name.value, self.dialect
         ):
             new_node = NamedIndex(
                 node.token,
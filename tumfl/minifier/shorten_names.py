@@ -20,11 +20,13 @@ from tumfl.AST import (
     NamedTableField,
     NumberedTableField,
     NumericFor,
+    SideTable,
     Statement,
     Table,
     Vararg,
 )
 from tumfl.basic_walker import NoneWalker
+from tumfl.lexer import PRESERVE_MARKER
 from tumfl.minifier.util.remove_name import RemoveName
 from tumfl.minifier.util.scope import Scope
 from tumfl.minifier.util.variable import Variable
@@ -34,7 +36,9 @@ class GetNames(NoneWalker):
     # pylint: disable=too-many-public-methods
     def __init__(self, ignored_names: Optional[Sequence[str]] = None) -> None:
         super().__init__()
-        self.current_scope: Scope = Scope()
+        # the variables of names, released with the GetNames instance
+        self.metadata: SideTable = SideTable()
+        self.current_scope: Scope = Scope(metadata=self.metadata)
         self.scope_initialized: bool = False
         self.has_metatable: bool = False
         self.preserve: bool = False
@@ -72,18 +76,18 @@ class GetNames(NoneWalker):
         assign: bool = False,
         is_method: bool = False,
     ) -> None:
-        if (var := base.get_attribute(Variable)) and isinstance(extension, Name):
+        if (var := self.metadata.get(base, Variable)) and isinstance(extension, Name):
             new_var = var.add_variable(extension)
-            extension.set_attribute_if_not_exists(new_var)
+            self.metadata.set_if_not_exists(extension, new_var)
             if assign:
                 new_var.add_write(extension)
             else:
                 new_var.add_read(extension, is_method)
 
     def set_preserve(self, node: Statement) -> None:
-        if any("preserve" in comment for comment in node.token.comment):
+        if any(PRESERVE_MARKER.search(comment) for comment in node.token.comment):
             self.preserve = True
-        elif any("preserve" in comment for comment in node.comment):
+        elif any(PRESERVE_MARKER.search(comment) for comment in node.comment):
             self.preserve = True
 
     def visit_FunctionDefinition(self, node: FunctionDefinition) -> None:
@@ -198,13 +202,13 @@ class GetNames(NoneWalker):
     def visit_ExplicitTableField(self, node: ExplicitTableField) -> None:
         super().visit_ExplicitTableField(node)
         assert node.parent_class
-        if var := node.parent_class.get_attribute(Variable):
+        if var := self.metadata.get(node.parent_class, Variable):
             var.has_variable_access.value = True
 
     def visit_NumberedTableField(self, node: NumberedTableField) -> None:
         super().visit_NumberedTableField(node)
         assert node.parent_class
-        if var := node.parent_class.get_attribute(Variable):
+        if var := self.metadata.get(node.parent_class, Variable):
             var.has_variable_access.value = True
 
     def visit_MethodInvocation(self, node: MethodInvocation) -> None:
@@ -213,25 +217,26 @@ class GetNames(NoneWalker):
 
     def visit_Index(self, node: Index) -> None:
         super().visit_Index(node)
-        if var := node.lhs.get_attribute(Variable):
+        if var := self.metadata.get(node.lhs, Variable):
             var.has_variable_access.value = True
 
     def visit_Table(self, node: Table) -> None:
-        if not node.get_attribute(Variable):
-            node.set_attribute_if_not_exists(Variable(False, False))
+        if not self.metadata.get(node, Variable):
+            self.metadata.set(node, Variable(False, False, self.metadata))
         super().visit_Table(node)
 
 
 class RemoveUnused(NoneWalker):
-    def __init__(self, preserve_names: set[str]) -> None:
+    def __init__(self, preserve_names: set[str], metadata: SideTable) -> None:
         super().__init__()
         self.found_any: bool = False
-        self.remove: RemoveName = RemoveName()
+        self.metadata: SideTable = metadata
+        self.remove: RemoveName = RemoveName(metadata)
         self.preserve_names: set[str] = preserve_names
 
     def cleanup(self, node: ASTNode) -> bool:
         for comment in node.token.comment:
-            if "tumfl" in comment and "preserve" in comment:
+            if PRESERVE_MARKER.search(comment):
                 return False
         self.found_any = True
         self.remove(node)
@@ -242,7 +247,7 @@ class RemoveUnused(NoneWalker):
     def visit_Assign(self, node: Assign) -> None:
         if all(
             isinstance(target, Name)
-            and (var := target.get_attribute(Variable))
+            and (var := self.metadata.get(target, Variable))
             and var.is_unused()
             and target.variable_name not in self.preserve_names
             for target in node.targets
@@ -253,7 +258,7 @@ class RemoveUnused(NoneWalker):
 
     def visit_LocalAssign(self, node: LocalAssign) -> None:
         if all(
-            (var := name.name.get_attribute(Variable))
+            (var := self.metadata.get(name.name, Variable))
             and var.is_unused()
             and name.name.variable_name not in self.preserve_names
             for name in node.variable_names
@@ -265,7 +270,7 @@ class RemoveUnused(NoneWalker):
     def cleanup_params(self, params: list[Name | Vararg]) -> None:
         if all(not isinstance(param, Vararg) for param in params):
             for i in range(len(params) - 1, -1, -1):
-                if (var := params[i].get_attribute(Variable)) and var.is_unused():
+                if (var := self.metadata.get(params[i], Variable)) and var.is_unused():
                     if self.cleanup(params[i]):
                         params.pop(i)
                     else:
@@ -275,7 +280,7 @@ class RemoveUnused(NoneWalker):
 
     def visit_FunctionDefinition(self, node: FunctionDefinition) -> None:
         if (
-            (var := node.names[0].get_attribute(Variable))
+            (var := self.metadata.get(node.names[0], Variable))
             and var.is_unused()
             and node.names[0].variable_name not in self.preserve_names
         ):
@@ -286,7 +291,7 @@ class RemoveUnused(NoneWalker):
 
     def visit_LocalFunctionDefinition(self, node: LocalFunctionDefinition) -> None:
         if (
-            (var := node.function_name.get_attribute(Variable))
+            (var := self.metadata.get(node.function_name, Variable))
             and var.is_unused()
             and node.function_name.variable_name not in self.preserve_names
         ):
@@ -303,7 +308,7 @@ class RemoveUnused(NoneWalker):
 def remove_unused_names(
     node: ASTNode, names: GetNames, preserve_names: set[str]
 ) -> None:
-    remove = RemoveUnused(preserve_names)
+    remove = RemoveUnused(preserve_names, names.metadata)
     remove.found_any = True
     while remove.found_any:
         remove.found_any = False
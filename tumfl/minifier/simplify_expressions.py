@@ -14,6 +14,7 @@ from tumfl.AST import (
     Name,
     NamedIndex,
     NamedTableField,
+    SideTable,
     UnaryOperand,
     UnOp,
 )
@@ -56,10 +57,11 @@ class HasReturn(AggregatingWalker[bool]):
 
 
 class Simplify(NoneWalker):
-    def __init__(self) -> None:
+    def __init__(self, metadata: Optional[SideTable] = None) -> None:
         super().__init__()
         self.has_return = HasReturn()
-        self.remove_name = RemoveName()
+        # the variables found by GetNames, if it was run before
+        self.remove_name = RemoveName(SideTable() if metadata is None else metadata)
         self.to_python = ToPythonType()
 
     def visit_BinOp(self, node: BinOp) -> None:
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
-from tumfl.AST import Name
+from tumfl.AST import Name, SideTable
 from tumfl.basic_walker import NoneWalker
 from tumfl.minifier.util.variable import Variable
 
 
 class RemoveName(NoneWalker):
+    def __init__(self, metadata: SideTable) -> None:
+        super().__init__()
+        self.metadata: SideTable = metadata
+
     def visit_Name(self, node: Name) -> None:
-        if var := node.get_attribute(Variable):
+        if var := self.metadata.get(node, Variable):
             var.remove(node)
@@ -8,8 +8,6 @@ from tumfl.AST import Name
 class Replacements:
     def __init__(self, targets: list[Name], original: Optional[Name]):
         self.targets: list[Name] = targets
-        for target in targets:
-            target.set_attribute(self)
         self.original: Optional[Name] = original
         self.parent: Optional[Replacements] = None
         self.replacement: Optional[str] = None
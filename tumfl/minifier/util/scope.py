@@ -3,18 +3,22 @@ from __future__ import annotations
 from itertools import zip_longest
 from typing import Optional
 
-from tumfl.AST import Name
+from tumfl.AST import Name, SideTable
 from tumfl.minifier.util.replacements import ReplacementCollection, key_function
 from tumfl.minifier.util.variable import Variable
 
 
 class Scope:
-    def __init__(self, parent: Optional[Scope] = None) -> None:
+    def __init__(
+        self, parent: Optional[Scope] = None, metadata: Optional[SideTable] = None
+    ) -> None:
         self.parent: Optional[Scope] = None
         self.root: Scope = self
         self.level: int = 0
         self.children: list[Scope] = []
         self.variables: dict[str, Variable] = {}
+        # shared by all scopes of a tree, see Variable
+        self.metadata: SideTable = SideTable() if metadata is None else metadata
         if parent:
             self.add_parent(parent)
 
@@ -23,9 +27,7 @@ class Scope:
         parent.children.append(self)
         self.root = parent.root
         self.level = parent.level + 1
-
-    def __register(self, node: Name) -> None:
-        node.set_attribute(self)
+        self.metadata = parent.metadata
 
     def add_variable(
         self, name: Name, preserve: bool, global_: bool = False, add_write: bool = True
@@ -39,18 +41,16 @@ class Scope:
                 return self.parent.add_variable(name, preserve, global_, add_write)
             return self.root.add_variable(name, preserve)
         self.variables[name.variable_name] = self.variables.get(
-            name.variable_name, Variable(self.root is self, preserve)
+            name.variable_name, Variable(self.root is self, preserve, self.metadata)
         )
         self.variables[name.variable_name].add_scope(self, name)
         if add_write:
             self.variables[name.variable_name].add_write(name)
-        self.__register(name)
         return self.variables[name.variable_name]
 
     def use_variable(self, name: Name, is_method: bool) -> Variable:
         if name.variable_name in self.variables:
             self.variables[name.variable_name].add_read(name, is_method)
-            self.__register(name)
             return self.variables[name.variable_name]
         if self.parent:
             return self.parent.use_variable(name, is_method)
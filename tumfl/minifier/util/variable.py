@@ -2,13 +2,13 @@ from __future__ import annotations
 
 from typing import Any, Optional
 
-from tumfl.AST import Name, NamedIndex
+from tumfl.AST import Name, NamedIndex, SideTable
 from tumfl.minifier.util import MutableBool, SharedList
 from tumfl.minifier.util.replacements import ReplacementCollection, Replacements
 
 
 class Variable:
-    def __init__(self, is_global: bool, preserve: bool) -> None:
+    def __init__(self, is_global: bool, preserve: bool, metadata: SideTable) -> None:
         # ideally, we would use sets, but they compare by equality, and all names are equal
         self.writes: list[Name] = []
         self.reads: list[Name] = []
@@ -17,6 +17,8 @@ class Variable:
         self.has_variable_access: MutableBool = MutableBool(False)
         self.is_global: MutableBool = MutableBool(is_global)
         self.preserve: MutableBool = MutableBool(preserve)
+        # where the variable of a name is recorded
+        self.metadata: SideTable = metadata
         self._shared: SharedList[Variable] = SharedList(self)
 
     def remove(self, name: Name) -> None:
@@ -55,9 +57,9 @@ class Variable:
             self.scopes.clear()
 
     def __register(self, name: Name) -> None:
-        name.set_attribute(self)
+        self.metadata.set(name, self)
         if name.parent_class:
-            name.parent_class.set_attribute_if_not_exists(self)
+            self.metadata.set_if_not_exists(name.parent_class, self)
 
     def add_write(self, write: Name) -> None:
         self.writes.append(write)
@@ -79,7 +81,8 @@ class Variable:
 
     def add_variable(self, name: Name) -> Variable:
         self.children[name.variable_name] = self.children.get(
-            name.variable_name, Variable(self.is_global.value, self.preserve.value)
+            name.variable_name,
+            Variable(self.is_global.value, self.preserve.value, self.metadata),
         )
         self.children[name.variable_name].add_scope(self, name)
         return self.children[name.variable_name]
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import os
+import zlib
+from functools import cache
+from hashlib import blake2b
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, Optional
+
+from .AST import Chunk
+from .lexer import Source, get_dialect
+from .line_index import LineIndex
+from .serialize import dumps, loads
+
+# Bump whenever the stored representation changes, to invalidate existing entries
+CACHE_FORMAT: int = 4
+CACHE_SUFFIX: str = ".chunk"
+
+
+@cache
+def tumfl_fingerprint() -> str:
+    """
+    Fingerprint of the running tumfl, made of its version and the content of its sources.
+    The version alone goes stale for editable installs and checkouts.
+    """
+    digest = blake2b(digest_size=8)
+    try:
+        digest.update(version("tumfl").encode())
+    except PackageNotFoundError:
+        pass
+    package: Path = Path(__file__).parent
+    for file in sorted(package.rglob("*.py")):
+        digest.update(file.relative_to(package).as_posix().encode())
+        digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Persistent cache of parsed chunks, keyed by the hash of the source.
+
+    The key also covers the cache format, the tumfl sources and the parser options, so entries never
+    have to be invalidated by hand. Entries are compressed chunks serialized by
+    `tumfl.serialize`, once the total size exceeds `max_size` bytes, the least recently
+    used entries are removed. The total size is tracked in memory, the directory is
+    only scanned when it seems to exceed `max_size`.
+    """
+
+    def __init__(self, directory: Path, max_size: int = 256 * 1024 * 1024) -> None:
+        self.directory: Path = directory
+        self.max_size: int = max_size
+        # unknown until the directory is scanned by the first eviction
+        self._size: Optional[int] = None
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(source: Source, typed: bool = False, include_comments: bool = True) -> str:
+        """Content hash of a source, together with everything else the result depends on"""
+        digest = blake2b(digest_size=20)
+        kind: str = "text" if isinstance(source, str) else "binary"
+        options: str = (
+            f"{CACHE_FORMAT}|{tumfl_fingerprint()}|{get_dialect(typed).name}|"
+        )
+        digest.update(f"{options}{include_comments}|{kind}|".encode())
+        if isinstance(source, str):
+            digest.update(source.encode("utf-8", "surrogatepass"))
+        else:
+            digest.update(source)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (key + CACHE_SUFFIX)
+
+    def load(
+        self, source: Source, typed: bool = False, include_comments: bool = True
+    ) -> Optional[Chunk]:
+        """Load the chunk of a source, or None if it is not cached"""
+        path: Path = self._path(self.key(source, typed, include_comments))
+        try:
+            data: bytes = path.read_bytes()
+        except OSError:
+            return None
+        text: str = source if isinstance(source, str) else str(source, "latin-1")
+        try:
+            # the line index is rebuilt from the source, instead of storing its text
+            chunk: Any = loads(zlib.decompress(data), LineIndex(text))
+        except Exception:  # pylint: disable=broad-exception-caught
+            # a corrupted or foreign entry is just a miss
+            chunk = None
+        if not isinstance(chunk, Chunk):
+            path.unlink(missing_ok=True)
+            return None
+        # the modification time doubles as last access time for the eviction
+        try:
+            os.utime(path)
+        except OSError:
+            # read only caches still serve hits, only their eviction order suffers
+            pass
+        return chunk
+
+    def store(
+        self,
+        source: Source,
+        chunk: Chunk,
+        typed: bool = False,
+        include_comments: bool = True,
+    ) -> None:
+        """Store the chunk of a source, and evict old entries if the cache is too big"""
+        data: bytes = zlib.compress(dumps(chunk), 1)
+        path: Path = self._path(self.key(source, typed, include_comments))
+        with NamedTemporaryFile(
+            dir=self.directory, suffix=".tmp", delete=False
+        ) as file:
+            file.write(data)
+        # replacing is atomic, so concurrent builds never read half written entries
+        os.replace(file.name, path)
+        # replaced entries are counted twice, until the next eviction scans the directory
+        if self._size is not None:
+            self._size += len(data)
+        if self._size is None or self._size > self.max_size:
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries, until the cache fits into max_size"""
+        entries: list[tuple[float, int, Path]] = []
+        total: int = 0
+        for path in self.directory.glob("*" + CACHE_SUFFIX):
+            try:
+                stat: os.stat_result = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._size = total
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        for path in self.directory.glob("*" + CACHE_SUFFIX):
+            path.unlink(missing_ok=True)
+        self._size = 0
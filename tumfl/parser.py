@@ -1,12 +1,173 @@
+# pylint: disable=too-many-lines
 from __future__ import annotations
 
-from typing import Callable, NoReturn, Optional
+from copy import copy
+from typing import TYPE_CHECKING, Any, Callable, Generator, NoReturn, Optional, TypeVar
 
 from .AST import *
+from .AST.expression.bin_op import PRECEDENCE, RIGHT_ASSOCIATIVE, UNARY_PRECEDENCE
 from .error import ParserError
-from .lexer import Lexer
+from .lexer import Lexer, Source
+from .line_index import LineIndex
 from .token import Token, TokenType
 
+if TYPE_CHECKING:
+    from .parse_cache import ParseCache
+
+T = TypeVar("T")
+# A parsing step yields the steps of nested constructs, and gets their results sent back
+Steps = Generator[Generator[Any, Any, Any], Any, T]
+
+UNARY_OPERANDS: frozenset[TokenType] = frozenset(
+    TokenType[operand.name] for operand in UnaryOperand
+)
+BINARY_PRECEDENCE: dict[TokenType, int] = {
+    TokenType[operand.name]: precedence for operand, precedence in PRECEDENCE.items()
+}
+LITERALS: dict[TokenType, Callable[[Token], Expression]] = {
+    TokenType.NIL: Nil.from_token,
+    TokenType.TRUE: Boolean.from_token,
+    TokenType.FALSE: Boolean.from_token,
+    TokenType.NUMBER: Number.from_token,
+    TokenType.STRING: String.from_token,
+    TokenType.ELLIPSIS: Vararg.from_token,
+}
+RIGHT_ASSOCIATIVE_TOKENS: frozenset[TokenType] = frozenset(
+    TokenType[operand.name] for operand in RIGHT_ASSOCIATIVE
+)
+# Tokens closing a bracket or block of a skipped function body, and the tokens they
+# may close. THEN and ELSEIF are left out, as all branches of an IF share a single END
+SKIPPED_CLOSERS: dict[TokenType, frozenset[TokenType]] = {
+    TokenType.R_PAREN: frozenset((TokenType.L_PAREN,)),
+    TokenType.R_BRACKET: frozenset((TokenType.L_BRACKET,)),
+    TokenType.R_CURL: frozenset((TokenType.L_CURL,)),
+    TokenType.END: frozenset((TokenType.FUNCTION, TokenType.DO, TokenType.IF)),
+    TokenType.UNTIL: frozenset((TokenType.REPEAT,)),
+}
+SKIPPED_OPENERS: frozenset[TokenType] = frozenset().union(*SKIPPED_CLOSERS.values())
+VAR_TERMINAL_TYPES: frozenset[TokenType] = frozenset(
+    (
+        TokenType.L_BRACKET,
+        TokenType.DOT,
+        TokenType.L_PAREN,
+        TokenType.L_CURL,
+        TokenType.COLON,
+        TokenType.STRING,
+    )
+)
+
+# Context hints are kept as single ints, and only turned into Hint objects once they
+# are needed: the start offset of the hint token, the where text and the what text
+HINT_WHERE: tuple[str, ...] = (
+    "assignment",
+    "explicit table field",
+    "expression var",
+    "for",
+    "function",
+    "function call",
+    "function expression",
+    "goto",
+    "if",
+    "index",
+    "invocation",
+    "iterative for",
+    "label",
+    "local assign",
+    "local function",
+    "named table field",
+    "numbered table field",
+    "numeric for",
+    "repeat",
+    "table constructor",
+    "while",
+)
+HINT_WHAT: tuple[str, ...] = (
+    "arguments",
+    "block",
+    "body",
+    "condition",
+    "definition",
+    "else block",
+    "elseif block",
+    "elseif condition",
+    "end",
+    "expression",
+    "expression list",
+    "expressions",
+    "fields",
+    "if block",
+    "if condition",
+    "key expression",
+    "method name",
+    "name",
+    "name attribute",
+    "name list",
+    "names",
+    "parameters",
+    "start expression",
+    "step expression",
+    "stop expression",
+    "value expression",
+    "variables",
+)
+HINT_TEXT_BITS: int = 5
+HINT_TEXT_MASK: int = (1 << HINT_TEXT_BITS) - 1
+HINT_TOKEN_SHIFT: int = 2 * HINT_TEXT_BITS
+WHERE_ASSIGNMENT: int = HINT_WHERE.index("assignment") << HINT_TEXT_BITS
+WHERE_EXPLICIT_TABLE_FIELD: int = (
+    HINT_WHERE.index("explicit table field") << HINT_TEXT_BITS
+)
+WHERE_EXPRESSION_VAR: int = HINT_WHERE.index("expression var") << HINT_TEXT_BITS
+WHERE_FOR: int = HINT_WHERE.index("for") << HINT_TEXT_BITS
+WHERE_FUNCTION: int = HINT_WHERE.index("function") << HINT_TEXT_BITS
+WHERE_FUNCTION_CALL: int = HINT_WHERE.index("function call") << HINT_TEXT_BITS
+WHERE_FUNCTION_EXPRESSION: int = (
+    HINT_WHERE.index("function expression") << HINT_TEXT_BITS
+)
+WHERE_GOTO: int = HINT_WHERE.index("goto") << HINT_TEXT_BITS
+WHERE_IF: int = HINT_WHERE.index("if") << HINT_TEXT_BITS
+WHERE_INDEX: int = HINT_WHERE.index("index") << HINT_TEXT_BITS
+WHERE_INVOCATION: int = HINT_WHERE.index("invocation") << HINT_TEXT_BITS
+WHERE_ITERATIVE_FOR: int = HINT_WHERE.index("iterative for") << HINT_TEXT_BITS
+WHERE_LABEL: int = HINT_WHERE.index("label") << HINT_TEXT_BITS
+WHERE_LOCAL_ASSIGN: int = HINT_WHERE.index("local assign") << HINT_TEXT_BITS
+WHERE_LOCAL_FUNCTION: int = HINT_WHERE.index("local function") << HINT_TEXT_BITS
+WHERE_NAMED_TABLE_FIELD: int = HINT_WHERE.index("named table field") << HINT_TEXT_BITS
+WHERE_NUMBERED_TABLE_FIELD: int = (
+    HINT_WHERE.index("numbered table field") << HINT_TEXT_BITS
+)
+WHERE_NUMERIC_FOR: int = HINT_WHERE.index("numeric for") << HINT_TEXT_BITS
+WHERE_REPEAT: int = HINT_WHERE.index("repeat") << HINT_TEXT_BITS
+WHERE_TABLE_CONSTRUCTOR: int = HINT_WHERE.index("table constructor") << HINT_TEXT_BITS
+WHERE_WHILE: int = HINT_WHERE.index("while") << HINT_TEXT_BITS
+WHAT_ARGUMENTS: int = HINT_WHAT.index("arguments")
+WHAT_BLOCK: int = HINT_WHAT.index("block")
+WHAT_BODY: int = HINT_WHAT.index("body")
+WHAT_CONDITION: int = HINT_WHAT.index("condition")
+WHAT_DEFINITION: int = HINT_WHAT.index("definition")
+WHAT_ELSE_BLOCK: int = HINT_WHAT.index("else block")
+WHAT_ELSEIF_BLOCK: int = HINT_WHAT.index("elseif block")
+WHAT_ELSEIF_CONDITION: int = HINT_WHAT.index("elseif condition")
+WHAT_END: int = HINT_WHAT.index("end")
+WHAT_EXPRESSION: int = HINT_WHAT.index("expression")
+WHAT_EXPRESSION_LIST: int = HINT_WHAT.index("expression list")
+WHAT_EXPRESSIONS: int = HINT_WHAT.index("expressions")
+WHAT_FIELDS: int = HINT_WHAT.index("fields")
+WHAT_IF_BLOCK: int = HINT_WHAT.index("if block")
+WHAT_IF_CONDITION: int = HINT_WHAT.index("if condition")
+WHAT_KEY_EXPRESSION: int = HINT_WHAT.index("key expression")
+WHAT_METHOD_NAME: int = HINT_WHAT.index("method name")
+WHAT_NAME: int = HINT_WHAT.index("name")
+WHAT_NAME_ATTRIBUTE: int = HINT_WHAT.index("name attribute")
+WHAT_NAME_LIST: int = HINT_WHAT.index("name list")
+WHAT_NAMES: int = HINT_WHAT.index("names")
+WHAT_PARAMETERS: int = HINT_WHAT.index("parameters")
+WHAT_START_EXPRESSION: int = HINT_WHAT.index("start expression")
+WHAT_STEP_EXPRESSION: int = HINT_WHAT.index("step expression")
+WHAT_STOP_EXPRESSION: int = HINT_WHAT.index("stop expression")
+WHAT_VALUE_EXPRESSION: int = HINT_WHAT.index("value expression")
+WHAT_VARIABLES: int = HINT_WHAT.index("variables")
+
 
 class Hint:
     def __init__(self, token: Token, where: str, what: str):
@@ -30,6 +191,40 @@ class Hint:
         return str(self)
 
 
+def _body_loaders(
+    text: str,
+    binary: bool,
+    typed: bool,
+    ignore_unicode_errors: bool,
+    include_comments: bool,
+) -> Callable[[Token, Token], Callable[[], Block]]:
+    """
+    Make the loaders of the function bodies a lazy parser of `text` skips
+
+    :return: a function that takes the function and block token of a skipped body,
+        and returns a function that parses it
+    """
+
+    def loader(function_token: Token, block_token: Token) -> Callable[[], Block]:
+        def load() -> Block:
+            # all tokens of a chunk share one line index
+            parser: Parser = Parser(
+                text,
+                typed,
+                ignore_unicode_errors,
+                include_comments=include_comments,
+                lazy=True,
+                start=block_token.end,
+                line_index=block_token.line_index,
+                binary=binary,
+            )
+            return parser.parse_function_body(function_token, block_token)
+
+        return load
+
+    return loader
+
+
 class Parser:
     _BLOCK_END_TYPES = (
         TokenType.EOF,
@@ -39,31 +234,81 @@ class Parser:
         TokenType.ELSEIF,
         TokenType.ELSE,
     )
+    # Expressions and blocks nested deeper than this are parsed on an explicit stack,
+    # everything above is parsed by plain recursion, which is faster
+    max_recursion_depth: int = 50
 
     def __init__(
-        self, chunk: str, typed: bool = False, ignore_unicode_errors: bool = False
+        self,
+        chunk: Source,
+        typed: bool = False,
+        ignore_unicode_errors: bool = False,
+        buffered: bool = False,
+        include_comments: bool = True,
+        lazy: bool = False,
+        start: int = 0,
+        line_index: Optional[LineIndex] = None,
+        binary: bool = False,
     ):
-        self.chunk: str = chunk
-        self.lexer: Lexer = Lexer(self.chunk, typed, ignore_unicode_errors)
-        self.current_token: Token = self.lexer.get_next_token()
-        self.next_token: Token = self.lexer.get_next_token()
-        self.context_hints: list[Hint] = []
+        # parsing may start at the end of any token (start), for parts of a source
+        self.lexer: Lexer = Lexer(
+            chunk,
+            typed,
+            ignore_unicode_errors,
+            include_comments,
+            start,
+            line_index,
+            binary,
+        )
+        self.chunk: str = self.lexer.text
+        self._get_next_token: Callable[[], Token] = self.lexer.get_next_token
+        if buffered:
+            # lex everything up front, and read the tokens from the buffer
+            self._get_next_token = self.lexer.tokenize_all().cursor().get_next_token
+        self.current_token: Token = self._get_next_token()
+        self.next_token: Token = self._get_next_token()
+        self._hints: list[int] = []
+        self._depth: int = 0
+        # function bodies of lazy parsers are skipped, and parsed once they are used
+        self._body_loaders: Optional[Callable[[Token, Token], Callable[[], Block]]] = (
+            _body_loaders(
+                self.lexer.text,
+                self.lexer.binary,
+                typed,
+                ignore_unicode_errors,
+                include_comments,
+            )
+            if lazy
+            else None
+        )
+
+    @property
+    def context_hints(self) -> list[Hint]:
+        """Current context hints, from the outermost to the innermost"""
+        # the hint tokens are lexed again, from their start offsets
+        lexer: Lexer = copy(self.lexer)
+        hints: list[Hint] = []
+        for hint in self._hints:
+            lexer.seek(hint >> HINT_TOKEN_SHIFT)
+            hints.append(
+                Hint(
+                    lexer.get_next_token(),
+                    HINT_WHERE[hint >> HINT_TEXT_BITS & HINT_TEXT_MASK],
+                    HINT_WHAT[hint & HINT_TEXT_MASK],
+                )
+            )
+        return hints
 
     def _error(self, message: str, token: Token) -> NoReturn:
         """Throw an error, prints out a description, and finally throws a value error"""
-        current_line: int = token.line
-        current_column = token.column
-        full_error: str = f"Error on line {current_line}:\n"
-        lines: list[str] = self.chunk.split("\n")  # pragma: no mutate
-        if current_line > 1:
-            full_error += lines[current_line - 2] + "\n"
-        full_error += lines[current_line - 1] + "\n"
-        full_error += " " * (current_column - 1) + "^\n"
+        line_index: LineIndex = token.line_index or self.lexer.line_index
+        full_error: str = line_index.excerpt(token.start, context_lines=1)
         full_error += message + "\n"
-        if self.context_hints:
+        hints: list[Hint] = self.context_hints
+        if hints:
             full_error += "hints: "
-            full_error += " -> ".join(str(hint) for hint in self.context_hints) + "\n"
-        raise ParserError(message, self.context_hints, token, full_error)
+            full_error += " -> ".join(str(hint) for hint in hints) + "\n"
+        raise ParserError(message, hints, token, full_error)
 
     def _assert(self, token_type: TokenType) -> None:
         """Assert that the current token is of a certain kind"""
@@ -75,18 +320,44 @@ class Parser:
         if token_type:
             self._assert(token_type)
         self.current_token = self.next_token
-        self.next_token = self.lexer.get_next_token()
+        self.next_token = self._get_next_token()
 
-    def _add_hint(self, where: str, what: str, token: Optional[Token] = None) -> None:
+    def _add_hint(self, where: int, what: int, token: Optional[Token] = None) -> None:
         """Add a context hint for error messages"""
-        self.context_hints.append(Hint(token or self.current_token, where, what))
+        self._hints.append(
+            (token or self.current_token).start << HINT_TOKEN_SHIFT | where | what
+        )
 
     def _remove_hint(self) -> None:
         """Remove a context hint for error messages"""
-        self.context_hints.pop()
+        self._hints.pop()
+
+    def _switch_hint(self, what: int) -> None:
+        self._hints[-1] = self._hints[-1] & ~HINT_TEXT_MASK | what
 
-    def _switch_hint(self, what: str) -> None:
-        self.context_hints[-1].what = what
+    def _drop_hints(self, count: int) -> None:
+        """Remove all context hints, except for the first `count` ones"""
+        del self._hints[count:]
+
+    def _run(self, steps: Steps[T]) -> T:
+        """
+        Run parsing steps to completion. Nested steps are kept on an explicit stack,
+        so deeply nested code does not exhaust the Python call stack.
+        """
+        stack: list[Steps[Any]] = []
+        value: Any = None
+        while True:
+            try:
+                nested: Steps[Any] = steps.send(value)
+            except StopIteration as result:
+                if not stack:
+                    return result.value
+                steps = stack.pop()
+                value = result.value
+            else:
+                stack.append(steps)
+                steps = nested
+                value = None
 
     def parse_chunk(self) -> Chunk:
         """
@@ -99,28 +370,83 @@ class Parser:
         block.token.comment = []
         return Chunk(block.token, block.statements, block.returns)
 
+    def parse_function_body(self, function_token: Token, block_token: Token) -> Block:
+        """
+        Parse a function body, that was skipped by a lazy parser. The parser has to
+        start right after the parameters, at the end of `block_token`.
+
+        :param function_token: the FUNCTION token of the function
+        :param block_token: the R_PAREN token of the parameters, directly before the body
+        :return: the body of the function
+        """
+        self._add_hint(WHERE_FUNCTION, WHAT_BODY, function_token)
+        body: Block = self._parse_block(block_token, True)
+        self._remove_hint()
+        return body
+
+    def iter_statements(
+        self,
+    ) -> Generator[Statement, None, Optional[list[Expression]]]:
+        """
+        Parse a chunk one top-level statement at a time, and yield every statement as
+        soon as it is parsed. The return value of the generator are the returns of
+        the chunk, as in `Chunk.returns`.
+
+        chunk: block
+        """
+        while self.current_token.type not in self._BLOCK_END_TYPES:
+            yield self._parse_statement()
+        return self._parse_block(self.current_token).returns
+
     def _parse_block(self, block_token: Token, expect_end: bool = False) -> Block:
         """
         Parse a block
 
         block: [DO | REPEAT | THEN | ELSE] {stat} [RETURN explist [SEMICOLON]] [END]
         """
-        block: Block = Block(block_token, [], None)
+        if self._depth >= self.max_recursion_depth:
+            return self._run(self._parse_block_steps(block_token, expect_end))
+        self._depth += 1
+        statements: list[Statement] = []
+        returns: Optional[list[Expression]] = None
+        while self.current_token.type not in self._BLOCK_END_TYPES:
+            statements.append(self._parse_statement())
+        if self.current_token.type == TokenType.RETURN:
+            self._eat_token()
+            returns = []
+            if (
+                self.current_token.type
+                not in (TokenType.SEMICOLON,) + self._BLOCK_END_TYPES
+            ):
+                returns = self._parse_exp_list()
+            if self.current_token.type == TokenType.SEMICOLON:  # type: ignore
+                self._eat_token()
+        if expect_end:
+            self._eat_token(TokenType.END)
+        self._depth -= 1
+        return Block(block_token, statements, returns)
+
+    def _parse_block_steps(
+        self, block_token: Token, expect_end: bool = False
+    ) -> Steps[Block]:
+        """Steps of `_parse_block`, run on the explicit stack"""
+        statements: list[Statement] = []
+        returns: Optional[list[Expression]] = None
         while self.current_token.type not in self._BLOCK_END_TYPES:
-            block.statements.append(self._parse_statement())
+            statements.append((yield self._parse_statement_steps()))
         if self.current_token.type == TokenType.RETURN:
             self._eat_token()
-            block.returns = []
+            returns = []
             if (
                 self.current_token.type
                 not in (TokenType.SEMICOLON,) + self._BLOCK_END_TYPES
             ):
-                block.returns = self._parse_exp_list()
+                returns = yield self._parse_exp_list_steps()
             if self.current_token.type == TokenType.SEMICOLON:  # type: ignore
                 self._eat_token()
         if expect_end:
             self._eat_token(TokenType.END)
-        return block
+        return Block(block_token, statements, returns)
 
     def _parse_statement(self) -> Statement:
         """Parse a statement"""
@@ -154,6 +480,38 @@ class Parser:
             case _:
                 self._error("Unexpected statement", self.current_token)
 
+    def _parse_statement_steps(self) -> Steps[Statement]:
+        """Steps of `_parse_statement`, run on the explicit stack"""
+        match self.current_token.type:
+            case TokenType.SEMICOLON:
+                return self._parse_semi()
+            case TokenType.BREAK:
+                return self._parse_break()
+            case TokenType.GOTO:
+                return self._parse_goto()
+            case TokenType.LABEL_BORDER:
+                return self._parse_label()
+            case TokenType.DO:
+                block_token: Token = self.current_token
+                self._eat_token()
+                return (yield self._parse_block_steps(block_token, True))
+            case TokenType.WHILE:
+                return (yield self._parse_while_steps())
+            case TokenType.REPEAT:
+                return (yield self._parse_repeat_steps())
+            case TokenType.IF:
+                return (yield self._parse_if_steps())
+            case TokenType.FOR:
+                return (yield self._parse_for_steps())
+            case TokenType.FUNCTION:
+                return (yield self._parse_function_steps())
+            case TokenType.LOCAL:
+                return (yield self._parse_local_steps())
+            case TokenType.L_PAREN | TokenType.NAME:
+                return (yield self._parse_var_stmt_steps())
+            case _:
+                self._error("Unexpected statement", self.current_token)
+
     def _parse_break(self) -> Break:
         """Parse a break statement"""
         break_token: Token = self.current_token
@@ -173,7 +531,7 @@ class Parser:
         goto_stmt: GOTO Name
         """
         goto_token: Token = self.current_token
-        self._add_hint("goto", "name")
+        self._add_hint(WHERE_GOTO, WHAT_NAME)
         self._eat_token(TokenType.GOTO)
         name: Name = self.__eat_name()
         self._remove_hint()
@@ -186,10 +544,10 @@ class Parser:
         label_stmt: LABEL_BORDER Name LABEL_BORDER
         """
         opening_token: Token = self.current_token
-        self._add_hint("label", "name")
+        self._add_hint(WHERE_LABEL, WHAT_NAME)
         self._eat_token(TokenType.LABEL_BORDER)
         name: Name = self.__eat_name()
-        self._switch_hint("end")
+        self._switch_hint(WHAT_END)
         self._eat_token(TokenType.LABEL_BORDER)
         self._remove_hint()
         return Label(opening_token, name)
@@ -201,10 +559,10 @@ class Parser:
         while_stmt: WHILE exp DO block END
         """
         while_token: Token = self.current_token
-        self._add_hint("while", "condition")
+        self._add_hint(WHERE_WHILE, WHAT_CONDITION)
         self._eat_token(TokenType.WHILE)
         condition: Expression = self._parse_exp()
-        self._switch_hint("block")
+        self._switch_hint(WHAT_BLOCK)
         block_token: Token = self.current_token
         self._eat_token(TokenType.DO)
         body: Block = self._parse_block(block_token, True)
@@ -212,6 +570,20 @@ class Parser:
         self._remove_hint()
         return While(while_token, condition, body)
 
+    def _parse_while_steps(self) -> Steps[While]:
+        """Steps of `_parse_while`, run on the explicit stack"""
+        while_token: Token = self.current_token
+        self._add_hint(WHERE_WHILE, WHAT_CONDITION)
+        self._eat_token(TokenType.WHILE)
+        condition: Expression = (yield self._parse_exp_steps())
+        self._switch_hint(WHAT_BLOCK)
+        block_token: Token = self.current_token
+        self._eat_token(TokenType.DO)
+        body: Block = (yield self._parse_block_steps(block_token, True))
+        body.comment.extend(while_token.comment)
+        self._remove_hint()
+        return While(while_token, condition, body)
+
     def _parse_repeat(self) -> Repeat:
         """
         Parse a repeat until loop
@@ -219,17 +591,31 @@ class Parser:
         repeat_stmt: REPEAT block UNTIL exp
         """
         repeat_token: Token = self.current_token
-        self._add_hint("repeat", "block")
+        self._add_hint(WHERE_REPEAT, WHAT_BLOCK)
         block_token: Token = self.current_token
         self._eat_token(TokenType.REPEAT)
         body: Block = self._parse_block(block_token)
         body.comment.extend(repeat_token.comment)
-        self._switch_hint("condition")
+        self._switch_hint(WHAT_CONDITION)
         self._eat_token(TokenType.UNTIL)
         condition: Expression = self._parse_exp()
         self._remove_hint()
         return Repeat(repeat_token, condition, body)
 
+    def _parse_repeat_steps(self) -> Steps[Repeat]:
+        """Steps of `_parse_repeat`, run on the explicit stack"""
+        repeat_token: Token = self.current_token
+        self._add_hint(WHERE_REPEAT, WHAT_BLOCK)
+        block_token: Token = self.current_token
+        self._eat_token(TokenType.REPEAT)
+        body: Block = (yield self._parse_block_steps(block_token))
+        body.comment.extend(repeat_token.comment)
+        self._switch_hint(WHAT_CONDITION)
+        self._eat_token(TokenType.UNTIL)
+        condition: Expression = (yield self._parse_exp_steps())
+        self._remove_hint()
+        return Repeat(repeat_token, condition, body)
+
     def _parse_if(self) -> If:
         """
         Parse an if statement
@@ -237,10 +623,10 @@ class Parser:
         if_stmt: IF exp THEN block {ELSEIF exp THEN block} [ELSE block] end
         """
         if_token: Token = self.current_token
-        self._add_hint("if", "if condition")
+        self._add_hint(WHERE_IF, WHAT_IF_CONDITION)
         self._eat_token(TokenType.IF)
         if_cond: Expression = self._parse_exp()
-        self._switch_hint("if block")
+        self._switch_hint(WHAT_IF_BLOCK)
         block_token: Token = self.current_token
         self._eat_token(TokenType.THEN)
         if_block: Block = self._parse_block(block_token)
@@ -249,17 +635,17 @@ class Parser:
         elseif_conditions: list[Expression] = []
         elseif_blocks: list[Block] = []
         while self.current_token.type == TokenType.ELSEIF:
-            self._switch_hint("elseif condition")
+            self._switch_hint(WHAT_ELSEIF_CONDITION)
             elseif_tokens.append(self.current_token)
             self._eat_token()
             elseif_conditions.append(self._parse_exp())
-            self._switch_hint("elseif block")
+            self._switch_hint(WHAT_ELSEIF_BLOCK)
             block_token = self.current_token
             self._eat_token(TokenType.THEN)
             elseif_blocks.append(self._parse_block(block_token))
         else_block: Optional[Block] = None
         if self.current_token.type == TokenType.ELSE:
-            self._switch_hint("else block")
+            self._switch_hint(WHAT_ELSE_BLOCK)
             block_token = self.current_token
             self._eat_token()
             else_block = self._parse_block(block_token)
@@ -273,6 +659,45 @@ class Parser:
             )
         return If(if_token, if_cond, if_block, current_if)
 
+    def _parse_if_steps(self) -> Steps[If]:
+        """Steps of `_parse_if`, run on the explicit stack"""
+        if_token: Token = self.current_token
+        self._add_hint(WHERE_IF, WHAT_IF_CONDITION)
+        self._eat_token(TokenType.IF)
+        if_cond: Expression = (yield self._parse_exp_steps())
+        self._switch_hint(WHAT_IF_BLOCK)
+        block_token: Token = self.current_token
+        self._eat_token(TokenType.THEN)
+        if_block: Block = (yield self._parse_block_steps(block_token))
+        if_block.comment.extend(if_token.comment)
+        elseif_tokens: list[Token] = []
+        elseif_conditions: list[Expression] = []
+        elseif_blocks: list[Block] = []
+        while self.current_token.type == TokenType.ELSEIF:
+            self._switch_hint(WHAT_ELSEIF_CONDITION)
+            elseif_tokens.append(self.current_token)
+            self._eat_token()
+            elseif_conditions.append((yield self._parse_exp_steps()))
+            self._switch_hint(WHAT_ELSEIF_BLOCK)
+            block_token = self.current_token
+            self._eat_token(TokenType.THEN)
+            elseif_blocks.append((yield self._parse_block_steps(block_token)))
+        else_block: Optional[Block] = None
+        if self.current_token.type == TokenType.ELSE:
+            self._switch_hint(WHAT_ELSE_BLOCK)
+            block_token = self.current_token
+            self._eat_token()
+            else_block = yield self._parse_block_steps(block_token)
+        self._eat_token(TokenType.END)
+        self._remove_hint()
+        current_if: Optional[If | Block] = else_block
+        for i in range(len(elseif_conditions) - 1, -1, -1):
+            elseif_blocks[i].comment.extend(if_token.comment)
+            current_if = If(
+                elseif_tokens[i], elseif_conditions[i], elseif_blocks[i], current_if
+            )
+        return If(if_token, if_cond, if_block, current_if)
+
     def _parse_for(self) -> IterativeFor | NumericFor:
         """
         Parses either an iterative or numeric for, depending on how it looks like
@@ -280,7 +705,7 @@ class Parser:
         for_stmt: num_for | it_for
         """
         for_token: Token = self.current_token
-        self._add_hint("for", "name")
+        self._add_hint(WHERE_FOR, WHAT_NAME)
         self._eat_token(TokenType.FOR)
         first_name: Name = self.__eat_name()
         self._remove_hint()
@@ -290,24 +715,37 @@ class Parser:
             return self._parse_iterative_for(for_token, first_name)
         self._error("Unexpected for condition", self.current_token)
 
+    def _parse_for_steps(self) -> Steps[IterativeFor | NumericFor]:
+        """Steps of `_parse_for`, run on the explicit stack"""
+        for_token: Token = self.current_token
+        self._add_hint(WHERE_FOR, WHAT_NAME)
+        self._eat_token(TokenType.FOR)
+        first_name: Name = self.__eat_name()
+        self._remove_hint()
+        if self.current_token.type == TokenType.ASSIGN:
+            return (yield self._parse_numeric_for_steps(for_token, first_name))
+        if self.current_token.type in (TokenType.COMMA, TokenType.IN):
+            return (yield self._parse_iterative_for_steps(for_token, first_name))
+        self._error("Unexpected for condition", self.current_token)
+
     def _parse_numeric_for(self, for_token: Token, name: Name) -> NumericFor:
         """
         Parse a numeric for
 
         num_for: FOR Name ASSIGN exp COMMA exp [COMMA exp] DO block END
         """
-        self._add_hint("numeric for", "start expression")
+        self._add_hint(WHERE_NUMERIC_FOR, WHAT_START_EXPRESSION)
         self._eat_token(TokenType.ASSIGN)
         start: Expression = self._parse_exp()
-        self._switch_hint("stop expression")
+        self._switch_hint(WHAT_STOP_EXPRESSION)
         self._eat_token(TokenType.COMMA)
         stop: Expression = self._parse_exp()
         step: Optional[Expression] = None
         if self.current_token.type == TokenType.COMMA:
-            self._switch_hint("step expression")
+            self._switch_hint(WHAT_STEP_EXPRESSION)
             self._eat_token()
             step = self._parse_exp()
-        self._switch_hint("block")
+        self._switch_hint(WHAT_BLOCK)
         block_token: Token = self.current_token
         self._eat_token(TokenType.DO)
         body: Block = self._parse_block(block_token, True)
@@ -315,18 +753,41 @@ class Parser:
         self._remove_hint()
         return NumericFor(for_token, name, start, stop, step, body)
 
+    def _parse_numeric_for_steps(
+        self, for_token: Token, name: Name
+    ) -> Steps[NumericFor]:
+        """Steps of `_parse_numeric_for`, run on the explicit stack"""
+        self._add_hint(WHERE_NUMERIC_FOR, WHAT_START_EXPRESSION)
+        self._eat_token(TokenType.ASSIGN)
+        start: Expression = (yield self._parse_exp_steps())
+        self._switch_hint(WHAT_STOP_EXPRESSION)
+        self._eat_token(TokenType.COMMA)
+        stop: Expression = (yield self._parse_exp_steps())
+        step: Optional[Expression] = None
+        if self.current_token.type == TokenType.COMMA:
+            self._switch_hint(WHAT_STEP_EXPRESSION)
+            self._eat_token()
+            step = yield self._parse_exp_steps()
+        self._switch_hint(WHAT_BLOCK)
+        block_token: Token = self.current_token
+        self._eat_token(TokenType.DO)
+        body: Block = (yield self._parse_block_steps(block_token, True))
+        body.comment.extend(for_token.comment)
+        self._remove_hint()
+        return NumericFor(for_token, name, start, stop, step, body)
+
     def _parse_iterative_for(self, for_token: Token, name: Name) -> IterativeFor:
         """
         Parse an iterative for
 
         it_for: FOR namelist IN explist DO block END
         """
-        self._add_hint("iterative for", "name list")
+        self._add_hint(WHERE_ITERATIVE_FOR, WHAT_NAME_LIST)
         names: list[Name] = self._parse_name_list(name)
-        self._switch_hint("expression list")
+        self._switch_hint(WHAT_EXPRESSION_LIST)
         self._eat_token(TokenType.IN)
         expressions: list[Expression] = self._parse_exp_list()
-        self._switch_hint("block")
+        self._switch_hint(WHAT_BLOCK)
         block_token: Token = self.current_token
         self._eat_token(TokenType.DO)
         body: Block = self._parse_block(block_token, True)
@@ -334,6 +795,23 @@ class Parser:
         self._remove_hint()
         return IterativeFor(for_token, names, expressions, body)
 
+    def _parse_iterative_for_steps(
+        self, for_token: Token, name: Name
+    ) -> Steps[IterativeFor]:
+        """Steps of `_parse_iterative_for`, run on the explicit stack"""
+        self._add_hint(WHERE_ITERATIVE_FOR, WHAT_NAME_LIST)
+        names: list[Name] = self._parse_name_list(name)
+        self._switch_hint(WHAT_EXPRESSION_LIST)
+        self._eat_token(TokenType.IN)
+        expressions: list[Expression] = (yield self._parse_exp_list_steps())
+        self._switch_hint(WHAT_BLOCK)
+        block_token: Token = self.current_token
+        self._eat_token(TokenType.DO)
+        body: Block = (yield self._parse_block_steps(block_token, True))
+        body.comment.extend(for_token.comment)
+        self._remove_hint()
+        return IterativeFor(for_token, names, expressions, body)
+
     def _parse_function(self) -> FunctionDefinition:
         """
         Parse a non-local function statement
@@ -341,7 +819,7 @@ class Parser:
         funct_stmt: FUNCTION Name {DOT Name} [COLON Name] funcbody
         """
         function_token: Token = self.current_token
-        self._add_hint("function", "name")
+        self._add_hint(WHERE_FUNCTION, WHAT_NAME)
         self._eat_token(TokenType.FUNCTION)
         names: list[Name] = [self.__eat_name()]
         while self.current_token.type == TokenType.DOT:
@@ -349,19 +827,38 @@ class Parser:
             names.append(self.__eat_name())
         method: Optional[Name] = None
         if self.current_token.type == TokenType.COLON:
-            self._switch_hint("method name")
+            self._switch_hint(WHAT_METHOD_NAME)
             self._eat_token()
             method = self.__eat_name()
         base_function: BaseFunctionDefinition = self._parse_funcbody(function_token)
         return FunctionDefinition.from_base_definition(base_function, names, method)
 
+    def _parse_function_steps(self) -> Steps[FunctionDefinition]:
+        """Steps of `_parse_function`, run on the explicit stack"""
+        function_token: Token = self.current_token
+        self._add_hint(WHERE_FUNCTION, WHAT_NAME)
+        self._eat_token(TokenType.FUNCTION)
+        names: list[Name] = [self.__eat_name()]
+        while self.current_token.type == TokenType.DOT:
+            self._eat_token()
+            names.append(self.__eat_name())
+        method: Optional[Name] = None
+        if self.current_token.type == TokenType.COLON:
+            self._switch_hint(WHAT_METHOD_NAME)
+            self._eat_token()
+            method = self.__eat_name()
+        base_function: BaseFunctionDefinition = (
+            yield self._parse_funcbody_steps(function_token)
+        )
+        return FunctionDefinition.from_base_definition(base_function, names, method)
+
     def _parse_funcbody(self, function_token: Token) -> BaseFunctionDefinition:
         """
         Parse a function body (starting from parameters till end)
 
         funcbody: L_PAREN [namelist [COMMA ELLIPSIS] | ELLIPSIS] R_PAREN block END
         """
-        self._switch_hint("parameters")
+        self._switch_hint(WHAT_PARAMETERS)
         self._eat_token(TokenType.L_PAREN)
         parameters: list[Name | Vararg] = []
         if self.current_token.type == TokenType.NAME:
@@ -373,13 +870,74 @@ class Parser:
             parameters.append(Vararg.from_token(self.current_token))
             self._eat_token()
         block_token: Token = self.current_token
-        self._switch_hint("body")
+        self._switch_hint(WHAT_BODY)
         self._eat_token(TokenType.R_PAREN)
-        body: Block = self._parse_block(block_token, True)
+        body: Block
+        if self._body_loaders:
+            body = LazyBlock(
+                block_token,
+                self._body_loaders(function_token, block_token),
+                self._skip_block().start,
+            )
+        else:
+            body = self._parse_block(block_token, True)
         body.comment.extend(function_token.comment)
         self._remove_hint()
         return BaseFunctionDefinition(function_token, parameters, body)
 
+    def _parse_funcbody_steps(
+        self, function_token: Token
+    ) -> Steps[BaseFunctionDefinition]:
+        """Steps of `_parse_funcbody`, run on the explicit stack"""
+        self._switch_hint(WHAT_PARAMETERS)
+        self._eat_token(TokenType.L_PAREN)
+        parameters: list[Name | Vararg] = []
+        if self.current_token.type == TokenType.NAME:
+            parameters.extend(self._parse_name_list(leave_vararg=True))
+            if self.current_token.type == TokenType.ELLIPSIS:  # type: ignore
+                parameters.append(Vararg.from_token(self.current_token))
+                self._eat_token()
+        elif self.current_token.type == TokenType.ELLIPSIS:
+            parameters.append(Vararg.from_token(self.current_token))
+            self._eat_token()
+        block_token: Token = self.current_token
+        self._switch_hint(WHAT_BODY)
+        self._eat_token(TokenType.R_PAREN)
+        body: Block
+        if self._body_loaders:
+            body = LazyBlock(
+                block_token,
+                self._body_loaders(function_token, block_token),
+                self._skip_block().start,
+            )
+        else:
+            body = yield self._parse_block_steps(block_token, True)
+        body.comment.extend(function_token.comment)
+        self._remove_hint()
+        return BaseFunctionDefinition(function_token, parameters, body)
+
+    def _skip_block(self) -> Token:
+        """
+        Skip the tokens of a function body, up to and including the END closing it.
+        Brackets and blocks have to be closed by the matching token, any other error
+        is only found once the body is parsed.
+
+        :return: the END token
+        """
+        opened: list[TokenType] = [TokenType.FUNCTION]
+        while True:
+            token: Token = self.current_token
+            if token.type in SKIPPED_OPENERS:
+                opened.append(token.type)
+            elif closes := SKIPPED_CLOSERS.get(token.type):
+                if opened.pop() not in closes:
+                    self._error("Unexpected token", token)
+            elif token.type == TokenType.EOF:
+                self._error("Unexpected token", token)
+            self._eat_token()
+            if not opened:
+                return token
+
     def _parse_local(self) -> LocalFunctionDefinition | LocalAssign:
         """
         Parse a local function definition or local assign
@@ -394,13 +952,23 @@ class Parser:
             return self._parse_local_assignment(local_token)
         self._error("Unexpected symbol after local", self.current_token)
 
+    def _parse_local_steps(self) -> Steps[LocalFunctionDefinition | LocalAssign]:
+        """Steps of `_parse_local`, run on the explicit stack"""
+        local_token: Token = self.current_token
+        self._eat_token(TokenType.LOCAL)
+        if self.current_token.type == TokenType.FUNCTION:
+            return (yield self._parse_local_function_steps(local_token))
+        if self.current_token.type == TokenType.NAME:
+            return (yield self._parse_local_assignment_steps(local_token))
+        self._error("Unexpected symbol after local", self.current_token)
+
     def _parse_local_function(self, local_token: Token) -> LocalFunctionDefinition:
         """
         Parse a local function definition
 
         local_funct_stmt: LOCAL FUNCTION Name funcbody
         """
-        self._add_hint("local function", "name")
+        self._add_hint(WHERE_LOCAL_FUNCTION, WHAT_NAME)
         function_token: Token = self.current_token
         function_token.comment.extend(local_token.comment)
         self._eat_token(TokenType.FUNCTION)
@@ -408,21 +976,35 @@ class Parser:
         base_function: BaseFunctionDefinition = self._parse_funcbody(function_token)
         return LocalFunctionDefinition.from_base_definition(base_function, name)
 
+    def _parse_local_function_steps(
+        self, local_token: Token
+    ) -> Steps[LocalFunctionDefinition]:
+        """Steps of `_parse_local_function`, run on the explicit stack"""
+        self._add_hint(WHERE_LOCAL_FUNCTION, WHAT_NAME)
+        function_token: Token = self.current_token
+        function_token.comment.extend(local_token.comment)
+        self._eat_token(TokenType.FUNCTION)
+        name: Name = self.__eat_name()
+        base_function: BaseFunctionDefinition = (
+            yield self._parse_funcbody_steps(function_token)
+        )
+        return LocalFunctionDefinition.from_base_definition(base_function, name)
+
     def _parse_local_assignment(self, local_token: Token) -> LocalAssign:
         """
         Parse a local assign
 
         local_assign_stmt: LOCAL Name [LESS_THAN Name GREATER_THAN] {COMMA Name [LESS_THAN Name GREATER_THAN]} [ASSIGN explist]
         """
-        self._add_hint("local assign", "names")
+        self._add_hint(WHERE_LOCAL_ASSIGN, WHAT_NAMES)
         self._assert(TokenType.NAME)
         names: list[AttributedName] = []
         while True:
-            self._switch_hint("name")
+            self._switch_hint(WHAT_NAME)
             name: Name = self.__eat_name()
             attribute: Optional[Name] = None
             if self.current_token.type == TokenType.LESS_THAN:
-                self._switch_hint("name attribute")
+                self._switch_hint(WHAT_NAME_ATTRIBUTE)
                 self._eat_token()
                 attribute = self.__eat_name()
                 self._eat_token(TokenType.GREATER_THAN)
@@ -433,12 +1015,39 @@ class Parser:
                 break
         expressions: Optional[list[Expression]] = None
         if self.current_token.type == TokenType.ASSIGN:
-            self._switch_hint("expressions")
+            self._switch_hint(WHAT_EXPRESSIONS)
             self._eat_token()
             expressions = self._parse_exp_list()
         self._remove_hint()
         return LocalAssign(local_token, names, expressions)
 
+    def _parse_local_assignment_steps(self, local_token: Token) -> Steps[LocalAssign]:
+        """Steps of `_parse_local_assignment`, run on the explicit stack"""
+        self._add_hint(WHERE_LOCAL_ASSIGN, WHAT_NAMES)
+        self._assert(TokenType.NAME)
+        names: list[AttributedName] = []
+        while True:
+            self._switch_hint(WHAT_NAME)
+            name: Name = self.__eat_name()
+            attribute: Optional[Name] = None
+            if self.current_token.type == TokenType.LESS_THAN:
+                self._switch_hint(WHAT_NAME_ATTRIBUTE)
+                self._eat_token()
+                attribute = self.__eat_name()
+                self._eat_token(TokenType.GREATER_THAN)
+            names.append(AttributedName(name, attribute))
+            if self.current_token.type == TokenType.COMMA:
+                self._eat_token()
+            else:
+                break
+        expressions: Optional[list[Expression]] = None
+        if self.current_token.type == TokenType.ASSIGN:
+            self._switch_hint(WHAT_EXPRESSIONS)
+            self._eat_token()
+            expressions = yield self._parse_exp_list_steps()
+        self._remove_hint()
+        return LocalAssign(local_token, names, expressions)
+
     def _parse_exp_list(self) -> list[Expression]:
         """
         Parse a list of expressions
@@ -454,6 +1063,17 @@ class Parser:
                 break
         return expressions
 
+    def _parse_exp_list_steps(self) -> Steps[list[Expression]]:
+        """Steps of `_parse_exp_list`, run on the explicit stack"""
+        expressions: list[Expression] = []
+        while True:
+            expressions.append((yield self._parse_exp_steps()))
+            if self.current_token.type == TokenType.COMMA:
+                self._eat_token()
+            else:
+                break
+        return expressions
+
     def _parse_semi(self) -> Semicolon:
         """
         Parse a semicolon
@@ -489,6 +1109,27 @@ class Parser:
             self._error("Unexpected lonely name", self.current_token)
         assert False, "unreachable line"  # pragma: no mutate
 
+    def _parse_var_stmt_steps(self) -> Steps[FunctionCall | MethodInvocation | Assign]:
+        """Steps of `_parse_var_stmt`, run on the explicit stack"""
+        first_token: Token = self.current_token
+        first_var: Expression = (yield self._parse_var_steps())
+        if self.current_token.type in (TokenType.COMMA, TokenType.ASSIGN):
+            return (yield self._parse_assignment_steps(first_token, first_var))
+        if isinstance(first_var, ExpFunctionCall):
+            return FunctionCall(
+                first_var.token, first_var.function, first_var.arguments
+            )
+        if isinstance(first_var, ExpMethodInvocation):
+            return MethodInvocation(
+                first_var.token,
+                first_var.function,
+                first_var.method,
+                first_var.arguments,
+            )
+        if isinstance(first_var, Name):
+            self._error("Unexpected lonely name", self.current_token)
+        assert False, "unreachable line"  # pragma: no mutate
+
     def _parse_assignment(self, first_token: Token, first_var: Expression) -> Assign:
         """
         Parse an assignment
@@ -496,185 +1137,113 @@ class Parser:
         assign_stmt: var {COMMA var} ASSIGN explist
         """
         variables: list[Expression] = [first_var]
-        self._add_hint("assignment", "variables")
+        self._add_hint(WHERE_ASSIGNMENT, WHAT_VARIABLES)
         while self.current_token.type == TokenType.COMMA:
             self._eat_token()
             variables.append(self._parse_var())
-        self._switch_hint("expressions")
+        self._switch_hint(WHAT_EXPRESSIONS)
         self._eat_token(TokenType.ASSIGN)
         expressions: list[Expression] = self._parse_exp_list()
         self._remove_hint()
         return Assign(first_token, variables, expressions)
 
-    def __parse_left_associative_binop(
-        self, types: tuple[TokenType, ...], base: Callable[[], Expression]
-    ) -> Expression:
-        """Parse a generic left associative binop"""
-        node: Expression = base()
-        while self.current_token.type in types:
-            token: Token = self.current_token
+    def _parse_assignment_steps(
+        self, first_token: Token, first_var: Expression
+    ) -> Steps[Assign]:
+        """Steps of `_parse_assignment`, run on the explicit stack"""
+        variables: list[Expression] = [first_var]
+        self._add_hint(WHERE_ASSIGNMENT, WHAT_VARIABLES)
+        while self.current_token.type == TokenType.COMMA:
             self._eat_token()
-            node = BinOp.from_token(token, node, base())
-        return node
-
-    def __parse_right_associative_binop(
-        self,
-        type: TokenType,
-        base: Callable[[], Expression],
-        operand: Callable[[], Expression],
-    ) -> Expression:
-        """Parse a generic right associative binop"""
-        nodes: list[Expression] = [base()]
-        tokens: list[Token] = []
-        while self.current_token.type == type:
-            tokens.append(self.current_token)
-            self._eat_token()
-            nodes.append(operand())
-        node: Expression = nodes[-1]
-        for i in range(len(nodes) - 2, -1, -1):
-            node = BinOp.from_token(tokens[i], nodes[i], node)
-        return node
-
-    def _parse_exp(self) -> Expression:
-        """
-        Parse an expression
-
-        exp: and_exp {OR and_exp}
-        """
-        return self.__parse_left_associative_binop((TokenType.OR,), self._parse_and_exp)
-
-    def _parse_and_exp(self) -> Expression:
-        """
-        Parse an and expression
-
-        and_exp: comp_exp {OR comp_exp}
-        """
-        return self.__parse_left_associative_binop(
-            (TokenType.AND,), self._parse_comp_exp
-        )
-
-    def _parse_comp_exp(self) -> Expression:
-        """
-        Parse a comparative expression
-
-        comp_exp: bit_or_exp
-                  {(LESS_THAN | GREATER_THAN | LESS_EQUALS | GREATER_EQUALS | NOT_EQUALS | EQUALS) bit_or_exp}
-        """
-        return self.__parse_left_associative_binop(
-            (
-                TokenType.LESS_THAN,
-                TokenType.GREATER_THAN,
-                TokenType.LESS_EQUALS,
-                TokenType.GREATER_EQUALS,
-                TokenType.NOT_EQUALS,
-                TokenType.EQUALS,
-            ),
-            self._parse_bit_or_exp,
-        )
-
-    def _parse_bit_or_exp(self) -> Expression:
-        """
-        Parse a bitwise or expression
-
-        bit_or_exp: bit_xor_exp {BIT_OR bit_xor_exp}
-        """
-        return self.__parse_left_associative_binop(
-            (TokenType.BIT_OR,), self._parse_bit_xor_exp
-        )
-
-    def _parse_bit_xor_exp(self) -> Expression:
-        """
-        Parse a bitwise and expression
-
-        bit_xor_exp: bit_and_expr {BIT_XOR bit_and_expr}
-        """
-        return self.__parse_left_associative_binop(
-            (TokenType.BIT_XOR,), self._parse_bit_and_exp
-        )
-
-    def _parse_bit_and_exp(self) -> Expression:
-        """
-        Parse a bitwise and expression
-
-        bit_and_exp: bit_shift_exp {BIT_AND bit_shift_exp}
-        """
-        return self.__parse_left_associative_binop(
-            (TokenType.BIT_AND,), self._parse_bit_shift_exp
-        )
-
-    def _parse_bit_shift_exp(self) -> Expression:
-        """
-        Parse a bit shift expression
-
-        bit_shift_exp: concat_exp {(BIT_SHIFT_LEFT | BIT_SHIFT_RIGHT) concat_exp}
-        """
-        return self.__parse_left_associative_binop(
-            (TokenType.BIT_SHIFT_LEFT, TokenType.BIT_SHIFT_RIGHT),
-            self._parse_concat_exp,
-        )
-
-    def _parse_concat_exp(self) -> Expression:
-        """
-        Parse a concat expression, right associative
-
-        concat_exp: add_exp {CONCAT add_exp}
-        """
-        return self.__parse_right_associative_binop(
-            TokenType.CONCAT, self._parse_add_exp, self._parse_add_exp
-        )
-
-    def _parse_add_exp(self) -> Expression:
-        """
-        Parse a addition or subtraction expression
-
-        add_exp: mul_exp {(PLUS | MINUS) mul_exp}
-        """
-        return self.__parse_left_associative_binop(
-            (TokenType.PLUS, TokenType.MINUS), self._parse_mul_exp
-        )
-
-    def _parse_mul_exp(self) -> Expression:
-        """
-        Parse a multiplication or division expression
-
-        mul_exp: un_exp {(MULT | DIVIDE | INTEGER_DIVISION | MODULO) un_exp}
-        """
-        return self.__parse_left_associative_binop(
-            (
-                TokenType.MULT,
-                TokenType.DIVIDE,
-                TokenType.INTEGER_DIVISION,
-                TokenType.MODULO,
-            ),
-            self._parse_un_exp,
-        )
+            variables.append((yield self._parse_var_steps()))
+        self._switch_hint(WHAT_EXPRESSIONS)
+        self._eat_token(TokenType.ASSIGN)
+        expressions: list[Expression] = (yield self._parse_exp_list_steps())
+        self._remove_hint()
+        return Assign(first_token, variables, expressions)
 
-    def _parse_un_exp(self) -> Expression:
+    def _parse_exp(self, min_precedence: int = 0) -> Expression:
         """
-        Parse an unary expression
+        Parse an expression using precedence climbing, the operator tables are
+        in tumfl.AST.expression.bin_op
 
-        un_exp: pow_exp | NOT un_exp | HASH un_exp | MINUS un_exp | BIT_XOR un_exp
+        exp: (un_op exp | atom) {bin_op exp}
+        un_op: NOT | HASH | MINUS | BIT_XOR
         """
-        if self.current_token.type in (
-            TokenType.NOT,
-            TokenType.HASH,
-            TokenType.MINUS,
-            TokenType.BIT_XOR,
-        ):
+        if self._depth >= self.max_recursion_depth:
+            return self._run(self._parse_exp_steps(min_precedence))
+        self._depth += 1
+        node: Expression
+        token: Token = self.current_token
+        if token.type in UNARY_OPERANDS:
+            self._eat_token()
+            node = UnOp.from_token(token, self._parse_exp(UNARY_PRECEDENCE))
+        elif literal := LITERALS.get(token.type):
+            self._eat_token()
+            node = literal(token)
+        else:
+            node = self._parse_atom()
+        while (
+            precedence := BINARY_PRECEDENCE.get(self.current_token.type, -1)
+        ) >= min_precedence:
             token = self.current_token
             self._eat_token()
-            return UnOp.from_token(token, self._parse_un_exp())
-        return self._parse_pow_exp()
-
-    def _parse_pow_exp(self) -> Expression:
-        """
-        Parse a exponentiation expression, right associative
+            if token.type not in RIGHT_ASSOCIATIVE_TOKENS:
+                node = BinOp.from_token(token, node, self._parse_exp(precedence + 1))
+                continue
+            # collect the whole chain first, to not recurse once per operand
+            nodes: list[Expression] = [
+                node,
+                self._parse_exp(precedence + 1),
+            ]
+            tokens: list[Token] = [token]
+            while self.current_token.type == token.type:
+                tokens.append(self.current_token)
+                self._eat_token()
+                nodes.append(self._parse_exp(precedence + 1))
+            node = nodes[-1]
+            for i in range(len(nodes) - 2, -1, -1):
+                node = BinOp.from_token(tokens[i], nodes[i], node)
+        self._depth -= 1
+        return node
 
-        pow_exp: atom {EXPONENT atom}
-        """
-        return self.__parse_right_associative_binop(
-            TokenType.EXPONENT, self._parse_atom, self._parse_un_exp
-        )
+    def _parse_exp_steps(self, min_precedence: int = 0) -> Steps[Expression]:
+        """Steps of `_parse_exp`, run on the explicit stack"""
+        node: Expression
+        token: Token = self.current_token
+        if token.type in UNARY_OPERANDS:
+            self._eat_token()
+            node = UnOp.from_token(
+                token, (yield self._parse_exp_steps(UNARY_PRECEDENCE))
+            )
+        elif literal := LITERALS.get(token.type):
+            self._eat_token()
+            node = literal(token)
+        else:
+            node = yield self._parse_atom_steps()
+        while (
+            precedence := BINARY_PRECEDENCE.get(self.current_token.type, -1)
+        ) >= min_precedence:
+            token = self.current_token
+            self._eat_token()
+            if token.type not in RIGHT_ASSOCIATIVE_TOKENS:
+                node = BinOp.from_token(
+                    token, node, (yield self._parse_exp_steps(precedence + 1))
+                )
+                continue
+            nodes: list[Expression] = [
+                node,
+                (yield self._parse_exp_steps(precedence + 1)),
+            ]
+            tokens: list[Token] = [token]
+            while self.current_token.type == token.type:
+                tokens.append(self.current_token)
+                self._eat_token()
+                nodes.append((yield self._parse_exp_steps(precedence + 1)))
+            node = nodes[-1]
+            for i in range(len(nodes) - 2, -1, -1):
+                node = BinOp.from_token(tokens[i], nodes[i], node)
+        return node
 
     def _parse_atom(self) -> Expression:
         """
@@ -683,27 +1252,14 @@ class Parser:
         atom: NIL | TRUE | FALSE | NUMBER | STRING | ELLIPSIS | FUNCTION func_def | tableconstructor | var
         """
         token: Token = self.current_token
-        if token.type == TokenType.NIL:
-            self._eat_token()
-            return Nil.from_token(token)
-        if token.type == TokenType.TRUE:
-            self._eat_token()
-            return Boolean.from_token(token)
-        if token.type == TokenType.FALSE:
-            self._eat_token()
-            return Boolean.from_token(token)
-        if token.type == TokenType.NUMBER:
-            self._eat_token()
-            return Number.from_token(token)
-        if token.type == TokenType.STRING:
+        if literal := LITERALS.get(token.type):
             self._eat_token()
-            return String.from_token(token)
-        if token.type == TokenType.ELLIPSIS:
-            self._eat_token()
-            return Vararg.from_token(token)
+            return literal(token)
         if token.type == TokenType.FUNCTION:
             function_token: Token = self.current_token
-            self._add_hint("function expression", "definition")  # pragma: no mutate
+            self._add_hint(
+                WHERE_FUNCTION_EXPRESSION, WHAT_DEFINITION
+            )  # pragma: no mutate
             self._eat_token()
             base_function: BaseFunctionDefinition = self._parse_funcbody(function_token)
             return ExpFunctionDefinition.from_base_definition(base_function)
@@ -713,6 +1269,28 @@ class Parser:
             return self._parse_var()
         self._error("Unexpected expression", self.current_token)
 
+    def _parse_atom_steps(self) -> Steps[Expression]:
+        """Steps of `_parse_atom`, run on the explicit stack"""
+        token: Token = self.current_token
+        if literal := LITERALS.get(token.type):
+            self._eat_token()
+            return literal(token)
+        if token.type == TokenType.FUNCTION:
+            function_token: Token = self.current_token
+            self._add_hint(
+                WHERE_FUNCTION_EXPRESSION, WHAT_DEFINITION
+            )  # pragma: no mutate
+            self._eat_token()
+            base_function: BaseFunctionDefinition = (
+                yield self._parse_funcbody_steps(function_token)
+            )
+            return ExpFunctionDefinition.from_base_definition(base_function)
+        if token.type == TokenType.L_CURL:
+            return (yield self._parse_table_constructor_steps())
+        if token.type in (TokenType.L_PAREN, TokenType.NAME):
+            return (yield self._parse_var_steps())
+        self._error("Unexpected expression", self.current_token)
+
     def _parse_name_list(
         self, first_name: Optional[Name] = None, leave_vararg: bool = False
     ) -> list[Name]:
@@ -748,7 +1326,7 @@ class Parser:
         if self.current_token.type == TokenType.NAME:
             var = self.__eat_name()
         elif self.current_token.type == TokenType.L_PAREN:
-            self._add_hint("expression var", "expression")
+            self._add_hint(WHERE_EXPRESSION_VAR, WHAT_EXPRESSION)
             remove_hint = True
             self._eat_token()
             var = self._parse_exp()
@@ -764,19 +1342,46 @@ class Parser:
             self._remove_hint()
         return var
 
+    def _parse_var_steps(self) -> Steps[Expression]:
+        """Steps of `_parse_var`, run on the explicit stack"""
+        var: Expression
+        remove_hint: bool = False  # pragma: no mutate
+        if self.current_token.type == TokenType.NAME:
+            var = self.__eat_name()
+        elif self.current_token.type == TokenType.L_PAREN:
+            self._add_hint(WHERE_EXPRESSION_VAR, WHAT_EXPRESSION)
+            remove_hint = True
+            self._eat_token()
+            var = yield self._parse_exp_steps()
+            if isinstance(var, (Vararg, ExpFunctionCall, ExpMethodInvocation)):
+                var.has_parentheses = True
+            self._eat_token(TokenType.R_PAREN)
+        else:
+            self._error("Unexpected variable", self.current_token)
+        var = yield self._parse_or_ignore_var_terminal_steps(var)
+        if remove_hint:
+            self._remove_hint()
+        return var
+
     def _parse_or_ignore_var_terminal(self, base_var: Expression) -> Expression:
         """
-        Parse a var terminal if necessary
+        Parse all var terminals following a var, if there are any
         """
-        if self.current_token.type in (
-            TokenType.L_BRACKET,
-            TokenType.DOT,
-            TokenType.L_PAREN,
-            TokenType.L_CURL,
-            TokenType.COLON,
-            TokenType.STRING,
-        ):
+        hints: int = len(self._hints)
+        while self.current_token.type in VAR_TERMINAL_TYPES:
             base_var = self._parse_var_terminal(base_var)
+        # the hints of every terminal are kept until the whole chain is parsed
+        self._drop_hints(hints)
+        return base_var
+
+    def _parse_or_ignore_var_terminal_steps(
+        self, base_var: Expression
+    ) -> Steps[Expression]:
+        """Steps of `_parse_or_ignore_var_terminal`, run on the explicit stack"""
+        hints: int = len(self._hints)
+        while self.current_token.type in VAR_TERMINAL_TYPES:
+            base_var = yield self._parse_var_terminal_steps(base_var)
+        self._drop_hints(hints)
         return base_var
 
     def _parse_var_terminal(self, base_var: Expression) -> Expression:
@@ -789,35 +1394,57 @@ class Parser:
         token: Token = self.current_token
         var: Expression
         name: Name
-        remove_hint: bool = False  # pragma: no mutate
         match token.type:  # pragma: no mutate
             case TokenType.L_PAREN | TokenType.L_CURL | TokenType.STRING:
                 var = ExpFunctionCall(token, base_var, self._parse_args())
             case TokenType.COLON:
-                self._add_hint("invocation", "name")
-                remove_hint = True
+                self._add_hint(WHERE_INVOCATION, WHAT_NAME)
                 self._eat_token()
                 name = self.__eat_name()
                 args: list[Expression] = self._parse_args()
                 var = ExpMethodInvocation(token, base_var, name, args)
             case TokenType.L_BRACKET:
-                self._add_hint("index", "expression")
-                remove_hint = True
+                self._add_hint(WHERE_INDEX, WHAT_EXPRESSION)
                 self._eat_token()
                 expr: Expression = self._parse_exp()
                 self._eat_token(TokenType.R_BRACKET)
                 var = Index(token, base_var, expr)
             case TokenType.DOT:
-                self._add_hint("index", "name")
-                remove_hint = True
+                self._add_hint(WHERE_INDEX, WHAT_NAME)
+                self._eat_token()
+                name = self.__eat_name()
+                var = NamedIndex(token, base_var, name)
+            case _:  # pragma: no cover
+                assert False, "unreachable line"  # pragma: no mutate
+        return var
+
+    def _parse_var_terminal_steps(self, base_var: Expression) -> Steps[Expression]:
+        """Steps of `_parse_var_terminal`, run on the explicit stack"""
+        token: Token = self.current_token
+        var: Expression
+        name: Name
+        match token.type:  # pragma: no mutate
+            case TokenType.L_PAREN | TokenType.L_CURL | TokenType.STRING:
+                var = ExpFunctionCall(token, base_var, (yield self._parse_args_steps()))
+            case TokenType.COLON:
+                self._add_hint(WHERE_INVOCATION, WHAT_NAME)
+                self._eat_token()
+                name = self.__eat_name()
+                args: list[Expression] = (yield self._parse_args_steps())
+                var = ExpMethodInvocation(token, base_var, name, args)
+            case TokenType.L_BRACKET:
+                self._add_hint(WHERE_INDEX, WHAT_EXPRESSION)
+                self._eat_token()
+                expr: Expression = (yield self._parse_exp_steps())
+                self._eat_token(TokenType.R_BRACKET)
+                var = Index(token, base_var, expr)
+            case TokenType.DOT:
+                self._add_hint(WHERE_INDEX, WHAT_NAME)
                 self._eat_token()
                 name = self.__eat_name()
                 var = NamedIndex(token, base_var, name)
             case _:  # pragma: no cover
                 assert False, "unreachable line"  # pragma: no mutate
-        var = self._parse_or_ignore_var_terminal(var)
-        if remove_hint:
-            self._remove_hint()
         return var
 
     def _parse_table_constructor(self) -> Table:
@@ -826,16 +1453,31 @@ class Parser:
 
         tableconstructor: L_CURL [field {(COMMA | SEMICOLON) field} (COMMA | SEMICOLON)] R_CURL
         """
-        table: Table = Table(self.current_token, [])
-        self._add_hint("table constructor", "fields")
+        table_token: Token = self.current_token
+        fields: list[TableField] = []
+        self._add_hint(WHERE_TABLE_CONSTRUCTOR, WHAT_FIELDS)
+        self._eat_token(TokenType.L_CURL)
+        while self.current_token.type not in (TokenType.R_CURL, TokenType.EOF):
+            fields.append(self._parse_field())
+            if self.current_token.type in (TokenType.COMMA, TokenType.SEMICOLON):
+                self._eat_token()
+        self._eat_token(TokenType.R_CURL)
+        self._remove_hint()
+        return Table(table_token, fields)
+
+    def _parse_table_constructor_steps(self) -> Steps[Table]:
+        """Steps of `_parse_table_constructor`, run on the explicit stack"""
+        table_token: Token = self.current_token
+        fields: list[TableField] = []
+        self._add_hint(WHERE_TABLE_CONSTRUCTOR, WHAT_FIELDS)
         self._eat_token(TokenType.L_CURL)
         while self.current_token.type not in (TokenType.R_CURL, TokenType.EOF):
-            table.fields.append(self._parse_field())
+            fields.append((yield self._parse_field_steps()))
             if self.current_token.type in (TokenType.COMMA, TokenType.SEMICOLON):
                 self._eat_token()
         self._eat_token(TokenType.R_CURL)
         self._remove_hint()
-        return table
+        return Table(table_token, fields)
 
     def _parse_field(self) -> TableField:
         """
@@ -846,11 +1488,11 @@ class Parser:
         token: Token = self.current_token
         value: Expression
         if self.current_token.type == TokenType.L_BRACKET:
-            self._add_hint("explicit table field", "key expression")
+            self._add_hint(WHERE_EXPLICIT_TABLE_FIELD, WHAT_KEY_EXPRESSION)
             self._eat_token()
             at: Expression = self._parse_exp()
             self._eat_token(TokenType.R_BRACKET)
-            self._switch_hint("value expression")
+            self._switch_hint(WHAT_VALUE_EXPRESSION)
             self._eat_token(TokenType.ASSIGN)
             value = self._parse_exp()
             self._remove_hint()
@@ -859,24 +1501,53 @@ class Parser:
             self.current_token.type == TokenType.NAME
             and self.next_token.type == TokenType.ASSIGN
         ):
-            self._add_hint("named table field", "value expression")
+            self._add_hint(WHERE_NAMED_TABLE_FIELD, WHAT_VALUE_EXPRESSION)
             name: Name = self.__eat_name()
             self._eat_token()
             value = self._parse_exp()
             self._remove_hint()
             return NamedTableField(token, name, value)
-        self._add_hint("numbered table field", "expression")
+        self._add_hint(WHERE_NUMBERED_TABLE_FIELD, WHAT_EXPRESSION)
         value = self._parse_exp()
         self._remove_hint()
         return NumberedTableField(token, value)
 
+    def _parse_field_steps(self) -> Steps[TableField]:
+        """Steps of `_parse_field`, run on the explicit stack"""
+        token: Token = self.current_token
+        value: Expression
+        if self.current_token.type == TokenType.L_BRACKET:
+            self._add_hint(WHERE_EXPLICIT_TABLE_FIELD, WHAT_KEY_EXPRESSION)
+            self._eat_token()
+            at: Expression = (yield self._parse_exp_steps())
+            self._eat_token(TokenType.R_BRACKET)
+            self._switch_hint(WHAT_VALUE_EXPRESSION)
+            self._eat_token(TokenType.ASSIGN)
+            value = yield self._parse_exp_steps()
+            self._remove_hint()
+            return ExplicitTableField(token, at, value)
+        if (
+            self.current_token.type == TokenType.NAME
+            and self.next_token.type == TokenType.ASSIGN
+        ):
+            self._add_hint(WHERE_NAMED_TABLE_FIELD, WHAT_VALUE_EXPRESSION)
+            name: Name = self.__eat_name()
+            self._eat_token()
+            value = yield self._parse_exp_steps()
+            self._remove_hint()
+            return NamedTableField(token, name, value)
+        self._add_hint(WHERE_NUMBERED_TABLE_FIELD, WHAT_EXPRESSION)
+        value = yield self._parse_exp_steps()
+        self._remove_hint()
+        return NumberedTableField(token, value)
+
     def _parse_args(self) -> list[Expression]:
         """
         Parse an argument array for a function call
 
         args: L_PAREN [explist] R_PAREN | tableconstructor | LiteralString
         """
-        self._add_hint("function call", "arguments")
+        self._add_hint(WHERE_FUNCTION_CALL, WHAT_ARGUMENTS)
         expressions: list[Expression] = []
         if self.current_token.type == TokenType.L_PAREN:
             self._eat_token()
@@ -893,8 +1564,56 @@ class Parser:
         self._remove_hint()
         return expressions
 
+    def _parse_args_steps(self) -> Steps[list[Expression]]:
+        """Steps of `_parse_args`, run on the explicit stack"""
+        self._add_hint(WHERE_FUNCTION_CALL, WHAT_ARGUMENTS)
+        expressions: list[Expression] = []
+        if self.current_token.type == TokenType.L_PAREN:
+            self._eat_token()
+            if self.current_token.type != TokenType.R_PAREN:  # type: ignore
+                expressions = yield self._parse_exp_list_steps()
+            self._eat_token(TokenType.R_PAREN)
+        elif self.current_token.type == TokenType.L_CURL:
+            expressions.append((yield self._parse_table_constructor_steps()))
+        elif self.current_token.type == TokenType.STRING:
+            expressions.append(String.from_token(self.current_token))
+            self._eat_token()
+        else:
+            assert False, "unreachable line"  # pragma: no mutate
+        self._remove_hint()
+        return expressions
+
 
-def parse(chunk: str) -> Chunk:
-    ast: Chunk = Parser(chunk).parse_chunk()
-    ast.parent(None)
+def parse(
+    chunk: Source,
+    include_comments: bool = True,
+    typed: bool = False,
+    cache: Optional[ParseCache] = None,
+    lazy: bool = False,
+) -> Chunk:
+    """
+    Parse a chunk of lua.
+
+    :param chunk: The source. Anything but a str (like bytes) is read as latin-1, one
+        character per byte, and the strings, names and comments of the tree hold
+        those characters. Encode formatted output as latin-1 to get the bytes back.
+    :param include_comments: Whether to keep the comments in the tree
+    :param typed: Whether to parse the typed dialect
+    :param cache: Optional cache for parsed chunks
+    :param lazy: Only parse function bodies once they are used. Their brackets and
+        blocks are checked right away, any other syntax error in them is only raised
+        once they are used.
+    :return: The parsed chunk
+    """
+    ast: Optional[Chunk] = None
+    # lazily parsed chunks are cheap to parse, and would store the whole source
+    if cache and not lazy:
+        # cached chunks are stored with their parent links already set
+        ast = cache.load(chunk, typed, include_comments)
+    if ast is None:
+        ast = Parser(
+            chunk, typed=typed, include_comments=include_comments, lazy=lazy
+        ).parse_chunk()
+        if cache and not lazy:
+            cache.store(chunk, ast, typed, include_comments)
     return ast
@@ -0,0 +1,386 @@
+"""
+Compact binary format for syntax trees, see `dumps` and `loads`.
+
+The format is the columns of an Arena. Every column of numbers is stored with the
+smallest item size that fits all of its numbers, columns that mostly grow (like the
+offsets of tokens) are stored as differences. The remaining data (values, comments,
+...) is a stream of tagged entries, with all strings in one interned string table.
+The kinds of nodes and token types are stored by name, so they don't depend on the
+order of the classes.
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from itertools import accumulate, chain
+from operator import add, sub
+from pathlib import Path
+from typing import Any, Optional
+
+from .arena import NODE_CLASSES, Arena
+from .AST import ASTNode, BinaryOperand, UnaryOperand
+from .line_index import LineIndex
+from .token import TOKEN_TYPE_CODES, TOKEN_TYPES, Token, TokenBuffer, TokenType
+
+MAGIC: bytes = b"TUMFL"
+FORMAT: int = 1
+
+_POSITIONS: int = 1
+
+# tags of the entries in the value stream
+_NONE: int = 0
+_FALSE: int = 1
+_TRUE: int = 2
+_INT: int = 3
+_STR: int = 4
+_PATH: int = 5
+_BINARY: int = 6
+_UNARY: int = 7
+# followed by their items, the data is the number of items
+_TUPLE: int = 8
+_LIST: int = 9
+_DICT: int = 10
+
+# item sizes to choose from, smallest first
+_UNSIGNED: str = "BHIQ"
+_SIGNED: str = "bhiq"
+
+
+def dumps(node: ASTNode, positions: bool = True) -> bytes:
+    """
+    Serialize a chunk or subtree, it is read with `loads`
+
+    :param node: the root of the tree
+    :param positions: whether to store the positions of tokens, without them all
+        tokens are at the start of their source
+    :return: the serialized tree
+    """
+    arena: Arena = Arena()
+    arena.add(node)
+    return dump_arena(arena, positions)
+
+
+def loads(data: bytes, line_index: Optional[LineIndex] = None) -> ASTNode:
+    """
+    Read a tree serialized by `dumps`
+
+    :param data: the serialized tree
+    :param line_index: the index of the source of the tree, to get the lines of the
+        source (e.g. for errors), not only positions
+    :return: the root of the tree
+    """
+    return load_arena(data, line_index).to_node()
+
+
+def dump_arena(arena: Arena, positions: bool = True) -> bytes:
+    """Serialize all nodes of an arena, the attributes of nodes are not stored"""
+    writer: _Writer = _Writer()
+    writer.value(
+        (
+            tuple(cls.__name__ for cls in NODE_CLASSES),
+            tuple(token_type.name for token_type in TOKEN_TYPES),
+            arena.values,
+            [(tokens.values, tokens.comments) for tokens in arena.buffers],
+            [
+                (
+                    token.type.name,
+                    token.value,
+                    token.line,
+                    token.column,
+                    token.comment,
+                    token.start,
+                    token.end,
+                )
+                for token in arena.loose_tokens
+            ],
+            arena.comments,
+            arena.file_names,
+        )
+    )
+    columns: bytearray = bytearray()
+    # the positions of the fields follow from the kinds, see `Arena`
+    for column in (arena.kinds, arena.token_buffers, arena.tags, arena.data):
+        _write_array(columns, column)
+    _write_array(columns, _deltas(arena.token_indexes))
+    _write_array(columns, arena.items)
+    for tokens in arena.buffers:
+        _write_array(columns, tokens.types)
+        if positions:
+            _write_array(columns, _deltas(tokens.starts))
+            _write_array(columns, array("q", map(sub, tokens.ends, tokens.starts)))
+            _write_array(columns, _deltas(array("q", tokens.line_index.newlines)))
+    result: bytearray = bytearray(MAGIC)
+    _write_varint(result, FORMAT)
+    result.append(_POSITIONS if positions else 0)
+    _write_varint(result, arena.root)
+    text: bytes = "".join(writer.strings).encode("utf-8", "surrogatepass")
+    _write_array(result, array("Q", map(len, writer.strings)))
+    _write_varint(result, len(text))
+    result += text
+    _write_array(result, array("B", writer.tags))
+    _write_array(result, array("q", writer.data))
+    return bytes(result + columns)
+
+
+def load_arena(data: bytes, line_index: Optional[LineIndex] = None) -> Arena:
+    """
+    Read an arena serialized by `dump_arena`
+
+    :param data: the serialized arena
+    :param line_index: the index of the source, only for arenas of a single source
+    :return: the arena
+    """
+    # pylint: disable=too-many-locals
+    if not data.startswith(MAGIC):
+        raise ValueError("Not a serialized syntax tree")
+    reader: _Reader = _Reader(data, len(MAGIC))
+    if reader.varint() != FORMAT:
+        raise ValueError("Unsupported format of a serialized syntax tree")
+    positions: bool = bool(reader.byte() & _POSITIONS)
+    arena: Arena = Arena()
+    arena.root = reader.varint()
+    lengths: array[int] = reader.array("Q")
+    text: str = str(reader.bytes(reader.varint()), "utf-8", "surrogatepass")
+    strings: list[str] = []
+    start: int = 0
+    for length in lengths:
+        strings.append(sys.intern(text[start : start + length]))
+        start += length
+    stream: _Stream = _Stream(strings, reader.array("B"), reader.array("q"))
+    (
+        kind_names,
+        type_names,
+        arena.values,
+        buffers,
+        loose_tokens,
+        arena.comments,
+        arena.file_names,
+    ) = stream.value()
+    kinds: dict[str, int] = {
+        cls.__name__: kind for kind, cls in enumerate(NODE_CLASSES)
+    }
+    kind_table: bytes = _table(kind_names, kinds)
+    type_table: bytes = _table(
+        type_names, {t.name: c for t, c in TOKEN_TYPE_CODES.items()}
+    )
+    arena.kinds = array("B", reader.array("B").tobytes().translate(kind_table))
+    arena.token_buffers = reader.array("H")
+    arena.tags = reader.array("B")
+    arena.data = reader.array("i")
+    arena.token_indexes = array("I", accumulate(reader.array("q")))
+    arena.items = reader.array("i")
+    fields: list[int] = [len(cls._fields) for cls in NODE_CLASSES]
+    arena.firsts = array(
+        "I", accumulate(map(fields.__getitem__, arena.kinds), initial=0)
+    )
+    arena.firsts.pop()
+    if line_index is not None and len(buffers) != 1:
+        raise ValueError("Only the line index of a single source can be given")
+    for values, comments in buffers:
+        types: array[int] = array(
+            "B", reader.array("B").tobytes().translate(type_table)
+        )
+        if positions:
+            starts: array[int] = array("L", accumulate(reader.array("q")))
+            ends: array[int] = array("L", map(add, starts, reader.array("q")))
+            newlines: list[int] = list(accumulate(reader.array("q")))
+            index: LineIndex = line_index or LineIndex.from_newlines(newlines)
+        else:
+            starts = array("L", bytes(len(types) * array("L").itemsize))
+            ends = array("L", starts)
+            index = line_index or LineIndex("")
+        tokens: TokenBuffer = TokenBuffer(index)
+        tokens.types = types
+        tokens.starts = starts
+        tokens.ends = ends
+        tokens.values = values
+        tokens.comments = comments
+        arena.buffers.append(tokens)
+    arena.loose_tokens = [
+        Token(TokenType[type_name], value, line, column, comment, start, end)
+        for type_name, value, line, column, comment, start, end in loose_tokens
+    ]
+    return arena
+
+
+def _table(names: tuple[str, ...], codes: dict[str, int]) -> bytes:
+    """Translation table from the stored codes of names to their current codes"""
+    table: bytearray = bytearray(range(256))
+    for code, name in enumerate(names):
+        if name not in codes:
+            raise ValueError(f"Unknown name in a serialized syntax tree: {name}")
+        table[code] = codes[name]
+    return bytes(table)
+
+
+def _deltas(values: array[int]) -> array[int]:
+    """The differences of the numbers to their predecessor, undone by accumulate"""
+    return array("q", map(sub, values, chain((0,), values)))
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_array(out: bytearray, values: array[int]) -> None:
+    """Write a column, with the smallest type fitting all its numbers"""
+    low: int = min(values, default=0)
+    high: int = max(values, default=0)
+    typecode: str = "q"
+    for typecode in _UNSIGNED if low >= 0 else _SIGNED:
+        bits: int = 8 * array(typecode).itemsize
+        if typecode in _UNSIGNED and high < 1 << bits:
+            break
+        if -(1 << bits - 1) <= low and high < 1 << bits - 1:
+            break
+    packed: array[int] = (
+        values if typecode == values.typecode else array(typecode, values)
+    )
+    if sys.byteorder == "big":
+        packed = array(packed.typecode, packed)
+        packed.byteswap()
+    out.append(ord(typecode))
+    _write_varint(out, len(packed))
+    out += packed.tobytes()
+
+
+class _Reader:
+    def __init__(self, data: bytes, position: int) -> None:
+        self.data: memoryview = memoryview(data)
+        self.position: int = position
+
+    def byte(self) -> int:
+        return self.bytes(1)[0]
+
+    def bytes(self, length: int) -> memoryview:
+        if self.position + length > len(self.data):
+            raise ValueError("Truncated serialized syntax tree")
+        self.position += length
+        return self.data[self.position - length : self.position]
+
+    def varint(self) -> int:
+        value: int = 0
+        shift: int = 0
+        while (byte := self.byte()) & 0x80:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+        return value | byte << shift
+
+    def array(self, typecode: str) -> array[int]:
+        """Read a column, as an array of typecode"""
+        packed: array[int] = array(chr(self.byte()))
+        packed.frombytes(self.bytes(self.varint() * packed.itemsize))
+        if sys.byteorder == "big":
+            packed.byteswap()
+        return packed if packed.typecode == typecode else array(typecode, packed)
+
+
+class _Writer:
+    """Writes values to a stream of tags and numbers, and collects their strings"""
+
+    def __init__(self) -> None:
+        self.tags: list[int] = []
+        self.data: list[int] = []
+        self.strings: list[str] = []
+        self.__codes: dict[str, int] = {}
+
+    def string(self, value: str) -> int:
+        code: int = self.__codes.setdefault(value, len(self.strings))
+        if code == len(self.strings):
+            self.strings.append(value)
+        return code
+
+    def value(self, value: Any) -> None:
+        tags: list[int] = self.tags
+        data: list[int] = self.data
+        if value is None:
+            tags.append(_NONE)
+            data.append(0)
+        elif value is True or value is False:
+            tags.append(_TRUE if value else _FALSE)
+            data.append(0)
+        elif isinstance(value, str):
+            tags.append(_STR)
+            data.append(self.string(value))
+        elif isinstance(value, int):
+            tags.append(_INT)
+            data.append(value)
+        elif isinstance(value, (tuple, list)):
+            tags.append(_TUPLE if isinstance(value, tuple) else _LIST)
+            data.append(len(value))
+            for item in value:
+                self.value(item)
+        elif isinstance(value, dict):
+            tags.append(_DICT)
+            data.append(len(value))
+            for item in value.items():
+                self.value(item[0])
+                self.value(item[1])
+        elif isinstance(value, Path):
+            tags.append(_PATH)
+            data.append(self.string(str(value)))
+        elif isinstance(value, BinaryOperand):
+            tags.append(_BINARY)
+            data.append(self.string(value.name))
+        elif isinstance(value, UnaryOperand):
+            tags.append(_UNARY)
+            data.append(self.string(value.name))
+        else:
+            raise TypeError(f"Can not serialize {type(value).__name__}")
+
+
+class _Stream:
+    """Reads values written by a _Writer"""
+
+    def __init__(self, strings: list[str], tags: array[int], data: array[int]) -> None:
+        self.strings: list[str] = strings
+        self.tags: array[int] = tags
+        self.data: array[int] = data
+        self.position: int = 0
+
+    def value(self) -> Any:
+        position: int = self.position
+        self.position += 1
+        tag: int = self.tags[position]
+        data: int = self.data[position]
+        if tag == _STR:
+            return self.strings[data]
+        if tag == _NONE:
+            return None
+        if tag in (_TUPLE, _LIST):
+            return self.items(data) if tag == _LIST else tuple(self.items(data))
+        if tag == _DICT:
+            return {self.value(): self.value() for _ in range(data)}
+        if tag in (_TRUE, _FALSE):
+            return tag == _TRUE
+        if tag == _INT:
+            return data
+        if tag == _PATH:
+            return Path(self.strings[data])
+        if tag == _BINARY:
+            return BinaryOperand[self.strings[data]]
+        if tag == _UNARY:
+            return UnaryOperand[self.strings[data]]
+        raise ValueError(f"Unknown tag in a serialized syntax tree: {tag}")
+
+    def items(self, length: int) -> list[Any]:
+        """The items of a list or tuple, strings and None are read directly"""
+        result: list[Any] = []
+        strings: list[str] = self.strings
+        tags: array[int] = self.tags
+        data: array[int] = self.data
+        for _ in range(length):
+            tag: int = tags[self.position]
+            if tag == _STR:
+                result.append(strings[data[self.position]])
+                self.position += 1
+            elif tag == _NONE:
+                result.append(None)
+                self.position += 1
+            else:
+                result.append(self.value())
+        return result
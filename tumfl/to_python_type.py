@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Optional, Union
+from typing import TYPE_CHECKING, Any, Union
 
 from tumfl.AST import (
     Assign,
@@ -91,8 +91,7 @@ class ToPythonType(BasicWalker[Retype]):
         return NilVal()
 
     def visit_Number(self, node: Number) -> Retype:
-        int_repr: Optional[int] = node.to_int()
-        return int_repr if int_repr is not None else node.to_float()
+        return node.to_python()
 
     def visit_String(self, node: String) -> Retype:
         return node.value
@@ -1,13 +1,19 @@
 from __future__ import annotations
 
+from array import array
 from enum import Enum
-from typing import TYPE_CHECKING, Any, Optional, Union
+from typing import TYPE_CHECKING, Any, Iterator, Optional, Union
 
 if TYPE_CHECKING:
     from .lexer import NumberTuple
+    from .line_index import LineIndex
 
 
 class TokenType(Enum):
+    # Enum hashes the name in Python, the members are unique so their identity works
+    # as well, and keeps the lookups in the lexer and parser tables in C
+    __hash__ = object.__hash__
+
     AND = "and"
     BREAK = "break"
     DO = "do"
@@ -72,19 +78,80 @@ class TokenType(Enum):
 
 
 class Token:
+    """
+    A lexed token.
+
+    Tokens produced by the lexer only carry the start and end offset into their source,
+    line and column are computed on demand using the shared line index of the source.
+    Tokens without a source (i.e. synthesized ones) store line and column directly.
+    Most tokens have no comments, so the comment list is only allocated once accessed.
+    """
+
+    __slots__ = (
+        "type",
+        "value",
+        "_line",
+        "_column",
+        "_comment",
+        "start",
+        "end",
+        "line_index",
+    )
+
     def __init__(
         self,
         type: TokenType,
         value: Union[str, bool, NumberTuple],
-        line: int,
-        column: int,
+        line: int = 0,
+        column: int = 0,
         comment: Optional[list[str]] = None,
+        start: int = 0,
+        end: int = 0,
+        line_index: Optional[LineIndex] = None,
     ) -> None:
         self.type: TokenType = type
         self.value: Union[str, bool, NumberTuple] = value
-        self.line: int = line
-        self.column: int = column
-        self.comment: list[str] = comment or []
+        self._line: int = line
+        self._column: int = column
+        self._comment: Optional[list[str]] = comment or None
+        self.start: int = start
+        self.end: int = end
+        self.line_index: Optional[LineIndex] = line_index
+
+    @property
+    def line(self) -> int:
+        if self.line_index is None:
+            return self._line
+        return self.line_index.line(self.start)
+
+    @property
+    def column(self) -> int:
+        if self.line_index is None:
+            return self._column
+        return self.line_index.column(self.start)
+
+    @property
+    def comment(self) -> list[str]:
+        if self._comment is None:
+            self._comment = []
+        return self._comment
+
+    @comment.setter
+    def comment(self, comment: list[str]) -> None:
+        self._comment = comment
+
+    def __reduce__(self) -> tuple[type[Token], tuple[Any, ...]]:
+        # positional arguments pickle a lot smaller than the slot state
+        return Token, (
+            self.type,
+            self.value,
+            self._line,
+            self._column,
+            self._comment,
+            self.start,
+            self.end,
+            self.line_index,
+        )
 
     def __hash__(self) -> int:
         return hash((self.type, self.value))
@@ -96,3 +163,126 @@ class Token:
 
     def __repr__(self) -> str:
         return f"Token({self.type}, {self.value!r}, {self.line!r}, {self.column!r}, {self.comment!r})"
+
+
+TOKEN_TYPES: list[TokenType] = list(TokenType)
+TOKEN_TYPE_CODES: dict[TokenType, int] = {
+    token_type: code for code, token_type in enumerate(TOKEN_TYPES)
+}
+# the only token types whose value isn't the value of the type itself
+VALUE_TOKEN_TYPES: frozenset[TokenType] = frozenset(
+    (TokenType.NAME, TokenType.NUMBER, TokenType.STRING)
+)
+
+
+class TokenBuffer:
+    """
+    Columnar storage for all tokens of a source.
+
+    Types and offsets are kept in arrays. Values are kept in a side table, which is
+    `None` for keywords and symbols, as their value is the value of their type.
+    Comments are only stored for the tokens that have some.
+    Token objects are only created when accessed.
+    """
+
+    def __init__(self, line_index: LineIndex) -> None:
+        self.types: array[int] = array("B")
+        self.starts: array[int] = array("L")
+        self.ends: array[int] = array("L")
+        self.values: list[Optional[Union[str, NumberTuple]]] = []
+        self.comments: dict[int, list[str]] = {}
+        self.line_index: LineIndex = line_index
+
+    def append(
+        self,
+        type: TokenType,
+        value: Union[str, NumberTuple],
+        start: int,
+        end: int,
+        comment: Optional[list[str]] = None,
+    ) -> None:
+        if comment:
+            self.comments[len(self.types)] = comment
+        self.types.append(TOKEN_TYPE_CODES[type])
+        self.starts.append(start)
+        self.ends.append(end)
+        self.values.append(value if type in VALUE_TOKEN_TYPES else None)
+
+    def extend(
+        self,
+        other: TokenBuffer,
+        start: int = 0,
+        stop: Optional[int] = None,
+        shift: int = 0,
+    ) -> None:
+        """
+        Append a range of tokens of another buffer
+
+        :param other: the buffer to copy from
+        :param start: index of the first token to copy
+        :param stop: index after the last token to copy, defaults to the end
+        :param shift: amount to move the offsets of the copied tokens by
+        """
+        stop = len(other) if stop is None else stop
+        index_shift: int = len(self) - start
+        for index, comment in other.comments.items():
+            if start <= index < stop:
+                self.comments[index + index_shift] = comment
+        self.types.extend(other.types[start:stop])
+        self.values.extend(other.values[start:stop])
+        if shift:
+            self.starts.extend(
+                array("L", [pos + shift for pos in other.starts[start:stop]])
+            )
+            self.ends.extend(
+                array("L", [pos + shift for pos in other.ends[start:stop]])
+            )
+        else:
+            self.starts.extend(other.starts[start:stop])
+            self.ends.extend(other.ends[start:stop])
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def type(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.types[index]]
+
+    def value(self, index: int) -> Union[str, NumberTuple]:
+        value: Optional[Union[str, NumberTuple]] = self.values[index]
+        if value is None:
+            return TOKEN_TYPES[self.types[index]].value
+        return value
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self)
+        return Token(
+            self.type(index),
+            self.value(index),
+            comment=self.comments.get(index),
+            start=self.starts[index],
+            end=self.ends[index],
+            line_index=self.line_index,
+        )
+
+    def __iter__(self) -> Iterator[Token]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def cursor(self) -> TokenCursor:
+        return TokenCursor(self)
+
+
+class TokenCursor:
+    """Reads the tokens of a buffer in order, the same way `Lexer.get_next_token` does"""
+
+    def __init__(self, buffer: TokenBuffer) -> None:
+        self.buffer: TokenBuffer = buffer
+        self.index: int = 0
+
+    def get_next_token(self) -> Token:
+        token: Token = self.buffer[self.index]
+        # keep returning the EOF token at the end
+        if self.index < len(self.buffer) - 1:
+            self.index += 1
+        return token